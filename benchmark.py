@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Capture Throughput Benchmark for pyCameraControl
+Drives single, burst and interval captures through both backends against
+simulated cameras (simulated_camera for gPhoto2, fake_dcc_remote.py for
+digiCamControl over the persistent channel, or per-command processes with
+digicam-fake-subprocess) and reports shots per minute, per-stage latency percentiles
+and the memory high-water mark. Every scenario runs in its own Python process,
+so its peak RSS is its own. A scenario whose previews fail to decode is
+reported as failed and the run exits with status 1. Results are written as
+JSON and can be compared against an earlier run to catch regressions:
+
+  python benchmark.py --output baseline.json
+  python benchmark.py --compare baseline.json --threshold 10
+
+Stages: trigger, download, save, delete (gPhoto2 pipeline), capture
+(digiCamControl round trip), preview_decode, preview_latency (frame handed
+over -> preview ready) and ui_update (PhotoImage creation, only measured
+when a display is available).
+"""
+
+import argparse
+import json
+import os
+import platform
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+try:
+	import resource
+except ImportError:
+	resource = None  # Windows
+
+import simulated_camera
+from camera_backends import DigiCamControlBackend, GPhoto2Backend
+
+
+BENCHMARK_VERSION = 1
+BACKENDS = ('gphoto2-sim', 'digicam-fake', 'digicam-fake-subprocess')
+SCENARIOS = {
+	'single': {'mode': 'single', 'count': 1, 'interval': 0},
+	'burst': {'mode': 'burst', 'count': 10, 'interval': 0},
+	'interval': {'mode': 'interval', 'count': 3, 'interval': 0.5},
+}
+FAKE_DCC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_dcc_remote.py")
+
+# Lower is better for everything except throughput
+HIGHER_IS_BETTER = ('shots_per_minute',)
+
+
+def percentile(values, fraction):
+	"""Linear-interpolated percentile of a non-empty list"""
+	ordered = sorted(values)
+	position = (len(ordered) - 1) * fraction
+	lower = int(position)
+	upper = min(lower + 1, len(ordered) - 1)
+	return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(values):
+	"""Millisecond summary of a list of durations in seconds"""
+	if not values:
+		return None
+	ms = [value * 1000 for value in values]
+	return {
+		'count': len(ms),
+		'mean': round(sum(ms) / len(ms), 3),
+		'p50': round(percentile(ms, 0.50), 3),
+		'p90': round(percentile(ms, 0.90), 3),
+		'p99': round(percentile(ms, 0.99), 3),
+		'max': round(max(ms), 3),
+	}
+
+
+def rss_high_water_mb():
+	"""Peak resident set size of this process in MB, or None when unavailable (one scenario per process)"""
+	if resource is None:
+		return None
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# Linux reports KB, macOS bytes
+	return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class PreviewProbe:
+	"""
+	Feeds captured frames to a PreviewWorker the way the UIs do and times the
+	results. Like the UIs, frames replaced before the worker got to them are
+	dropped (reported as preview_dropped).
+	"""
+
+	def __init__(self, enabled=True):
+		self.enabled = enabled
+		self.worker = None
+		self.tk_root = None
+		self.decode_times = []
+		self.latencies = []
+		self.ui_times = []
+		self.errors = 0
+		self.dropped = 0
+
+		if not enabled:
+			return
+		try:
+			from preview import PreviewWorker
+		except ImportError:
+			self.enabled = False  # Pillow not installed
+			return
+		self.worker = PreviewWorker()
+		self._open_display()
+
+	def _open_display(self):
+		"""ui_update is only measured when Tk can open a display"""
+		try:
+			import tkinter as tk
+			self.tk_root = tk.Tk()
+			self.tk_root.withdraw()
+		except Exception:
+			self.tk_root = None
+
+	def submit(self, source, key):
+		"""Called on the capture thread, which also owns the Tk root"""
+		if self.enabled and source is not None:
+			self.worker.submit(source, (1200, 800), key=key, cache=False)
+			self.drain()
+
+	def drain(self):
+		"""Record every finished preview"""
+		if not self.enabled:
+			return
+		while True:
+			try:
+				result = self.worker.results.get_nowait()
+			except queue.Empty:
+				return
+			self._record(result)
+
+	def _record(self, result):
+		if result['error'] is not None:
+			self.errors += 1
+			return
+		self.decode_times.append(result['info']['decode_time'])
+		self.latencies.append(result['info']['latency'])
+		if self.tk_root is not None:
+			from PIL import ImageTk
+			start = time.perf_counter()
+			ImageTk.PhotoImage(result['image'])  # Only the conversion is measured
+			self.tk_root.update_idletasks()
+			self.ui_times.append(time.perf_counter() - start)
+
+	def close(self):
+		"""Wait for the last preview, then stop the worker"""
+		if not self.enabled:
+			return
+		deadline = time.perf_counter() + 30
+		while self.worker.rendered + self.errors + self.worker.dropped < self.worker.submitted:
+			if time.perf_counter() > deadline:
+				break
+			self.drain()
+			time.sleep(0.005)
+		self.drain()
+		self.dropped = self.worker.dropped
+		self.worker.stop()
+		if self.tk_root is not None:
+			self.tk_root.destroy()
+
+
+def make_backend(name, workdir, args):
+	if name == 'gphoto2-sim':
+		simulated_camera.reset()
+		simulated_camera.configure(seed=args.seed, jitter=args.jitter, file_size=args.file_size)
+		return GPhoto2Backend(gp_module=simulated_camera)
+	if name in ('digicam-fake', 'digicam-fake-subprocess'):
+		os.environ['FAKE_DCC_STATE'] = os.path.join(workdir, "fake_dcc_state.json")
+		os.environ.setdefault('FAKE_DCC_FILE_SIZE', str(args.file_size))
+		# The -subprocess variant measures the one-process-per-command fallback
+		return DigiCamControlBackend(dcc_path=FAKE_DCC_PATH, persistent=(name == 'digicam-fake'))
+	raise ValueError(f"Unknown backend: {name}")
+
+
+def run_scenario(backend_name, scenario_name, args):
+	scenario = dict(SCENARIOS[scenario_name])
+	if scenario_name == 'burst':
+		scenario['count'] = args.burst_count
+
+	workdir = tempfile.mkdtemp(prefix="pycc_bench_")
+	probe = PreviewProbe(enabled=args.preview)
+	decoded_from_memory = set()
+	try:
+		backend = make_backend(backend_name, workdir, args)
+		success, message = backend.connect_camera()
+		if not success:
+			raise RuntimeError(f"{backend_name}: {message}")
+		# Measure the capture run only, not connecting (the simulator builds its frames there)
+		tracemalloc.start()
+
+		def on_shot(frame):
+			# gPhoto2 frames are decoded from memory like main.py does
+			if 'camera_file' in frame:
+				decoded_from_memory.add(frame['index'])
+				probe.submit(frame['camera_file'], frame['index'])
+
+		def on_saved(frame):
+			if frame['index'] not in decoded_from_memory and frame.get('target_path'):
+				probe.submit(frame['target_path'], frame['index'])
+
+		stats = backend.capture_sequence(
+			os.path.join(workdir, "photos"), "BENCH", scenario['count'], scenario['interval'],
+			on_shot=on_shot, on_saved=on_saved
+		)
+		probe.close()
+		backend.disconnect_camera()
+		_, memory_peak = tracemalloc.get_traced_memory()
+	finally:
+		tracemalloc.stop()
+		shutil.rmtree(workdir, ignore_errors=True)
+
+	if probe.errors:
+		# Preview timings would silently leave out the frames that failed
+		raise RuntimeError(
+			f"{probe.errors} of {probe.worker.submitted} preview(s) failed to decode; preview timings are not valid"
+		)
+
+	stages = {}
+	for shot in stats['shots']:
+		for stage, seconds in shot['timings'].items():
+			stages.setdefault(stage, []).append(seconds)
+	stages['preview_decode'] = probe.decode_times
+	stages['preview_latency'] = probe.latencies
+	stages['ui_update'] = probe.ui_times
+
+	return {
+		'backend': backend_name,
+		'scenario': scenario_name,
+		'mode': scenario['mode'],
+		'count': scenario['count'],
+		'interval': scenario['interval'],
+		'frames': stats['frames'],
+		'failed': stats['failed'],
+		'elapsed_s': round(stats['elapsed'], 3),
+		'shots_per_minute': round(stats['frames_per_minute'], 2),
+		'stages': {stage: summarize(values) for stage, values in stages.items() if values},
+		'preview_errors': probe.errors,
+		'preview_dropped': probe.dropped,
+		'memory_peak_mb': round(memory_peak / (1024 * 1024), 2),
+		'rss_high_water_mb': rss_high_water_mb(),
+	}
+
+
+def scenario_command(key, args):
+	"""Command line that runs one scenario in a fresh interpreter"""
+	command = [
+		sys.executable, os.path.abspath(__file__), "--run-one", key,
+		"--burst-count", str(args.burst_count), "--file-size", str(args.file_size),
+		"--seed", str(args.seed), "--jitter", str(args.jitter),
+	]
+	if not args.preview:
+		command.append("--no-preview")
+	return command
+
+
+def run_isolated(key, args):
+	"""Run one scenario in a child process and return its result (or {'error': ...})"""
+	completed = subprocess.run(scenario_command(key, args), stdout=subprocess.PIPE, text=True)
+	try:
+		return json.loads(completed.stdout)
+	except ValueError:
+		return {'error': f"scenario process exited with status {completed.returncode}"}
+
+
+def run_one(key, args):
+	"""--run-one: run a single scenario in this process and print its result as JSON"""
+	backend_name, _, scenario_name = key.partition("/")
+	try:
+		result = run_scenario(backend_name, scenario_name, args)
+	except Exception as e:
+		result = {'error': str(e)}
+	print(json.dumps(result))
+	return 0
+
+
+def compare(current, baseline, threshold):
+	"""
+	Compare two result documents.
+	Returns a list of (key, metric, baseline, current, change %) for every
+	metric that got worse by more than threshold percent.
+	"""
+	regressions = []
+	for key, result in current['results'].items():
+		previous = baseline.get('results', {}).get(key)
+		if not previous or 'error' in previous:
+			continue
+		if 'error' in result:
+			regressions.append((key, 'error', None, result['error'], 0.0))
+			continue
+
+		metrics = [('shots_per_minute', previous.get('shots_per_minute'), result.get('shots_per_minute')),
+			('memory_peak_mb', previous.get('memory_peak_mb'), result.get('memory_peak_mb'))]
+		for stage, summary in result.get('stages', {}).items():
+			old = previous.get('stages', {}).get(stage)
+			if old and summary:
+				metrics.append((f"{stage}.p50", old['p50'], summary['p50']))
+				metrics.append((f"{stage}.p90", old['p90'], summary['p90']))
+
+		for metric, old, new in metrics:
+			if not old or new is None:
+				continue
+			change = (new - old) / old * 100
+			worse = -change if metric in HIGHER_IS_BETTER else change
+			if worse > threshold:
+				regressions.append((key, metric, old, new, round(change, 1)))
+	return regressions
+
+
+def print_results(document):
+	for key, result in document['results'].items():
+		if 'error' in result:
+			print(f"{key}: failed ({result['error']})")
+			continue
+		rss = result['rss_high_water_mb']
+		print(f"{key}: {result['frames']}/{result['count']} frames, "
+			f"{result['shots_per_minute']:.1f} shots/min, peak {result['memory_peak_mb']:.1f} MB traced"
+			+ (f", {rss:.1f} MB RSS" if rss is not None else ""))
+		for stage, summary in result['stages'].items():
+			print(f"  {stage:<16} p50 {summary['p50']:>9.2f} ms  p90 {summary['p90']:>9.2f} ms  "
+				f"p99 {summary['p99']:>9.2f} ms  (n={summary['count']})")
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="pyCameraControl capture benchmark")
+	parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=['gphoto2-sim', 'digicam-fake'])
+	parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+	parser.add_argument("--burst-count", type=int, default=SCENARIOS['burst']['count'])
+	parser.add_argument("--file-size", type=int, default=12 * 1024 * 1024, help="bytes per captured file")
+	parser.add_argument("--seed", type=int, default=0, help="simulated camera jitter seed")
+	parser.add_argument("--jitter", type=float, default=0.0, help="simulated latency jitter fraction")
+	parser.add_argument("--no-preview", dest="preview", action="store_false", help="skip preview decode timing")
+	parser.add_argument("--output", help="write results as JSON to this file")
+	parser.add_argument("--compare", metavar="BASELINE", help="compare against an earlier JSON result")
+	parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+	parser.add_argument("--run-one", metavar="BACKEND/SCENARIO", help=argparse.SUPPRESS)
+	args = parser.parse_args(argv)
+
+	if args.run_one:
+		return run_one(args.run_one, args)
+
+	document = {
+		'version': BENCHMARK_VERSION,
+		'created': datetime.now().isoformat(timespec='seconds'),
+		'python': platform.python_version(),
+		'platform': platform.platform(),
+		'settings': {
+			'burst_count': args.burst_count,
+			'file_size': args.file_size,
+			'seed': args.seed,
+			'jitter': args.jitter,
+			'preview': args.preview,
+		},
+		'results': {},
+	}
+
+	for backend_name in args.backends:
+		for scenario_name in args.scenarios:
+			key = f"{backend_name}/{scenario_name}"
+			print(f"Running {key}...", file=sys.stderr)
+			result = run_isolated(key, args)
+			if 'error' in result:
+				print(f"  {key} failed: {result['error']}", file=sys.stderr)
+			document['results'][key] = result
+
+	print_results(document)
+
+	if args.output:
+		with open(args.output, 'w', encoding='utf-8') as f:
+			json.dump(document, f, indent=2)
+		print(f"Results written to {args.output}", file=sys.stderr)
+
+	if args.compare:
+		with open(args.compare, 'r', encoding='utf-8') as f:
+			baseline = json.load(f)
+		regressions = compare(document, baseline, args.threshold)
+		if regressions:
+			print(f"\n{len(regressions)} regression(s) over {args.threshold:g}%:")
+			for key, metric, old, new, change in regressions:
+				print(f"  {key} {metric}: {old} -> {new} ({change:+.1f}%)")
+			return 1
+		print(f"\nNo regressions over {args.threshold:g}% against {args.compare}")
+	failed = [key for key, result in document['results'].items() if 'error' in result]
+	return 1 if failed else 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
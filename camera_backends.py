@@ -1,21 +1,199 @@
 #!/usr/bin/env python3
 """
-Windows Camera Backend for pyCameraControl
-Uses digiCamControl Remote Utility for camera control on Windows platform.
-Requires the main digiCamControl application to be running and camera connected.
+Camera Backends for pyCameraControl
+All backends implement the CameraBackend contract (connect_camera,
+capture_photo, burst_capture, capture_sequence, get_camera_info, ...) and
+declare optional features in CAPABILITIES, so the Tk interfaces and the
+headless runner drive any backend through the same calls.
+DigiCamControlBackend uses digiCamControl Remote Utility for camera control on
+Windows platform. Requires the main digiCamControl application to be running
+and camera connected.
+GPhoto2Backend drives the camera through libgphoto2 (macOS / Linux) with
+settings, live view and pipelined capture; gphoto2 is imported on first use
+unless another module with the same API (simulated_camera) is passed in.
 """
 
 import subprocess
 import os
+import sys
 import time
+import threading
+import logging
 from datetime import datetime
 import locale
 
+from capture_pipeline import CapturePipeline
+from camera_config import CameraConfigCache
+from dcc_channel import ChannelError, NON_IDEMPOTENT_COMMANDS, open_channel
+from file_watch import IngestSubscription, create_watcher, wait_for_files
 
-class DigiCamControlBackend:
+
+# Optional backend features (see CameraBackend.supports)
+FEATURE_SETTINGS = "settings"                # apply_settings()
+FEATURE_BATCHED_SETTINGS = "batched_settings"  # several settings cost one camera round trip
+FEATURE_CONFIG_CACHE = "config_cache"        # setting reads are served from memory
+FEATURE_LIVE_VIEW = "live_view"              # capture_preview() / stop_live_view()
+FEATURE_PIPELINED_CAPTURE = "pipelined_capture"  # next trigger overlaps saving the previous frame
+FEATURE_IN_MEMORY_FRAMES = "in_memory_frames"    # on_shot frames carry the image data
+FEATURE_CAMERA_EVENTS = "camera_events"      # wait_for_events() / fetch_files() for body-shutter shots
+
+# digiCamControl file name template variable for the session photo counter
+COUNTER_VARIABLE = "[Counter 4 digit]"
+
+# Back-off before the persistent channel is tried again after a failure (s);
+# doubles with every consecutive failure up to the maximum
+CHANNEL_RETRY_DELAY = 30
+CHANNEL_RETRY_MAX_DELAY = 300
+
+# Extensions preferred when a capture produced several files (RAW+JPEG)
+JPEG_EXTENSIONS = ('.jpg', '.jpeg')
+
+
+class CameraBackend:
+	"""
+	Common contract of the camera backends.
+	Required: connect_camera, disconnect_camera, is_connected, capture_photo,
+	burst_capture, get_camera_info. Optional features are listed in
+	CAPABILITIES and raise NotImplementedError when not supported.
+	"""
+
+	name = "camera"
+	CAPABILITIES = frozenset()
+
+	connected = False
+	camera_model = ""
+	# {'files': [...], 'timings': {...}} of the latest capture_photo, for backends that report it
+	last_capture = None
+
+	def supports(self, feature):
+		"""Check whether the backend implements an optional feature"""
+		return feature in self.CAPABILITIES
+
+	def connect_camera(self):
+		"""Returns (success, model or error message)"""
+		raise NotImplementedError
+
+	def disconnect_camera(self):
+		raise NotImplementedError
+
+	def is_connected(self):
+		"""Check if camera is connected"""
+		return self.connected
+
+	def capture_photo(self, save_path, filename_prefix="IMG"):
+		"""Returns (success, file path or None, message)"""
+		raise NotImplementedError
+
+	def burst_capture(self, save_path, filename_prefix, count, interval=0):
+		"""Returns (success, list of file paths, message)"""
+		raise NotImplementedError
+
+	def get_camera_info(self):
+		"""Get basic camera information"""
+		info = {}
+		if self.connected:
+			info['model'] = self.camera_model
+			info['status'] = "Connected"
+		else:
+			info['model'] = "No camera"
+			info['status'] = "Not connected"
+		info['backend'] = self.name
+		info['capabilities'] = sorted(self.CAPABILITIES)
+		return info
+
+	def capture_sequence(self, save_path, filename_prefix, count=1, interval=0,
+			on_shot=None, on_progress=None, on_saved=None, on_error=None):
+		"""
+		Capture count frames and report each one.
+		This default runs capture_photo once per shot, which must give every
+		shot its own file name; backends with FEATURE_PIPELINED_CAPTURE
+		override it. Callbacks:
+		  on_progress(index, count)  before each trigger
+		  on_shot(frame)             after the camera delivered the frame
+		  on_saved(frame)            once the file is on disk
+		  on_error(frame, e)         when a shot fails
+		Frames are dicts with 'index', 'target_path' and per-stage 'timings' in
+		seconds (plus 'files' and the backend's own stages from last_capture). Returns {'frames', 'failed', 'elapsed', 'frames_per_minute',
+		'<stage>_avg', 'shots'}.
+		"""
+		shots = []
+		failed = 0
+		start = time.perf_counter()
+		for i in range(count):
+			if on_progress:
+				on_progress(i, count)
+
+			shot_start = time.perf_counter()
+			success, filepath, message = self.capture_photo(save_path, filename_prefix)
+			frame = {
+				'index': i,
+				'target_path': filepath,
+				'timings': {'capture': time.perf_counter() - shot_start},
+			}
+			if success and self.last_capture:
+				frame['files'] = self.last_capture['files']
+				frame['timings'].update(self.last_capture['timings'])
+			shots.append(frame)
+			if success:
+				if on_shot:
+					on_shot(frame)
+				if on_saved:
+					on_saved(frame)
+			else:
+				failed += 1
+				if on_error:
+					on_error(frame, RuntimeError(message))
+
+			if i < count - 1 and interval > 0:
+				time.sleep(interval)
+
+		elapsed = time.perf_counter() - start
+		frames = count - failed
+		captures = [shot['timings']['capture'] for shot in shots]
+		return {
+			'frames': frames,
+			'failed': failed,
+			'elapsed': elapsed,
+			'frames_per_minute': frames / elapsed * 60 if elapsed > 0 else 0,
+			'capture_avg': sum(captures) / len(captures) if captures else 0,
+			'shots': shots,
+		}
+
+	def apply_settings(self, settings):
+		"""Write {name: value} camera settings; returns (write path, seconds)"""
+		raise NotImplementedError(f"{self.name} backend does not support camera settings")
+
+	def capture_preview(self):
+		"""Return one live view frame as JPEG bytes"""
+		raise NotImplementedError(f"{self.name} backend does not support live view")
+
+	def stop_live_view(self):
+		"""Leave live view (e.g. lower the mirror)"""
+		raise NotImplementedError(f"{self.name} backend does not support live view")
+
+	def wait_for_events(self, timeout=10):
+		"""Handle pending camera events; returns the camera paths of files the camera added"""
+		raise NotImplementedError(f"{self.name} backend does not support camera events")
+
+	def fetch_files(self, paths, save_path, filename_prefix, on_shot=None, on_saved=None, on_error=None, delete=False):
+		"""Download files the camera added by itself (see wait_for_events) like captured frames"""
+		raise NotImplementedError(f"{self.name} backend does not support camera events")
+
+
+class DigiCamControlBackend(CameraBackend):
 	"""Windows camera backend using digiCamControl Remote Utility"""
+
+	name = "digicam"
 	
-	def __init__(self):
+	def __init__(self, dcc_path=None, persistent=True):
+		"""
+		dcc_path overrides the Remote Utility location (also read from the
+		DCC_REMOTE_PATH environment variable); a .py path such as
+		fake_dcc_remote.py is run with the current Python interpreter.
+		persistent=True sends commands over a persistent channel (see
+		dcc_channel) and falls back to one process per command when the
+		channel is not available.
+		"""
 		# Common digiCamControl Remote Utility installation paths
 		self.possible_paths = [
 			"C:/Program Files (x86)/digiCamControl/CameraControlRemoteCmd.exe",
@@ -25,9 +203,25 @@ class DigiCamControlBackend:
 		self.dcc_path = None
 		self.connected = False
 		self.camera_model = ""
+		self.persistent = persistent
+		self.channel = None
+		self.channel_failures = 0  # consecutive channel failures
+		self.channel_retry_at = 0  # time.perf_counter() before which commands use the subprocess
+		self.command_stats = {}  # transport -> {'count': n, 'total': seconds}
+		self.reset_session()  # last applied session.folder / session.filenametemplate
+		self.watcher = None  # file arrival watcher on the session folder
+		self.ingest = None  # DirectoryIngest on the save folder whose watcher is shared (see _watch)
+		self.arrival_timeout = 10  # seconds to wait for the files of a capture
+		self.files_per_capture = None  # learned from the previous capture (2 for RAW+JPEG)
 		
 		# Find digiCamControl Remote Utility installation
-		self._find_dcc_installation()
+		dcc_path = dcc_path or os.environ.get("DCC_REMOTE_PATH")
+		if dcc_path:
+			if not os.path.exists(dcc_path):
+				raise FileNotFoundError(f"digiCamControl Remote Utility not found at {dcc_path}")
+			self.dcc_path = dcc_path
+		else:
+			self._find_dcc_installation()
 	
 	def _find_dcc_installation(self):
 		"""Find digiCamControl Remote Utility installation path"""
@@ -61,8 +255,73 @@ class DigiCamControlBackend:
 		"""Run digiCamControl Remote command with error handling"""
 		if not self.dcc_path:
 			raise RuntimeError("digiCamControl Remote not found")
-		
-		cmd = [self.dcc_path, "/c"] + list(args)
+
+		start = time.perf_counter()
+		if self.persistent and time.perf_counter() >= self.channel_retry_at:
+			result = self._run_channel_command(args, timeout)
+			if result is not None:
+				self._record_command('channel', start)
+				return result
+
+		result = self._run_subprocess_command(args, timeout)
+		self._record_command('subprocess', start)
+		return result
+
+	def _run_channel_command(self, args, timeout):
+		"""Send a command over the persistent channel; None when the caller must fall back"""
+		try:
+			if self.channel is None:
+				self.channel = open_channel(self.dcc_path)
+				if self.channel is None:
+					self._channel_failed()
+					return None
+			reply = self.channel.request(args, timeout=timeout)
+			self.channel_failures = 0
+			logging.debug(f"Channel command {' '.join(args)} result: {reply}")
+			# Same shape as the subprocess result so callers do not care which path ran
+			return subprocess.CompletedProcess(list(args), 0, stdout=reply + "\n", stderr="")
+		except ChannelError as e:
+			delay = self._channel_failed()
+			logging.warning(
+				f"digiCamControl channel unavailable ({e}), using CameraControlRemoteCmd per command "
+				f"for {delay}s"
+			)
+			self._close_channel()
+			if args and args[0] in NON_IDEMPOTENT_COMMANDS and e.sent:
+				# The request may already have run (the shutter may have fired); never send it twice
+				raise RuntimeError(f"{args[0].capitalize()} over persistent channel failed: {e}")
+			return None
+
+	def _channel_failed(self):
+		"""Back off from the channel (one timeout or a digiCamControl restart must not end it for good)"""
+		delay = min(CHANNEL_RETRY_DELAY * 2 ** self.channel_failures, CHANNEL_RETRY_MAX_DELAY)
+		self.channel_failures += 1
+		self.channel_retry_at = time.perf_counter() + delay
+		return delay
+
+	def _close_channel(self):
+		if self.channel is not None:
+			self.channel.close()
+			self.channel = None
+
+	def _record_command(self, transport, start):
+		stats = self.command_stats.setdefault(transport, {'count': 0, 'total': 0.0})
+		stats['count'] += 1
+		stats['total'] += time.perf_counter() - start
+
+	def get_command_stats(self):
+		"""Per-transport command counts and average round trip in seconds"""
+		return {
+			transport: dict(stats, average=stats['total'] / stats['count'])
+			for transport, stats in self.command_stats.items()
+		}
+
+	def _run_subprocess_command(self, args, timeout):
+		"""Run one CameraControlRemoteCmd process for the command"""
+		if self.dcc_path.endswith(".py"):
+			cmd = [sys.executable, self.dcc_path, "/c"] + list(args)
+		else:
+			cmd = [self.dcc_path, "/c"] + list(args)
 		
 		try:
 			# Use system locale encoding or utf-8 as fallback
@@ -76,7 +335,7 @@ class DigiCamControlBackend:
 				timeout=timeout,
 				shell=False
 			)
-			print(f"Debug: Command {' '.join(cmd)} result: returncode={result.returncode}, stdout={result.stdout}, stderr={result.stderr}")
+			logging.debug(f"Command {' '.join(cmd)} result: returncode={result.returncode}, stdout={result.stdout}, stderr={result.stderr}")
 			return result
 		except subprocess.TimeoutExpired:
 			raise RuntimeError(f"Command timed out: {' '.join(cmd)}")
@@ -85,6 +344,9 @@ class DigiCamControlBackend:
 	
 	def connect_camera(self):
 		"""Connect to camera (check if camera is available)"""
+		# A (re)connect tries the persistent channel again right away
+		self.channel_failures = 0
+		self.channel_retry_at = 0
 		try:
 			# Check if cameras are available
 			result = self._run_dcc_command("list", "cameras")
@@ -120,6 +382,9 @@ class DigiCamControlBackend:
 	def disconnect_camera(self):
 		"""Disconnect from camera (placeholder, as remote doesn't explicitly disconnect)"""
 		try:
+			self._close_channel()
+			self._close_watcher()
+			self.reset_session()
 			self.connected = False
 			self.camera_model = ""
 			return True
@@ -127,50 +392,127 @@ class DigiCamControlBackend:
 			self.connected = False
 			return False
 	
-	def is_connected(self):
-		"""Check if camera is connected"""
-		return self.connected
-	
+	def _set_session(self, save_path, template):
+		"""
+		Send session.folder / session.filenametemplate only when they differ
+		from what this backend last applied. Returns the number of commands sent.
+		"""
+		sent = 0
+		for key, value in (("session.folder", save_path), ("session.filenametemplate", template)):
+			if self.session.get(key) == value:
+				continue
+			result = self._run_dcc_command("set", key, value)
+			if result.returncode != 0 or ":;response:error;" in (result.stdout or ""):
+				# digiCamControl state is unknown; send everything again next time
+				self.reset_session()
+				raise RuntimeError(f"Setting {key} failed: {(result.stdout or result.stderr or '').strip()}")
+			self.session[key] = value
+			sent += 1
+		return sent
+
+	def reset_session(self):
+		"""Forget the applied session settings (e.g. after they were changed in digiCamControl)"""
+		self.session = {}
+		self.next_counter = None  # digiCamControl counter value of the next capture, once known
+
+	def _session_template(self, filename_prefix):
+		"""
+		One template for the whole day: digiCamControl's counter makes every
+		file name unique, so consecutive shots and bursts need no set commands.
+		"""
+		date = datetime.now().strftime("%Y%m%d")
+		base = f"{filename_prefix}_{date}_"
+		return base, base + COUNTER_VARIABLE
+
+	def _watch(self, save_path):
+		"""
+		File arrival watcher for the session folder, restarted when the folder
+		changes. Subscribes to self.ingest when it watches the same folder, so
+		the folder is not watched (or polled) twice.
+		"""
+		if self.watcher is not None and (self.watcher.directory != save_path or not getattr(self.watcher, 'active', True)):
+			self._close_watcher()
+		if self.ingest is not None and not isinstance(self.watcher, IngestSubscription):
+			shared = self.ingest.subscribe(save_path)
+			if shared is not None:
+				self._close_watcher()
+				self.watcher = shared
+		if self.watcher is None:
+			self.watcher = create_watcher(save_path)
+		return self.watcher
+
+	def _close_watcher(self):
+		if self.watcher is not None:
+			self.watcher.close()
+			self.watcher = None
+
+	def _capture_one(self, save_path, base):
+		"""
+		Trigger one capture with the session template already applied and wait
+		for its files. Returns (result, files); files is empty when they did not
+		arrive within arrival_timeout.
+		"""
+		watcher = self._watch(save_path)
+		watcher.read(0)  # files that arrived before the trigger belong to earlier shots
+		# Any base + digits stem at or above the expected counter: digiCamControl's
+		# counter may have moved on (shots from the body or the DCC window)
+		minimum = self.next_counter or 0
+
+		def match(name):
+			stem = os.path.splitext(name)[0]
+			digits = stem[len(base):]
+			if stem.startswith(base) and digits.isdigit() and int(digits) >= minimum:
+				return stem
+			return None
+
+		trigger_start = time.perf_counter()
+		result = self._run_dcc_command("capture")
+		trigger_end = time.perf_counter()
+		if result.returncode != 0:
+			return result, []
+
+		files, arrival = wait_for_files(
+			watcher, match, expected=self.files_per_capture,
+			timeout=self.arrival_timeout, since=trigger_end
+		)
+		timings = {'trigger': trigger_end - trigger_start}
+		if files:
+			stem = os.path.splitext(os.path.basename(files[0]))[0]
+			self.next_counter = int(stem[len(base):]) + 1
+			self.files_per_capture = len(files)
+			timings['arrival'] = arrival
+		else:
+			# Learn the counter and the files per capture again on the next shot
+			self.next_counter = None
+			self.files_per_capture = None
+			logging.warning(f"No file arrived in {save_path} within {self.arrival_timeout}s after capture")
+		self.last_capture = {'files': files, 'timings': timings}
+		return result, files
+
+	def _preferred_file(self, files):
+		"""The JPEG of a RAW+JPEG pair (previewable), otherwise the first file"""
+		for path in files:
+			if os.path.splitext(path)[1].lower() in JPEG_EXTENSIONS:
+				return path
+		return files[0] if files else None
+
 	def capture_photo(self, save_path, filename_prefix="IMG"):
 		"""Capture photo"""
 		try:
 			# Ensure save directory exists
 			os.makedirs(save_path, exist_ok=True)
-			
-			# Generate filename with timestamp
-			timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-			filename = f"{filename_prefix}_{timestamp}"
-			
-			# Set the capture folder
-			self._run_dcc_command("set", "session.folder", save_path)
-			
-			# Set filename template
-			self._run_dcc_command("set", "session.filenametemplate", filename)
+
+			# Folder and template are only sent when they changed
+			base, template = self._session_template(filename_prefix)
+			self._set_session(save_path, template)
 			
 			# Capture photo
-			result = self._run_dcc_command("capture")
+			self.last_capture = None
+			result, files = self._capture_one(save_path, base)
+			captured_file = self._preferred_file(files)
 			
 			if result.returncode == 0:
-				# Find the captured file
-				possible_extensions = ['.jpg', '.jpeg', '.cr2', '.cr3', '.nef', '.arw', '.dng']
-				captured_file = None
-				
-				for ext in possible_extensions:
-					test_path = os.path.join(save_path, filename + ext)
-					if os.path.exists(test_path):
-						captured_file = test_path
-						break
-				
-				if not captured_file:
-					# Look for any recently created file in the directory
-					try:
-						files = [f for f in os.listdir(save_path) if f.startswith(filename)]
-						if files:
-							captured_file = os.path.join(save_path, files[0])
-					except:
-						pass
-				
-				if captured_file and os.path.exists(captured_file):
+				if captured_file:
 					return True, captured_file, "Photo captured successfully"
 				else:
 					return True, None, "Photo captured but file location unknown"
@@ -187,40 +529,23 @@ class DigiCamControlBackend:
 		
 		try:
 			os.makedirs(save_path, exist_ok=True)
-			
-			# Set the capture folder
-			self._run_dcc_command("set", "session.folder", save_path)
+
+			# One template for the whole burst; the counter keeps the names apart
+			base, template = self._session_template(filename_prefix)
+			self._set_session(save_path, template)
 			
 			for i in range(count):
-				# Generate unique filename for each shot
-				timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-				filename = f"{filename_prefix}_burst_{i+1:03d}_{timestamp}"
-				
-				# Set filename template
-				self._run_dcc_command("set", "session.filenametemplate", filename)
-				
 				# Capture photo
-				result = self._run_dcc_command("capture")
+				result, files = self._capture_one(save_path, base)
+				captured_file = self._preferred_file(files)
 				
 				if result.returncode == 0:
-					# Find the captured file
-					possible_extensions = ['.jpg', '.jpeg', '.cr2', '.cr3', '.nef', '.arw', '.dng']
-					captured_file = None
-					
-					for ext in possible_extensions:
-						test_path = os.path.join(save_path, filename + ext)
-						if os.path.exists(test_path):
-							captured_file = test_path
-							break
-					
 					if captured_file:
 						captured_files.append(captured_file)
 					
 					# Wait between captures if interval specified
 					if interval > 0 and i < count - 1:
 						time.sleep(interval)
-					elif i < count - 1:
-						time.sleep(0.5)  # Minimum delay between shots
 				else:
 					error_msg = result.stderr.strip() if result.stderr else f"Capture {i+1} failed"
 					return False, captured_files, f"Burst capture failed at photo {i+1}: {error_msg}"
@@ -230,22 +555,308 @@ class DigiCamControlBackend:
 		except Exception as e:
 			return False, captured_files, f"Burst capture error: {str(e)}"
 	
-	def get_camera_info(self):
-		"""Get basic camera information"""
+class GPhoto2Backend(CameraBackend):
+	"""macOS / Linux camera backend using libgphoto2"""
+
+	name = "gphoto2"
+	CAPABILITIES = frozenset([
+		FEATURE_SETTINGS,
+		FEATURE_BATCHED_SETTINGS,
+		FEATURE_CONFIG_CACHE,
+		FEATURE_LIVE_VIEW,
+		FEATURE_PIPELINED_CAPTURE,
+		FEATURE_IN_MEMORY_FRAMES,
+		FEATURE_CAMERA_EVENTS,
+	])
+
+	# Events read after the first one of a burst (CAPTURE_COMPLETE is followed by
+	# its FILE_ADDED events), and how long to wait for each of them (ms)
+	MAX_EVENTS = 100
+	EVENT_DRAIN_TIMEOUT = 100
+
+	def __init__(self, queue_depth=2, gp_module=None):
+		"""gp_module replaces the gphoto2 module, e.g. simulated_camera for runs without hardware"""
+		self.gp = gp_module
+		self.camera = None
+		self.context = None
+		self.config_cache = None
+		self.camera_lock = threading.RLock()  # Shared by the caller's camera thread and the pipeline stages
+		self.connected = False
+		self.camera_model = ""
+		self.queue_depth = queue_depth
+		self.preview_file = None  # CameraFile reused for every live view frame
+
+	def _load_gphoto2(self):
+		"""Import gphoto2 on first use so importing this module stays cheap"""
+		if self.gp is None:
+			import gphoto2
+			self.gp = gphoto2
+		if self.context is None:
+			self.context = self.gp.Context()
+		return self.gp
+
+	def connect_camera(self):
+		"""Detect and initialise the first camera; returns (success, model or error message)"""
 		try:
-			info = {}
+			gp = self._load_gphoto2()
+			camera_list = gp.check_result(gp.gp_camera_autodetect())
+			if not camera_list:
+				return False, "No camera found. Please check connection."
 
-			if self.connected:
-				info['model'] = self.camera_model
-				info['status'] = "Connected"
-			else:
-				info['model'] = "No camera"
-				info['status'] = "Not connected"
+			camera = gp.Camera()
+			camera.init(self.context)
+			self.camera = camera
 
-			return info
+			# Keep the widget tree in memory; reads are served from the cache
+			self.config_cache = CameraConfigCache(self.camera, self.context)
+			self.camera_model = self.camera.get_abilities().model
+			self.connected = True
+			return True, self.camera_model
 
 		except Exception as e:
-			return {'error': str(e)}
+			self.camera = None
+			self.config_cache = None
+			return False, f"Connection failed: {str(e)}"
+
+	def disconnect_camera(self):
+		"""Release the camera"""
+		try:
+			if self.camera:
+				self.camera.exit(self.context)
+			return True
+		except Exception:
+			return False
+		finally:
+			self.camera = None
+			self.config_cache = None
+			self.preview_file = None
+			self.connected = False
+			self.camera_model = ""
+
+	def apply_settings(self, settings):
+		"""Write {name: value} settings in one push; returns (write path, seconds)"""
+		if not self.camera:
+			raise RuntimeError("Camera not connected")
+		return self.config_cache.set_many(settings)
+
+	def capture_sequence(self, save_path, filename_prefix, count=1, interval=0,
+			on_shot=None, on_progress=None, on_saved=None, on_error=None):
+		"""
+		Capture count frames through the staged pipeline.
+		The calling thread triggers and downloads; saving and deleting from the
+		camera run on the pipeline threads, so on_saved is called on the save
+		thread. Frames passed to on_shot still hold the downloaded
+		'camera_file', which is dropped once saved. A frame is deleted from the
+		camera only after it was saved; the first failed save ends the sequence
+		and keeps every later frame on the camera. GPhoto2 errors from
+		trigger/download are raised to the caller.
+		"""
+		if not self.camera:
+			raise RuntimeError("Camera not connected")
+		gp = self.gp
+
+		os.makedirs(save_path, exist_ok=True)
+
+		# Back-pressure from the bounded save queue replaces a fixed delay between shots
+		pipeline = self._start_pipeline(on_saved, on_error)
+
+		shots = []
+		try:
+			for i in range(count):
+				if pipeline.save_failed.is_set():
+					# Saving failed (disk full, bad folder): stop before more frames pile up on the camera
+					logging.error("Capture stopped: a frame could not be saved and was kept on the camera")
+					break
+				if on_progress:
+					on_progress(i, count)
+
+				# Generate filename
+				timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+				if count > 1:
+					filename = f"{filename_prefix}_{timestamp}_{i+1:03d}.jpg"
+				else:
+					filename = f"{filename_prefix}_{timestamp}.jpg"
+
+				with self.camera_lock:
+					trigger_start = time.perf_counter()
+					file_path = self.camera.capture(gp.GP_CAPTURE_IMAGE, self.context)
+					timings = {'trigger': time.perf_counter() - trigger_start}
+					frame = self._download(file_path, i, os.path.join(save_path, filename), timings)
+
+				shots.append(frame)
+				if on_shot:
+					on_shot(frame)
+				pipeline.submit(frame, trigger_time=frame['timings']['trigger'] + frame['timings']['download'])
+
+				# Interval wait
+				if i < count - 1 and interval > 0:
+					time.sleep(interval)
+		except self.gp.GPhoto2Error:
+			# Camera state is unknown; re-read the widget tree next time
+			if self.config_cache:
+				self.config_cache.invalidate("capture failed")
+			raise
+		finally:
+			stats = pipeline.finish()
+
+		stats['shots'] = shots
+		return stats
+
+	def wait_for_events(self, timeout=10):
+		"""
+		Handle pending camera events (timeout in ms for the first one).
+		Property changes invalidate the setting cache. Returns the CameraFilePaths
+		of files the camera added by itself, e.g. shots taken with the shutter
+		button on the body, for fetch_files().
+		"""
+		if not self.camera:
+			return []
+		gp = self.gp
+		added = []
+		for _ in range(self.MAX_EVENTS):
+			with self.camera_lock:
+				event_type, event_data = self.camera.wait_for_event(timeout, self.context)
+			if event_type == gp.GP_EVENT_TIMEOUT:
+				break
+			if event_type == gp.GP_EVENT_FILE_ADDED:
+				added.append(event_data)
+			elif self.config_cache:
+				self.config_cache.handle_event(event_type, event_data)
+			# Collect the rest of the burst (e.g. the JPEG of a RAW+JPEG shot)
+			timeout = self.EVENT_DRAIN_TIMEOUT
+		return added
+
+	def fetch_files(self, paths, save_path, filename_prefix, on_shot=None, on_saved=None, on_error=None, delete=False):
+		"""
+		Download files the camera added by itself (see wait_for_events) and save
+		them through the capture pipeline, with the same callbacks and frames as
+		capture_sequence. Files keep their camera extension and name stem, so a
+		RAW+JPEG pair stays one shot. The user shot these to the card, so they
+		stay there unless delete=True (then only once saved).
+		"""
+		if not self.camera:
+			raise RuntimeError("Camera not connected")
+		os.makedirs(save_path, exist_ok=True)
+
+		pipeline = self._start_pipeline(on_saved, on_error, delete=delete)
+		timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+		shots = []
+		try:
+			for i, file_path in enumerate(paths):
+				if pipeline.save_failed.is_set():
+					break
+				filename = f"{filename_prefix}_{timestamp}_{file_path.name}"
+				with self.camera_lock:
+					frame = self._download(file_path, i, os.path.join(save_path, filename))
+				shots.append(frame)
+				if on_shot:
+					on_shot(frame)
+				pipeline.submit(frame, trigger_time=frame['timings']['download'])
+		except self.gp.GPhoto2Error:
+			if self.config_cache:
+				self.config_cache.invalidate("download failed")
+			raise
+		finally:
+			stats = pipeline.finish()
+
+		stats['shots'] = shots
+		return stats
+
+	def _start_pipeline(self, on_saved, on_error, delete=True):
+		pipeline = CapturePipeline(
+			save_stage=self._save_frame,
+			delete_stage=self._delete_frame if delete else None,
+			queue_depth=self.queue_depth,
+			on_saved=on_saved,
+			on_error=on_error
+		)
+		pipeline.start()
+		return pipeline
+
+	def _download(self, file_path, index, target_path, timings=None):
+		"""Download one camera file into memory (caller holds camera_lock); returns the frame"""
+		gp = self.gp
+		timings = dict(timings or {})
+		download_start = time.perf_counter()
+		camera_file = gp.CameraFile()
+		self.camera.file_get(
+			file_path.folder, file_path.name,
+			gp.GP_FILE_TYPE_NORMAL, camera_file, self.context
+		)
+		timings['download'] = time.perf_counter() - download_start
+		return {
+			'index': index,
+			'folder': file_path.folder,
+			'name': file_path.name,
+			'camera_file': camera_file,
+			'filename': os.path.basename(target_path),
+			'target_path': target_path,
+			'timings': timings,
+		}
+
+	def _save_frame(self, frame):
+		"""Pipeline save stage: write the downloaded buffer straight to disk"""
+		start = time.perf_counter()
+		# Release the buffer once written; long bursts keep only the frame records
+		camera_file = frame.pop('camera_file')
+		buffer = memoryview(camera_file.get_data_and_size())
+		with open(frame['target_path'], 'wb') as f:
+			f.write(buffer)
+		frame['timings']['save'] = time.perf_counter() - start
+
+	def _delete_frame(self, frame):
+		"""Pipeline delete stage: free the file on the camera"""
+		start = time.perf_counter()
+		with self.camera_lock:
+			self.camera.file_delete(frame['folder'], frame['name'], self.context)
+		frame['timings']['delete'] = time.perf_counter() - start
+
+	def capture_photo(self, save_path, filename_prefix="IMG"):
+		"""Capture photo"""
+		try:
+			stats = self.capture_sequence(save_path, filename_prefix, count=1)
+			if stats['frames']:
+				return True, stats['shots'][0]['target_path'], "Photo captured successfully"
+			return False, None, "Capture failed: photo could not be saved"
+		except Exception as e:
+			return False, None, f"Capture error: {str(e)}"
+
+	def burst_capture(self, save_path, filename_prefix, count, interval=0):
+		"""Capture multiple photos in burst mode"""
+		saved = []
+		try:
+			self.capture_sequence(
+				save_path, filename_prefix, count, interval,
+				on_saved=lambda frame: saved.append(frame['target_path'])
+			)
+			return True, saved, f"Successfully captured {len(saved)} photos"
+		except Exception as e:
+			return False, saved, f"Burst capture error: {str(e)}"
+
+	def capture_preview(self):
+		"""Grab one live view frame; returns a copy of the JPEG data"""
+		if not self.camera:
+			raise RuntimeError("Camera not connected")
+		with self.camera_lock:
+			if self.preview_file is None:
+				self.preview_file = self.gp.CameraFile()
+			try:
+				# Reuse the same CameraFile for every frame
+				returned = self.camera.capture_preview(self.preview_file, self.context)
+				if returned is not None:
+					self.preview_file = returned
+			except TypeError:
+				# Older python-gphoto2 only accepts the context
+				self.preview_file = self.camera.capture_preview(self.context)
+			# Copy: the next frame overwrites the reused buffer
+			return bytes(memoryview(self.preview_file.get_data_and_size()))
+
+	def stop_live_view(self):
+		"""Close the viewfinder (lowers the mirror on DSLRs)"""
+		self.preview_file = None
+		if self.camera and self.config_cache:
+			if self.config_cache.get_index().get('viewfinder') is not None:
+				self.config_cache.set('viewfinder', 0)
 
 
 # Example usage and testing
@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+"""
+Camera Configuration Cache for pyCameraControl
+Keeps the gPhoto2 widget tree in memory after connect so reads do not cost a
+full get_config round trip. Writes use gp_camera_set_single_config when the
+driver supports it and otherwise modify the cached widget and push the tree
+back; libgphoto2 only sends widgets whose changed flag is set, so a push only
+touches the settings that were actually modified.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+
+# libgphoto2 error code for operations a driver or body does not support
+GP_ERROR_NOT_SUPPORTED = -6
+
+# Settings whose change alters the choices of other widgets (mode dial etc.)
+MODE_SETTINGS = ('autoexposuremode', 'autoexposuremodedial', 'expprogram', 'exposuremode', 'capturemode')
+
+
+def _widget_children(widget):
+	"""Children of a widget, using the iterator API when the bindings provide it"""
+	if hasattr(widget, 'get_children'):
+		return list(widget.get_children())
+	return [widget.get_child(i) for i in range(widget.count_children())]
+
+
+def _widget_choices(widget):
+	"""Choices of a widget, using the iterator API when the bindings provide it"""
+	if hasattr(widget, 'get_choices'):
+		return list(widget.get_choices())
+	return [widget.get_choice(i) for i in range(widget.count_choices())]
+
+
+class ConfigIndex:
+	"""
+	Lookup table for a config tree built with a single traversal.
+	Maps short names and full paths to widgets; short names resolve to the
+	first match in depth-first order, like get_child_by_name.
+	"""
+
+	def __init__(self, config):
+		self.by_name = {}
+		self.by_path = {}
+		self.entries = []  # (full_path, name, level) in tree order
+		self.types = {}
+		self.choices = {}
+		self._build(config)
+
+	def _build(self, config):
+		stack = [(child, "", 0) for child in reversed(_widget_children(config))]
+		while stack:
+			widget, prefix, level = stack.pop()
+			try:
+				name = widget.get_name()
+			except Exception:
+				continue
+			full_path = f"{prefix}/{name}" if prefix else name
+			if full_path in self.by_path:
+				continue
+
+			self.by_path[full_path] = widget
+			self.by_name.setdefault(name, full_path)
+			self.entries.append((full_path, name, level))
+			try:
+				self.types[full_path] = widget.get_type()
+				children = _widget_children(widget)
+			except Exception:
+				children = []
+			for child in reversed(children):
+				stack.append((child, full_path, level + 1))
+
+	def resolve(self, key):
+		"""Return the full path for a short name or path, or None"""
+		key = key.strip('/')
+		if key in self.by_path:
+			return key
+		return self.by_name.get(key)
+
+	def get(self, key):
+		"""Return the widget for a short name or full path, or None"""
+		path = self.resolve(key)
+		return self.by_path.get(path) if path else None
+
+	def get_type(self, key):
+		path = self.resolve(key)
+		return self.types.get(path) if path else None
+
+	def get_choices(self, key):
+		"""Return (and remember) the choice list of a widget"""
+		path = self.resolve(key)
+		if path is None:
+			return []
+		if path not in self.choices:
+			try:
+				self.choices[path] = _widget_choices(self.by_path[path])
+			except Exception:
+				self.choices[path] = []
+		return self.choices[path]
+
+	def find(self, names, require_choices=True):
+		"""Return (full_path, widget) for the first of names present in the tree, or None"""
+		for name in names:
+			path = self.resolve(name)
+			if path is None:
+				continue
+			if require_choices and not self.get_choices(path):
+				continue
+			return path, self.by_path[path]
+		return None
+
+
+class CameraConfigCache:
+	"""In-memory camera widget tree with dirty tracking"""
+
+	def __init__(self, camera, context):
+		self.camera = camera
+		self.context = context
+		self.config = None
+		self.index = None
+		self.stale = True
+		self.dirty = set()  # setting names modified locally but not pushed yet
+		self.lock = threading.RLock()
+
+		# None = not tried yet, True/False once the driver answered
+		self.single_config_supported = None
+		self.single_unsupported = set()  # widgets this body refuses to write with set_single_config
+		self.last_write = None
+
+		# Statistics
+		self.hits = 0
+		self.misses = 0
+		self.pushes = 0
+		self.single_writes = 0
+		self.tree_writes = 0
+
+	def get_config(self):
+		"""Return the cached widget tree, fetching it from the camera when stale"""
+		with self.lock:
+			if self.stale or self.config is None:
+				self.misses += 1
+				self.refresh()
+			else:
+				self.hits += 1
+			return self.config
+
+	def refresh(self):
+		"""Fetch the full widget tree from the camera"""
+		with self.lock:
+			self.config = self.camera.get_config(self.context)
+			self.index = ConfigIndex(self.config)
+			self.stale = False
+			self.dirty.clear()
+			return self.config
+
+	def invalidate(self, reason=""):
+		"""Mark the cached tree as stale; the next read refetches it"""
+		with self.lock:
+			self.stale = True
+			if reason:
+				logging.info(f"Config cache invalidated: {reason}")
+
+	def get_index(self):
+		"""Return the name/path index of the cached tree"""
+		with self.lock:
+			self.get_config()
+			return self.index
+
+	def get_widget(self, name):
+		"""Return a widget from the cached tree by short name or full path"""
+		widget = self.get_index().get(name)
+		if widget is None:
+			raise KeyError(f"Setting not found: {name}")
+		return widget
+
+	def get_value(self, name):
+		"""Return the current value of a setting from the cached tree"""
+		return self.get_widget(name).get_value()
+
+	def set_value(self, name, value):
+		"""Change a setting in the cached tree without pushing it"""
+		with self.lock:
+			widget = self.get_widget(name)
+			widget.set_value(str(value))
+			self.dirty.add(name)
+
+	def push(self):
+		"""Push locally modified settings to the camera"""
+		with self.lock:
+			if not self.dirty:
+				return []
+			pushed = sorted(self.dirty)
+			try:
+				self.camera.set_config(self.config, self.context)
+			except Exception:
+				# Camera state is unknown after a failed write
+				self.invalidate("set_config failed")
+				raise
+			self.dirty.clear()
+			self.pushes += 1
+			if any(name in MODE_SETTINGS for name in pushed):
+				self.invalidate("mode changed")
+			return pushed
+
+	def set(self, name, value):
+		"""
+		Change a single setting on the camera.
+		Returns (path, elapsed) where path is 'single' or 'tree'.
+		"""
+		with self.lock:
+			start = time.perf_counter()
+			path = 'tree'
+
+			if self.single_config_supported is not False and name not in self.single_unsupported:
+				try:
+					self._set_single(name, value)
+					path = 'single'
+					if self.single_config_supported is None:
+						self.single_config_supported = True
+				except Exception as e:
+					if self.single_config_supported:
+						if getattr(e, 'code', None) != GP_ERROR_NOT_SUPPORTED:
+							raise
+						# Some bodies refuse single config for particular widgets only
+						self.single_unsupported.add(name)
+					# Not known to work (for this widget) - let the full tree path decide
+					logging.info(f"Single config set for {name} failed ({e}), trying full tree")
+
+			if path == 'tree':
+				self.set_value(name, value)
+				self.push()
+				if self.single_config_supported is None:
+					self.single_config_supported = False
+				self.tree_writes += 1
+			else:
+				self.single_writes += 1
+				if name in MODE_SETTINGS:
+					self.invalidate("mode changed")
+
+			elapsed = time.perf_counter() - start
+			self.last_write = {'name': name, 'value': value, 'path': path, 'elapsed': elapsed}
+			return path, elapsed
+
+	def set_many(self, settings):
+		"""
+		Apply several settings with one config push.
+		Returns (path, elapsed); a single setting goes through set().
+		"""
+		if len(settings) == 1:
+			name, value = next(iter(settings.items()))
+			return self.set(name, value)
+
+		with self.lock:
+			start = time.perf_counter()
+			try:
+				for name, value in settings.items():
+					self.set_value(name, value)
+				self.push()
+			except Exception:
+				# Do not leave half-applied values in the cached tree
+				self.dirty.clear()
+				self.invalidate("batch write failed")
+				raise
+			self.tree_writes += 1
+
+			elapsed = time.perf_counter() - start
+			self.last_write = {'name': ', '.join(settings), 'value': None, 'path': 'tree', 'elapsed': elapsed}
+			return 'tree', elapsed
+
+	def _set_single(self, name, value):
+		"""Write one widget with gp_camera_get/set_single_config"""
+		widget = self.camera.get_single_config(name, self.context)
+		widget.set_value(str(value))
+		self.camera.set_single_config(name, widget, self.context)
+
+		# Keep the cached tree in sync without fetching it again
+		if self.config is not None and not self.stale:
+			try:
+				widget = self.index.get(name)
+				widget.set_value(str(value))
+				# Already on the camera: the next tree push must not send it again
+				widget.set_changed(False)
+			except Exception:
+				self.invalidate(f"{name} missing from cached tree")
+
+	def handle_event(self, event_type, event_data):
+		"""Invalidate the cache when the camera reports a property change (e.g. mode dial)"""
+		if isinstance(event_data, str) and 'Property' in event_data and 'changed' in event_data:
+			self.invalidate(event_data.strip())
+
+	def get_stats(self):
+		"""Return cache hit/miss counters"""
+		total = self.hits + self.misses
+		return {
+			'hits': self.hits,
+			'misses': self.misses,
+			'pushes': self.pushes,
+			'single_writes': self.single_writes,
+			'tree_writes': self.tree_writes,
+			'single_config_supported': self.single_config_supported,
+			'single_unsupported': sorted(self.single_unsupported),
+			'last_write': self.last_write,
+			'hit_rate': self.hits / total if total else 0,
+			'stale': self.stale,
+			'dirty': sorted(self.dirty),
+		}
+
+
+class SettingWriteQueue:
+	"""Pending setting writes coalesced per setting name (last value wins)"""
+
+	def __init__(self):
+		self.pending = {}
+		self.lock = threading.Lock()
+		self.flush_scheduled = False
+		self.in_flight = False
+		self.idle = threading.Event()
+		self.idle.set()
+
+	def put(self, name, value):
+		"""
+		Queue a write. Returns True when the caller has to schedule a flush;
+		further writes before that flush runs are merged into it.
+		"""
+		with self.lock:
+			self.pending[name] = value
+			self.idle.clear()
+			if self.flush_scheduled:
+				return False
+			self.flush_scheduled = True
+			return True
+
+	def take(self):
+		"""Take all pending writes as one batch (called by the flush)"""
+		with self.lock:
+			batch = self.pending
+			self.pending = {}
+			self.flush_scheduled = False
+			self.in_flight = bool(batch)
+			if not batch:
+				self.idle.set()
+			return batch
+
+	def done(self):
+		"""Mark the batch returned by take() as applied"""
+		with self.lock:
+			self.in_flight = False
+			if not self.pending:
+				self.idle.set()
+
+	def is_pending(self):
+		"""True while writes are queued or being applied"""
+		return not self.idle.is_set()
+
+	def wait_idle(self, timeout=None):
+		"""Block until all queued writes have been applied"""
+		return self.idle.wait(timeout)
+
+
+# Settings probed after connect to populate the UI
+CAPABILITY_SETTINGS = (
+	'whitebalance', 'iso', 'f-number', 'shutterspeed', 'imagequality',
+	'exposurecompensation', 'meteringmode', 'focusmode', 'capturetarget'
+)
+
+
+class CameraCapabilities:
+	"""Plain snapshot of probed settings (choices and current values)"""
+
+	def __init__(self, model=""):
+		self.model = model
+		self.settings = {}  # name -> {'path': ..., 'choices': [...], 'current': ...}
+		self.shutter_display_map = {}  # display value -> camera value
+		self.probe_time = 0.0
+		self.from_cache = False
+
+	def has(self, name):
+		return name in self.settings
+
+	def get_choices(self, name):
+		return self.settings.get(name, {}).get('choices', [])
+
+	def get_current(self, name):
+		return self.settings.get(name, {}).get('current')
+
+	def same_as(self, other):
+		"""True when both snapshots hold the same choices and current values"""
+		return other is not None and self.settings == other.settings
+
+	def to_dict(self):
+		return {
+			'model': self.model,
+			'settings': self.settings,
+			'shutter_display_map': self.shutter_display_map,
+			'probe_time': self.probe_time,
+		}
+
+	@classmethod
+	def from_dict(cls, data):
+		snapshot = cls(data.get('model', ""))
+		snapshot.settings = data.get('settings', {})
+		snapshot.shutter_display_map = data.get('shutter_display_map', {})
+		snapshot.probe_time = data.get('probe_time', 0.0)
+		snapshot.from_cache = True
+		return snapshot
+
+
+# Identity widgets tried in order; names differ between vendors
+SERIAL_SETTINGS = ('serialnumber', 'eosserialnumber')
+FIRMWARE_SETTINGS = ('deviceversion', 'firmwareversion')
+
+
+def read_camera_identity(camera, context):
+	"""
+	Read serial number and firmware version with single-widget reads.
+	Returns (serial, firmware); values that cannot be read are empty strings.
+	"""
+	def read_first(names):
+		for name in names:
+			try:
+				value = camera.get_single_config(name, context).get_value()
+				if value:
+					return str(value).strip()
+			except Exception:
+				continue
+		return ""
+
+	return read_first(SERIAL_SETTINGS), read_first(FIRMWARE_SETTINGS)
+
+
+class CapabilityStore:
+	"""Capability snapshots persisted on disk, keyed by model, serial and firmware"""
+
+	def __init__(self, path=None):
+		if path is None:
+			path = os.path.join(os.path.expanduser("~"), ".pyCameraControl", "capabilities.json")
+		self.path = path
+		self.lock = threading.Lock()
+		self.entries = None
+
+	@staticmethod
+	def make_key(model, serial="", firmware=""):
+		return f"{model}|{serial}|{firmware}"
+
+	def _load_entries(self):
+		if self.entries is None:
+			try:
+				with open(self.path, 'r', encoding='utf-8') as f:
+					self.entries = json.load(f)
+			except (OSError, ValueError):
+				self.entries = {}
+		return self.entries
+
+	def load(self, key):
+		"""Return the stored snapshot for a camera or None"""
+		with self.lock:
+			data = self._load_entries().get(key)
+		if not data:
+			return None
+		try:
+			return CameraCapabilities.from_dict(data)
+		except Exception:
+			return None
+
+	def save(self, key, snapshot):
+		"""Store a snapshot and write the file atomically"""
+		with self.lock:
+			entries = self._load_entries()
+			entries[key] = snapshot.to_dict()
+			try:
+				os.makedirs(os.path.dirname(self.path), exist_ok=True)
+				tmp_path = self.path + ".tmp"
+				with open(tmp_path, 'w', encoding='utf-8') as f:
+					json.dump(entries, f, ensure_ascii=False, indent=1)
+				os.replace(tmp_path, self.path)
+			except OSError as e:
+				logging.warning(f"Could not save capability cache: {e}")
+
+
+def probe_capabilities(index, names=CAPABILITY_SETTINGS, model=""):
+	"""Collect choices/current values for the wanted settings from a ConfigIndex"""
+	start = time.perf_counter()
+	snapshot = CameraCapabilities(model)
+
+	for name in names:
+		found = index.find((name,))
+		if not found:
+			continue
+		full_path, widget = found
+		try:
+			snapshot.settings[name] = {
+				'path': full_path,
+				'choices': index.get_choices(full_path),
+				'current': widget.get_value(),
+			}
+		except Exception:
+			continue
+
+	snapshot.probe_time = time.perf_counter() - start
+	return snapshot
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Headless Capture Runner for pyCameraControl
+Runs single, burst and interval captures without a window, using the same
+camera backends as the Tk interfaces. Nothing here imports tkinter or PIL, so
+it starts quickly on headless machines. Every event is printed to stdout as
+one JSON object per line (times in milliseconds).
+
+Examples:
+  python capture_cli.py --backend gphoto2 --mode burst --count 10
+  python capture_cli.py --backend digicam --mode interval --count 20 --interval 5
+  python capture_cli.py --set iso=100 --set shutterspeed=1/125
+  python capture_cli.py --backend simulated --mode burst --count 20
+  python capture_cli.py --backend digicam --dcc-path fake_dcc_remote.py --mode burst --count 5
+"""
+
+import time
+
+PROCESS_START = time.perf_counter()
+
+import argparse
+import json
+import sys
+import threading
+
+from camera_backends import DigiCamControlBackend, GPhoto2Backend, FEATURE_SETTINGS
+import simulated_camera
+
+
+BACKENDS = {
+	'gphoto2': GPhoto2Backend,
+	'digicam': DigiCamControlBackend,
+	'simulated': lambda: GPhoto2Backend(gp_module=simulated_camera),
+}
+
+
+def _ms(seconds):
+	return round(seconds * 1000, 2) if seconds is not None else None
+
+
+class JSONLinesReporter:
+	"""Writes one JSON object per line; safe to call from pipeline threads"""
+
+	def __init__(self, stream=None):
+		self.stream = stream or sys.stdout
+		self.lock = threading.Lock()
+		self.run_start = time.perf_counter()
+
+	def emit(self, event, **fields):
+		record = {'event': event, 't': _ms(time.perf_counter() - self.run_start)}
+		record.update(fields)
+		with self.lock:
+			self.stream.write(json.dumps(record) + "\n")
+			self.stream.flush()
+
+
+def parse_settings(items):
+	"""['iso=100', 'shutterspeed=1/125'] -> {'iso': '100', 'shutterspeed': '1/125'}"""
+	settings = {}
+	for item in items or []:
+		name, sep, value = item.partition("=")
+		if not sep or not name:
+			raise ValueError(f"Invalid setting '{item}', expected name=value")
+		settings[name.strip()] = value.strip()
+	return settings
+
+
+def run_capture(backend, args, reporter):
+	"""Capture through backend.capture_sequence; per-shot lines are written as frames are saved"""
+	def on_saved(frame):
+		fields = {f"{stage}_ms": _ms(seconds) for stage, seconds in frame['timings'].items()}
+		reporter.emit('shot', index=frame['index'] + 1, path=frame['target_path'], **fields)
+
+	def on_error(frame, e):
+		reporter.emit('error', index=frame['index'] + 1, stage='capture', message=str(e))
+
+	stats = backend.capture_sequence(
+		args.save_path, args.prefix, args.count, args.interval,
+		on_saved=on_saved, on_error=on_error
+	)
+
+	summary = {
+		'frames': stats['frames'],
+		'failed': stats['failed'],
+		'elapsed_s': round(stats['elapsed'], 3),
+		'frames_per_minute': round(stats['frames_per_minute'], 2),
+	}
+	# Per-stage averages over all shots (delete timings only exist once the pipeline finished)
+	stages = {}
+	for shot in stats['shots']:
+		for stage, seconds in shot['timings'].items():
+			stages.setdefault(stage, []).append(seconds)
+	for stage, values in stages.items():
+		summary[f"{stage}_avg_ms"] = _ms(sum(values) / len(values))
+	return summary
+
+
+def build_parser():
+	parser = argparse.ArgumentParser(description="pyCameraControl headless capture runner")
+	parser.add_argument("--backend", choices=sorted(BACKENDS), default="gphoto2",
+		help="camera backend (default: gphoto2)")
+	parser.add_argument("--mode", choices=["single", "burst", "interval"], default="single")
+	parser.add_argument("--count", type=int, default=1, help="shots for burst/interval mode")
+	parser.add_argument("--interval", type=float, default=0, help="seconds between shots in interval mode")
+	parser.add_argument("--save-path", default="./photos")
+	parser.add_argument("--prefix", default="IMG", help="filename prefix")
+	parser.add_argument("--dcc-path", default=None,
+		help="CameraControlRemoteCmd.exe location for the digicam backend (e.g. fake_dcc_remote.py)")
+	parser.add_argument("--set", dest="settings", action="append", metavar="NAME=VALUE",
+		help="camera setting applied before capturing (gphoto2, repeatable)")
+	return parser
+
+
+def main(argv=None):
+	args = build_parser().parse_args(argv)
+	if args.mode == "single":
+		args.count = 1
+	args.count = max(1, args.count)
+	args.interval = max(0, args.interval) if args.mode == "interval" else 0
+
+	reporter = JSONLinesReporter()
+	reporter.emit('startup', import_ms=_ms(reporter.run_start - PROCESS_START), backend=args.backend)
+
+	try:
+		settings = parse_settings(args.settings)
+		connect_start = time.perf_counter()
+		if args.backend == 'digicam':
+			backend = DigiCamControlBackend(dcc_path=args.dcc_path)
+		else:
+			backend = BACKENDS[args.backend]()
+		success, message = backend.connect_camera()
+		if not success:
+			reporter.emit('error', stage='connect', message=message)
+			return 1
+		reporter.emit(
+			'connected', model=message, connect_ms=_ms(time.perf_counter() - connect_start),
+			capabilities=sorted(backend.CAPABILITIES)
+		)
+	except Exception as e:
+		reporter.emit('error', stage='connect', message=str(e))
+		return 1
+
+	try:
+		if settings:
+			if not backend.supports(FEATURE_SETTINGS):
+				reporter.emit('error', stage='settings', message=f"{args.backend} backend does not support settings")
+				return 1
+			try:
+				path, elapsed = backend.apply_settings(settings)
+			except Exception as e:
+				reporter.emit('error', stage='settings', message=str(e))
+				return 1
+			reporter.emit('settings', settings=settings, path=path, apply_ms=_ms(elapsed))
+
+		summary = run_capture(backend, args, reporter)
+		reporter.emit('summary', mode=args.mode, **summary)
+		return 0 if not summary['failed'] else 2
+
+	except Exception as e:
+		reporter.emit('error', stage='capture', message=str(e))
+		return 1
+	finally:
+		backend.disconnect_camera()
+
+
+if __name__ == "__main__":
+	sys.exit(main())
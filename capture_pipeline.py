@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Capture Pipeline for pyCameraControl
+Staged capture -> save -> delete engine used for burst shooting.
+The camera thread only triggers and downloads frames; writing to disk and
+deleting the frame from the camera run on separate stage threads connected
+by bounded queues, so the next trigger can start while the previous frame
+is still being stored. Only frames that were written are deleted from the
+camera; after the first failed save no frame is deleted any more.
+"""
+
+import queue
+import threading
+import time
+
+
+class CapturePipeline:
+	"""Bounded multi-stage pipeline for captured frames"""
+
+	def __init__(self, save_stage, delete_stage=None, queue_depth=2, on_saved=None, on_error=None):
+		"""
+		save_stage(frame)   - writes the frame to disk, runs on the save thread
+		delete_stage(frame) - removes a saved frame from the camera, runs on the delete thread
+		queue_depth         - frames allowed to wait in front of each stage (back-pressure)
+		on_saved(frame)     - called after a frame has been written
+		on_error(frame, e)  - called when a stage raises
+		"""
+		self.save_stage = save_stage
+		self.delete_stage = delete_stage
+		self.on_saved = on_saved
+		self.on_error = on_error
+
+		self.save_queue = queue.Queue(maxsize=queue_depth)
+		self.delete_queue = queue.Queue(maxsize=queue_depth)
+		self.threads = []
+
+		self.stage_times = {'trigger': [], 'save': [], 'delete': []}
+		self.saved_count = 0
+		self.failed_count = 0
+		self.save_failed = threading.Event()  # set on the first failed save; callers stop triggering
+		self.started_at = None
+		self.finished_at = None
+
+	def start(self):
+		"""Start the stage threads"""
+		self.started_at = time.perf_counter()
+		self.threads = [threading.Thread(target=self._save_loop, name="pipeline-save", daemon=True)]
+		if self.delete_stage:
+			self.threads.append(threading.Thread(target=self._delete_loop, name="pipeline-delete", daemon=True))
+		for thread in self.threads:
+			thread.start()
+
+	def submit(self, frame, trigger_time=None):
+		"""Hand a downloaded frame to the save stage; blocks while the stage is full"""
+		if trigger_time is not None:
+			self.stage_times['trigger'].append(trigger_time)
+		self.save_queue.put(frame)
+
+	def finish(self):
+		"""Wait until every submitted frame has passed all stages and stop the threads"""
+		self.save_queue.put(None)
+		for thread in self.threads:
+			thread.join()
+		self.finished_at = time.perf_counter()
+		return self.get_stats()
+
+	def get_stats(self):
+		"""Return throughput and average per-stage timings"""
+		end = self.finished_at or time.perf_counter()
+		elapsed = end - self.started_at if self.started_at else 0
+		stats = {
+			'frames': self.saved_count,
+			'failed': self.failed_count,
+			'elapsed': elapsed,
+			'frames_per_minute': self.saved_count / elapsed * 60 if elapsed > 0 else 0,
+		}
+		for stage, times in self.stage_times.items():
+			stats[f'{stage}_avg'] = sum(times) / len(times) if times else 0
+		return stats
+
+	def _save_loop(self):
+		"""Save stage: write frames to disk and pass the saved ones on for deletion"""
+		while True:
+			frame = self.save_queue.get()
+			if frame is None:
+				if self.delete_stage:
+					self.delete_queue.put(None)
+				return
+
+			start = time.perf_counter()
+			try:
+				self.save_stage(frame)
+			except Exception as e:
+				# The frame only exists on the camera now: never delete it, nor any later frame
+				self.failed_count += 1
+				self.save_failed.set()
+				if self.on_error:
+					self.on_error(frame, e)
+				continue
+
+			self.stage_times['save'].append(time.perf_counter() - start)
+			self.saved_count += 1
+			if self.on_saved:
+				try:
+					self.on_saved(frame)
+				except Exception:
+					pass  # Observers must not stop the pipeline
+
+			if self.delete_stage and not self.save_failed.is_set():
+				self.delete_queue.put(frame)
+
+	def _delete_loop(self):
+		"""Delete stage: free the frame on the camera"""
+		while True:
+			frame = self.delete_queue.get()
+			if frame is None:
+				return
+
+			start = time.perf_counter()
+			try:
+				self.delete_stage(frame)
+				self.stage_times['delete'].append(time.perf_counter() - start)
+			except Exception:
+				pass  # Some cameras do not support deleting files
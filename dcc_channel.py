@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Persistent digiCamControl Channel for pyCameraControl
+Sends remote commands over one long-lived connection instead of starting
+CameraControlRemoteCmd.exe for every command. Messages are framed like
+digiCamControl's pipe strings (its StreamString class): a 2-byte big-endian
+byte count followed by the text in UTF-16LE (.NET UnicodeEncoding, no BOM).
+Requests use the same ":;key:value;" layout as the responses:
+
+  :;command:set;param1:session.folder;param2:C:/photos;
+
+Transports:
+  NamedPipeTransport  digiCamControl's DCCPipe named pipe (Windows)
+  ProcessTransport    a helper process speaking the framing on stdin/stdout
+                      (fake_dcc_remote.py --serve)
+Any transport or protocol failure raises ChannelError; the backend then
+falls back to running the command line utility. Commands that change camera
+state (capture, set) are never sent twice: once their request was written,
+a missing reply raises ChannelError instead of reconnecting and re-sending.
+"""
+
+import os
+import struct
+import subprocess
+import sys
+import threading
+
+
+DEFAULT_PIPE_NAME = "DCCPipe"
+MAX_FRAME = 0xFFFF
+FRAME_ENCODING = 'utf-16-le'
+
+# Commands that must not be re-sent after the request reached the server
+NON_IDEMPOTENT_COMMANDS = ("capture", "set")
+
+
+class ChannelError(Exception):
+	"""
+	The persistent channel cannot be used (not available, broken or unexpected
+	reply). sent=True means the request may already have reached the server.
+	"""
+
+	def __init__(self, message, sent=False):
+		super().__init__(message)
+		self.sent = sent
+
+
+def format_request(args):
+	"""('set', 'session.folder', 'C:/x') -> ':;command:set;param1:session.folder;param2:C:/x;'"""
+	if not args:
+		raise ChannelError("Empty command")
+	parts = [f"command:{args[0]}"]
+	parts.extend(f"param{i}:{value}" for i, value in enumerate(args[1:], 1))
+	return ":;" + ";".join(parts) + ";"
+
+
+def parse_request(text):
+	"""Inverse of format_request; returns the argument list"""
+	fields = {}
+	for part in text.strip().strip(":").split(";"):
+		key, sep, value = part.partition(":")
+		if sep:
+			fields[key] = value
+	if 'command' not in fields:
+		raise ValueError(f"Malformed request: {text}")
+	args = [fields['command']]
+	i = 1
+	while f"param{i}" in fields:
+		args.append(fields[f"param{i}"])
+		i += 1
+	return args
+
+
+def write_frame(stream, text):
+	data = text.encode(FRAME_ENCODING)
+	if len(data) > MAX_FRAME:
+		raise ChannelError("Message too long")
+	stream.write(struct.pack(">H", len(data)) + data)
+	stream.flush()
+
+
+def read_frame(stream):
+	"""Read one frame; returns None at end of stream"""
+	header = _read_exact(stream, 2)
+	if header is None:
+		return None
+	length = struct.unpack(">H", header)[0]
+	data = _read_exact(stream, length)
+	if data is None:
+		return None
+	return data.decode(FRAME_ENCODING, errors='replace').lstrip("\ufeff")
+
+
+def _read_exact(stream, size):
+	data = b""
+	while len(data) < size:
+		chunk = stream.read(size - len(data))
+		if not chunk:
+			return None
+		data += chunk
+	return data
+
+
+class NamedPipeTransport:
+	"""Windows named pipe; reconnects when the server closed the previous connection"""
+
+	def __init__(self, pipe_name=DEFAULT_PIPE_NAME):
+		self.path = r"\\.\pipe\{}".format(pipe_name)
+		self.pipe = None
+
+	def open(self):
+		if os.name != 'nt':
+			raise ChannelError("Named pipes are only available on Windows")
+		try:
+			self.pipe = open(self.path, 'r+b', buffering=0)
+		except OSError as e:
+			raise ChannelError(f"Cannot open {self.path}: {e}")
+
+	def exchange(self, text, resend=True):
+		"""
+		Send text and return the reply. The request is sent again on a new
+		connection only when the failure happened before or while writing it,
+		or when resend=True (idempotent commands).
+		"""
+		for attempt in range(2):
+			if self.pipe is None:
+				self.open()
+			written = False
+			try:
+				write_frame(self.pipe, text)
+				written = True
+				reply = read_frame(self.pipe)
+				if reply is not None:
+					return reply
+			except OSError:
+				pass
+			# The server may serve one message per connection
+			self.close()
+			if written and not resend:
+				raise ChannelError(f"No reply from {self.path} after sending {text}", sent=True)
+		raise ChannelError(f"No reply from {self.path}")
+
+	def close(self):
+		if self.pipe is not None:
+			try:
+				self.pipe.close()
+			except OSError:
+				pass
+			self.pipe = None
+
+
+class ProcessTransport:
+	"""Long-lived helper process exchanging frames over stdin/stdout"""
+
+	def __init__(self, command):
+		self.command = command
+		self.process = None
+
+	def open(self):
+		try:
+			self.process = subprocess.Popen(
+				self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+			)
+		except OSError as e:
+			raise ChannelError(f"Cannot start {' '.join(self.command)}: {e}")
+
+	def exchange(self, text, resend=True):
+		"""Send text and return the reply; a broken helper is restarted only before the next request"""
+		if self.process is None or self.process.poll() is not None:
+			self.open()
+		written = False
+		try:
+			write_frame(self.process.stdin, text)
+			written = True
+			reply = read_frame(self.process.stdout)
+		except OSError as e:
+			raise ChannelError(f"Helper process failed: {e}", sent=written)
+		if reply is None:
+			raise ChannelError("Helper process closed the channel", sent=True)
+		return reply
+
+	def close(self):
+		if self.process is not None:
+			try:
+				self.process.stdin.close()
+				self.process.wait(timeout=2)
+			except Exception:
+				try:
+					self.process.kill()
+				except OSError:
+					pass
+			self.process = None
+
+
+class DCCChannel:
+	"""Request/response wrapper with a per-request timeout"""
+
+	def __init__(self, transport):
+		self.transport = transport
+		self.lock = threading.Lock()
+
+	def request(self, args, timeout=30):
+		"""Send a command; returns the response text (':;response:...;')"""
+		text = format_request(args)
+		resend = args[0] not in NON_IDEMPOTENT_COMMANDS
+		result = {}
+
+		def exchange():
+			try:
+				result['reply'] = self.transport.exchange(text, resend=resend)
+			except Exception as e:
+				result['error'] = e
+
+		with self.lock:
+			# Run the blocking exchange on a helper thread so a hung server cannot block forever
+			worker = threading.Thread(target=exchange, daemon=True)
+			worker.start()
+			worker.join(timeout)
+			if worker.is_alive():
+				self.transport.close()
+				raise ChannelError(f"Command timed out: {text}", sent=True)
+		if 'error' in result:
+			error = result['error']
+			raise error if isinstance(error, ChannelError) else ChannelError(str(error))
+		reply = result['reply']
+		if ":;response:" not in reply:
+			raise ChannelError(f"Unexpected reply: {reply!r}", sent=True)
+		return reply
+
+	def close(self):
+		with self.lock:
+			self.transport.close()
+
+
+def open_channel(dcc_path, pipe_name=DEFAULT_PIPE_NAME):
+	"""Pick the transport for a Remote Utility path; returns None when none applies"""
+	if dcc_path and dcc_path.endswith(".py"):
+		# Stand-in utility: keep one instance running in serve mode
+		return DCCChannel(ProcessTransport([sys.executable, dcc_path, "--serve"]))
+	if os.name == 'nt':
+		return DCCChannel(NamedPipeTransport(pipe_name))
+	return None
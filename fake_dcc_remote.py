@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Fake digiCamControl Remote Utility for pyCameraControl
+Stand-in for CameraControlRemoteCmd.exe so DigiCamControlBackend can be run
+and benchmarked on Linux / macOS. Speaks the same command line protocol and
+prints the same ":;response:...;" lines:
+
+  fake_dcc_remote.py /c list cameras
+  fake_dcc_remote.py /c set session.folder <path>
+  fake_dcc_remote.py /c set session.filenametemplate <template>
+  fake_dcc_remote.py /c capture
+
+Session state is kept in a JSON file between invocations (every command is a
+separate process, as with the real utility). With --serve the script stays
+running and answers framed requests on stdin/stdout (see dcc_channel), which
+stands in for digiCamControl's persistent pipe. A capture returns once the
+shutter fired; the files are written afterwards by a detached writer process,
+like digiCamControl transferring them from the camera. JPEG files are real,
+decodable images (see simulated_camera.make_jpeg) padded to the file size;
+RAW files only have the right size.
+
+Point the backend at it with DigiCamControlBackend(dcc_path="fake_dcc_remote.py")
+or the DCC_REMOTE_PATH environment variable. Behaviour is configured with
+environment variables:
+  FAKE_DCC_STATE          state file (default: <tmp>/fake_dcc_state.json)
+  FAKE_DCC_CAMERA         camera id reported by "list cameras" ("" = no camera)
+  FAKE_DCC_FORMATS        extensions written per capture (default: "cr2,jpg")
+  FAKE_DCC_FILE_SIZE      bytes per file (default: 4194304)
+  FAKE_DCC_IMAGE_SIZE     pixel size of the JPEG files (default: 1920x1280)
+  FAKE_DCC_STARTUP_DELAY  seconds added to every command (process start-up)
+  FAKE_DCC_CAPTURE_DELAY  seconds the capture command blocks (default: 0.3)
+  FAKE_DCC_TRANSFER_DELAY seconds before the first file appears (default: 0.2)
+  FAKE_DCC_WRITE_RATE     bytes per second while writing a file (0 = at once)
+"""
+
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from dcc_channel import parse_request, read_frame, write_frame
+from simulated_camera import make_jpeg
+
+
+DEFAULT_STATE = os.path.join(tempfile.gettempdir(), "fake_dcc_state.json")
+CHUNK_SIZE = 256 * 1024
+JPEG_EXTENSIONS = (".jpg", ".jpeg")
+
+
+def _env(name, default):
+	return os.environ.get(name, default)
+
+
+def _env_float(name, default):
+	try:
+		return float(os.environ.get(name, default))
+	except ValueError:
+		return default
+
+
+def load_state(path):
+	try:
+		with open(path, 'r', encoding='utf-8') as f:
+			return json.load(f)
+	except (OSError, ValueError):
+		return {'folder': os.getcwd(), 'template': "[Date yyyy-MM-dd-hh-mm-ss]", 'counter': 0}
+
+
+def save_state(path, state):
+	tmp_path = path + ".tmp"
+	with open(tmp_path, 'w', encoding='utf-8') as f:
+		json.dump(state, f)
+	os.replace(tmp_path, path)
+
+
+def expand_template(template, counter):
+	"""Expand the digiCamControl template variables the backend uses"""
+	name = template
+	if "[Counter 4 digit]" in name:
+		name = name.replace("[Counter 4 digit]", f"{counter:04d}")
+	if "[Date yyyy-MM-dd-hh-mm-ss]" in name:
+		name = name.replace("[Date yyyy-MM-dd-hh-mm-ss]", time.strftime("%Y-%m-%d-%H-%M-%S"))
+	return name
+
+
+def respond(value):
+	print(f":;response:{value};")
+
+
+def respond_error(message):
+	print(f":;response:error;message:{message};")
+
+
+def parse_size(text):
+	"""'1920x1280' -> (1920, 1280)"""
+	width, _, height = text.lower().partition("x")
+	return int(width), int(height)
+
+
+def write_files(paths, file_size, transfer_delay, write_rate):
+	"""Detached writer: create each file and fill it in chunks like a camera transfer"""
+	started = time.perf_counter()
+	image_size = parse_size(_env("FAKE_DCC_IMAGE_SIZE", "1920x1280"))
+	jpeg = make_jpeg(image_size, file_size)
+	raw = bytes(file_size)
+	# Encoding the JPEG counts towards the transfer delay
+	time.sleep(max(0, transfer_delay - (time.perf_counter() - started)))
+	for path in paths:
+		data = jpeg if path.lower().endswith(JPEG_EXTENSIONS) else raw
+		with open(path, 'wb') as f:
+			for offset in range(0, len(data), CHUNK_SIZE):
+				chunk = data[offset:offset + CHUNK_SIZE]
+				f.write(chunk)
+				if write_rate > 0:
+					f.flush()
+					time.sleep(len(chunk) / write_rate)
+
+
+def handle_command(args, state):
+	camera_id = _env("FAKE_DCC_CAMERA", "6241310")
+
+	if args[:2] == ["list", "cameras"]:
+		if not camera_id:
+			respond_error("no camera is connected")
+		else:
+			respond(f'["{camera_id}"]')
+		return 0
+
+	if not camera_id:
+		respond_error("no camera is connected")
+		return 0
+
+	if len(args) >= 3 and args[0] == "set":
+		key, value = args[1], " ".join(args[2:])
+		if key == "session.folder":
+			state['folder'] = value
+		elif key == "session.filenametemplate":
+			state['template'] = value
+		else:
+			respond_error(f"unknown property {key}")
+			return 0
+		respond("null")
+		return 0
+
+	if args[:1] == ["capture"]:
+		time.sleep(_env_float("FAKE_DCC_CAPTURE_DELAY", 0.3))
+		state['counter'] = state.get('counter', 0) + 1
+		os.makedirs(state['folder'], exist_ok=True)
+		base = os.path.join(state['folder'], expand_template(state['template'], state['counter']))
+		formats = [ext.strip() for ext in _env("FAKE_DCC_FORMATS", "cr2,jpg").split(",") if ext.strip()]
+		paths = [f"{base}.{ext}" for ext in formats]
+
+		# Files arrive after the command returned, like a real camera transfer
+		subprocess.Popen(
+			[sys.executable, os.path.abspath(__file__), "--write-files",
+				str(int(_env_float("FAKE_DCC_FILE_SIZE", 4 * 1024 * 1024))),
+				str(_env_float("FAKE_DCC_TRANSFER_DELAY", 0.2)),
+				str(_env_float("FAKE_DCC_WRITE_RATE", 0))] + paths,
+			stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+			start_new_session=True
+		)
+		respond("null")
+		return 0
+
+	respond_error(f"unknown command {' '.join(args)}")
+	return 1
+
+
+def serve(state_path):
+	"""Answer framed requests on stdin/stdout until stdin closes"""
+	state = load_state(state_path)
+	stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+	while True:
+		request = read_frame(stdin)
+		if request is None:
+			return 0
+		output = io.StringIO()
+		with contextlib.redirect_stdout(output):
+			try:
+				handle_command(parse_request(request), state)
+			except ValueError as e:
+				respond_error(str(e))
+		# Keep the state file current so the per-command fallback sees the same session
+		save_state(state_path, state)
+		write_frame(stdout, output.getvalue().strip())
+
+
+def main(argv=None):
+	argv = list(sys.argv[1:] if argv is None else argv)
+
+	if argv[:1] == ["--write-files"]:
+		file_size, transfer_delay, write_rate = int(argv[1]), float(argv[2]), float(argv[3])
+		write_files(argv[4:], file_size, transfer_delay, write_rate)
+		return 0
+
+	time.sleep(_env_float("FAKE_DCC_STARTUP_DELAY", 0))
+	state_path = _env("FAKE_DCC_STATE", DEFAULT_STATE)
+
+	if argv[:1] == ["--serve"]:
+		return serve(state_path)
+
+	if argv[:1] == ["/c"]:
+		argv = argv[1:]
+	if not argv:
+		respond_error("no command")
+		return 1
+
+	state = load_state(state_path)
+	result = handle_command(argv, state)
+	save_state(state_path, state)
+	return result
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,644 @@
+#!/usr/bin/env python3
+"""
+File Arrival Watching for pyCameraControl
+Tells when files written into a folder are complete, without listing the
+folder after every capture. Watchers with the same interface:
+
+  InotifyWatcher  Linux inotify (IN_CLOSE_WRITE / IN_MOVED_TO): a file is
+                  reported once its writer closed it
+  KqueueWatcher   macOS / BSD kqueue: the folder reports new entries, which
+                  are reported once their size stopped changing
+  WindowsWatcher  Windows ReadDirectoryChangesW: same, from the names the
+                  change notifications carry
+  PollingWatcher  any platform: scans the folder on an interval and reports a
+                  file once its size stopped changing
+
+create_watcher() picks the platform's change notifications and falls back to
+polling; the notifying watchers never list the folder on a timer, they only
+stat the new files until those are complete.
+wait_for_files() collects the files produced by one capture (e.g. a RAW+JPEG
+pair) with a timeout and reports how long they took to arrive.
+DirectoryIngest runs a watcher on a background thread and reports every
+completed image file in the save folder, including files written outside the
+application (e.g. with the shutter button on the camera body). Capture
+paths watching the same folder subscribe() to it instead of running a
+second watcher.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+# inotify constants (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0o2000000)
+
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+READ_SIZE = 64 * 1024
+
+# How often notifying watchers check the size of files still being written (s)
+SETTLE_INTERVAL = 0.1
+
+# Poll interval of the long-lived DirectoryIngest when no notifications exist (s)
+INGEST_POLL_INTERVAL = 2.0
+
+# Files DirectoryIngest reports (partial downloads and sidecars are ignored)
+IMAGE_EXTENSIONS = (
+	'.jpg', '.jpeg', '.png', '.tif', '.tiff',
+	'.cr2', '.cr3', '.nef', '.arw', '.dng', '.raf', '.orf', '.rw2'
+)
+
+
+class InotifyWatcher:
+	"""Reports files closed after writing (or moved in) in one folder (Linux)"""
+
+	method = "inotify"
+
+	def __init__(self, directory):
+		self.directory = directory
+		self.fd = None
+		self.overflowed = False  # events were lost; callers may rescan the folder
+
+	def start(self):
+		libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+		if not hasattr(libc, 'inotify_init1'):
+			raise OSError("inotify is not available")
+		fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+		if fd < 0:
+			errno = ctypes.get_errno()
+			raise OSError(errno, f"inotify_init1 failed: {os.strerror(errno)}")
+		wd = libc.inotify_add_watch(fd, os.fsencode(self.directory), IN_CLOSE_WRITE | IN_MOVED_TO)
+		if wd < 0:
+			errno = ctypes.get_errno()
+			os.close(fd)
+			raise OSError(errno, f"Cannot watch {self.directory}: {os.strerror(errno)}")
+		self.fd = fd
+		return self
+
+	def read(self, timeout=0):
+		"""Wait up to timeout seconds; returns [(file name, arrival time)] (time.perf_counter)"""
+		if self.fd is None:
+			return []
+		ready, _, _ = select.select([self.fd], [], [], max(0, timeout))
+		if not ready:
+			return []
+		try:
+			data = os.read(self.fd, READ_SIZE)
+		except BlockingIOError:
+			return []
+		arrived = time.perf_counter()
+
+		events = []
+		offset = 0
+		while offset + EVENT_HEADER.size <= len(data):
+			wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+			offset += EVENT_HEADER.size
+			name = data[offset:offset + length].rstrip(b"\0")
+			offset += length
+			if mask & IN_Q_OVERFLOW:
+				logging.warning(f"inotify queue overflow on {self.directory}, events were lost")
+				self.overflowed = True
+			elif name:
+				events.append((os.fsdecode(name), arrived))
+		return events
+
+	def close(self):
+		if self.fd is not None:
+			os.close(self.fd)
+			self.fd = None
+
+
+class PollingWatcher:
+	"""Fallback watcher: scans the folder and reports files whose size stopped changing"""
+
+	method = "polling"
+
+	def __init__(self, directory, interval=0.1):
+		self.directory = directory
+		self.interval = interval
+		self.pending = {}   # name -> size seen on the previous scan
+		self.known = set()  # names already reported or present at start
+		self.last_scan = None
+		self.overflowed = False
+
+	def _scan(self):
+		sizes = {}
+		try:
+			with os.scandir(self.directory) as entries:
+				for entry in entries:
+					if entry.name in self.known:
+						continue
+					try:
+						if entry.is_file():
+							sizes[entry.name] = entry.stat().st_size
+					except OSError:
+						pass
+		except OSError:
+			pass
+		return sizes
+
+	def start(self):
+		try:
+			self.known = set(os.listdir(self.directory))
+		except OSError:
+			self.known = set()
+		self.pending = {}
+		self.last_scan = None
+		return self
+
+	def read(self, timeout=0):
+		"""
+		Wait up to timeout seconds; returns [(file name, arrival time)] (time.perf_counter).
+		The folder is scanned at most once per interval (and on every read(0)).
+		"""
+		deadline = time.perf_counter() + max(0, timeout)
+		while True:
+			events = []
+			now = time.perf_counter()
+			if timeout <= 0 or self.last_scan is None or now - self.last_scan >= self.interval:
+				self.last_scan = now
+				sizes = self._scan()
+				now = time.perf_counter()
+				for name, size in sizes.items():
+					if size > 0 and self.pending.get(name) == size:
+						events.append((name, now))
+						self.known.add(name)
+						del self.pending[name]
+					else:
+						self.pending[name] = size
+			if events or now >= deadline:
+				return events
+			time.sleep(max(0, min(self.last_scan + self.interval, deadline) - now))
+
+	def close(self):
+		self.pending = {}
+
+
+class NotifyWatcher:
+	"""
+	Base for watchers fed by change notifications that carry no "write
+	finished" event: names the notifications report are stat'ed every
+	SETTLE_INTERVAL and reported once their size stopped changing. Subclasses
+	implement _changes(timeout) -> [names added or modified].
+	"""
+
+	def __init__(self, directory, history=1024):
+		self.directory = directory
+		self.pending = {}  # name -> size seen on the previous check (-1 before the first)
+		self.reported = OrderedDict()  # recently reported name -> size (metadata updates are not new files)
+		self.history = history
+		self.overflowed = False
+
+	def _changes(self, timeout):
+		raise NotImplementedError
+
+	def _check_pending(self):
+		events = []
+		now = time.perf_counter()
+		for name, size in list(self.pending.items()):
+			try:
+				current = os.stat(os.path.join(self.directory, name)).st_size
+			except OSError:
+				del self.pending[name]  # Removed or renamed away
+				continue
+			if current > 0 and current == size:
+				del self.pending[name]
+				if self.reported.get(name) == current:
+					continue
+				self.reported[name] = current
+				if len(self.reported) > self.history:
+					self.reported.popitem(last=False)
+				events.append((name, now))
+			else:
+				self.pending[name] = current
+		return events
+
+	def read(self, timeout=0):
+		"""Wait up to timeout seconds; returns [(file name, arrival time)] (time.perf_counter)"""
+		deadline = time.perf_counter() + max(0, timeout)
+		while True:
+			remaining = max(0, deadline - time.perf_counter())
+			wait = min(SETTLE_INTERVAL, remaining) if self.pending else remaining
+			for name in self._changes(wait):
+				self.pending.setdefault(name, -1)
+			events = self._check_pending()
+			if events or time.perf_counter() >= deadline:
+				return events
+
+	def close(self):
+		self.pending = {}
+
+
+class KqueueWatcher(NotifyWatcher):
+	"""Reports new files in one folder from kqueue directory events (macOS / BSD)"""
+
+	method = "kqueue"
+
+	def __init__(self, directory):
+		super().__init__(directory)
+		self.fd = None
+		self.kqueue = None
+		self.known = set()  # entries already in the folder
+
+	def start(self):
+		if not hasattr(select, 'kqueue'):
+			raise OSError("kqueue is not available")
+		# O_EVTONLY (macOS) watches without keeping the volume busy
+		flags = 0x8000 if sys.platform == 'darwin' else os.O_RDONLY
+		fd = os.open(self.directory, flags)
+		try:
+			self.kqueue = select.kqueue()
+			self.kqueue.control([select.kevent(
+				fd, filter=select.KQ_FILTER_VNODE,
+				flags=select.KQ_EV_ADD | select.KQ_EV_CLEAR,
+				fflags=select.KQ_NOTE_WRITE
+			)], 0, 0)
+		except OSError:
+			os.close(fd)
+			raise
+		self.fd = fd
+		self.known = set(os.listdir(self.directory))
+		return self
+
+	def _changes(self, timeout):
+		if self.kqueue is None or not self.kqueue.control(None, 1, timeout):
+			return []
+		# The folder's entries changed: list it once to find the new names
+		try:
+			current = set(os.listdir(self.directory))
+		except OSError:
+			return []
+		added = current - self.known
+		self.known = current
+		return added
+
+	def close(self):
+		super().close()
+		if self.kqueue is not None:
+			self.kqueue.close()
+			self.kqueue = None
+		if self.fd is not None:
+			os.close(self.fd)
+			self.fd = None
+
+
+class WindowsWatcher(NotifyWatcher):
+	"""Reports new files in one folder from ReadDirectoryChangesW notifications (Windows)"""
+
+	method = "ReadDirectoryChangesW"
+
+	FILE_LIST_DIRECTORY = 0x0001
+	FILE_SHARE_ALL = 0x0001 | 0x0002 | 0x0004  # read, write, delete
+	OPEN_EXISTING = 3
+	FILE_FLAG_BACKUP_SEMANTICS = 0x02000000
+	FILE_FLAG_OVERLAPPED = 0x40000000
+	FILE_NOTIFY_CHANGE = 0x0001 | 0x0008 | 0x0010  # file name, size, last write
+	FILE_ACTION_REMOVED = 2
+	FILE_ACTION_RENAMED_OLD_NAME = 4
+	WAIT_OBJECT_0 = 0
+	NOTIFY_HEADER = struct.Struct("<III")  # next entry offset, action, name length (bytes)
+
+	class OVERLAPPED(ctypes.Structure):
+		_fields_ = [
+			('Internal', ctypes.c_void_p),
+			('InternalHigh', ctypes.c_void_p),
+			('Offset', ctypes.c_uint32),
+			('OffsetHigh', ctypes.c_uint32),
+			('hEvent', ctypes.c_void_p),
+		]
+
+	def __init__(self, directory):
+		super().__init__(directory)
+		self.kernel32 = None
+		self.handle = None
+		self.event = None
+		self.overlapped = None
+		self.buffer = ctypes.create_string_buffer(READ_SIZE)
+
+	def start(self):
+		if not sys.platform.startswith('win'):
+			raise OSError("ReadDirectoryChangesW is only available on Windows")
+		kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+		kernel32.CreateFileW.restype = ctypes.c_void_p
+		kernel32.CreateFileW.argtypes = [
+			ctypes.c_wchar_p, ctypes.c_uint32, ctypes.c_uint32, ctypes.c_void_p,
+			ctypes.c_uint32, ctypes.c_uint32, ctypes.c_void_p
+		]
+		kernel32.CreateEventW.restype = ctypes.c_void_p
+		kernel32.CreateEventW.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_wchar_p]
+		kernel32.ReadDirectoryChangesW.argtypes = [
+			ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint32, ctypes.c_int, ctypes.c_uint32,
+			ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p
+		]
+		kernel32.WaitForSingleObject.argtypes = [ctypes.c_void_p, ctypes.c_uint32]
+		kernel32.WaitForSingleObject.restype = ctypes.c_uint32
+		kernel32.GetOverlappedResult.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int]
+		kernel32.CancelIoEx.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+		kernel32.CloseHandle.argtypes = [ctypes.c_void_p]
+		self.kernel32 = kernel32
+
+		handle = kernel32.CreateFileW(
+			os.path.abspath(self.directory), self.FILE_LIST_DIRECTORY, self.FILE_SHARE_ALL, None,
+			self.OPEN_EXISTING, self.FILE_FLAG_BACKUP_SEMANTICS | self.FILE_FLAG_OVERLAPPED, None
+		)
+		if handle in (None, ctypes.c_void_p(-1).value):
+			error = ctypes.get_last_error()
+			raise OSError(error, f"Cannot watch {self.directory}: {ctypes.FormatError(error)}")
+		self.handle = handle
+		self.event = kernel32.CreateEventW(None, True, False, None)
+		self._request()
+		return self
+
+	def _request(self):
+		"""Queue the next ReadDirectoryChangesW; changes are buffered by the handle meanwhile"""
+		self.overlapped = self.OVERLAPPED(hEvent=self.event)
+		if not self.kernel32.ReadDirectoryChangesW(
+				self.handle, self.buffer, len(self.buffer), False, self.FILE_NOTIFY_CHANGE,
+				None, ctypes.byref(self.overlapped), None):
+			error = ctypes.get_last_error()
+			raise OSError(error, f"ReadDirectoryChangesW failed: {ctypes.FormatError(error)}")
+
+	def _changes(self, timeout):
+		if self.handle is None:
+			return []
+		if self.kernel32.WaitForSingleObject(self.event, int(timeout * 1000)) != self.WAIT_OBJECT_0:
+			return []
+		count = ctypes.c_uint32(0)
+		if not self.kernel32.GetOverlappedResult(self.handle, ctypes.byref(self.overlapped), ctypes.byref(count), False):
+			count.value = 0
+		data = self.buffer.raw[:count.value]
+		self._request()
+
+		if not data:
+			logging.warning(f"Change notifications overflowed on {self.directory}, events were lost")
+			self.overflowed = True
+			return []
+		names = []
+		offset = 0
+		while True:
+			next_offset, action, length = self.NOTIFY_HEADER.unpack_from(data, offset)
+			start = offset + self.NOTIFY_HEADER.size
+			name = data[start:start + length].decode('utf-16-le')
+			if action in (self.FILE_ACTION_REMOVED, self.FILE_ACTION_RENAMED_OLD_NAME):
+				self.pending.pop(name, None)
+			elif name not in names:
+				names.append(name)
+			if not next_offset:
+				return names
+			offset += next_offset
+
+	def close(self):
+		super().close()
+		if self.handle is not None:
+			self.kernel32.CancelIoEx(self.handle, None)
+			self.kernel32.CloseHandle(self.handle)
+			self.handle = None
+		if self.event is not None:
+			self.kernel32.CloseHandle(self.event)
+			self.event = None
+
+
+def create_watcher(directory, polling=False, interval=0.1):
+	"""
+	Start a watcher for directory: inotify on Linux, kqueue on macOS / BSD,
+	ReadDirectoryChangesW on Windows; polling every interval seconds when
+	polling=True or the notifications are not available.
+	"""
+	if not polling:
+		if sys.platform.startswith('linux'):
+			watcher = InotifyWatcher(directory)
+		elif sys.platform.startswith('win'):
+			watcher = WindowsWatcher(directory)
+		elif hasattr(select, 'kqueue'):
+			watcher = KqueueWatcher(directory)
+		else:
+			watcher = None
+		if watcher is not None:
+			try:
+				return watcher.start()
+			except OSError as e:
+				logging.warning(f"{watcher.method} unavailable for {directory} ({e}), polling instead")
+	return PollingWatcher(directory, interval=interval).start()
+
+
+def wait_for_files(watcher, match, expected=None, timeout=10, settle=1.0, since=None):
+	"""
+	Collect the files of one capture.
+	match(name) returns a group key (e.g. the file stem) or None for unrelated
+	files; the first key seen picks the group. Collection ends once expected
+	files arrived, or settle seconds after the last one, or timeout seconds
+	after since (time.perf_counter, default now) when nothing arrived.
+	Returns (paths in arrival order, seconds from since to the last file);
+	([], None) on timeout.
+	"""
+	since = time.perf_counter() if since is None else since
+	deadline = since + timeout
+	key = None
+	paths = []
+	last_arrival = None
+
+	while True:
+		now = time.perf_counter()
+		if last_arrival is None:
+			remaining = deadline - now
+		else:
+			remaining = min(deadline, last_arrival + settle) - now
+		if remaining <= 0:
+			break
+
+		for name, arrived in watcher.read(remaining):
+			group = match(name)
+			if group is None or (key is not None and group != key):
+				continue
+			key = group
+			path = os.path.join(watcher.directory, name)
+			if path not in paths:
+				paths.append(path)
+				last_arrival = arrived
+		if expected and len(paths) >= expected:
+			break
+
+	if not paths:
+		return [], None
+	return paths, last_arrival - since
+
+
+class IngestSubscription:
+	"""Watcher interface (read / close) over the completed files a DirectoryIngest sees"""
+
+	method = "ingest"
+
+	def __init__(self, ingest, directory):
+		self.ingest = ingest
+		self.directory = directory
+		self.events = queue.Queue()
+		self.active = True  # False once the ingest stopped watching directory
+		self.overflowed = False
+
+	def read(self, timeout=0):
+		"""Wait up to timeout seconds; returns [(file name, arrival time)] (time.perf_counter)"""
+		try:
+			events = [self.events.get(timeout=timeout) if timeout > 0 else self.events.get_nowait()]
+		except queue.Empty:
+			return []
+		while True:
+			try:
+				events.append(self.events.get_nowait())
+			except queue.Empty:
+				return events
+
+	def close(self):
+		self.ingest.unsubscribe(self)
+
+
+class DirectoryIngest:
+	"""
+	Reports completed image files in one folder on a background thread.
+	on_file(path) is called on the watcher thread for every file once its
+	writer finished. The capture path calls claim(path) for files it already
+	handles itself, so each file is reported exactly once by whichever side
+	sees it first. Without change notifications the folder is polled every
+	poll_interval seconds, slowly, since this runs for the whole session.
+	"""
+
+	def __init__(self, on_file, extensions=IMAGE_EXTENSIONS, polling=False, history=4096,
+			poll_interval=INGEST_POLL_INTERVAL):
+		self.on_file = on_file
+		self.extensions = tuple(ext.lower() for ext in extensions)
+		self.polling = polling
+		self.poll_interval = poll_interval
+		self.history = history
+		self.directory = None
+		self.watching = None  # folder the running watcher covers
+		self.subscribers = []
+		self.seen = OrderedDict()  # recently reported or claimed paths (bounded)
+		self.lock = threading.Lock()
+		self.changed = threading.Event()
+		self.stop_event = threading.Event()
+		self.thread = None
+		self.reported = 0
+
+	def _key(self, path):
+		return os.path.normcase(os.path.abspath(path))
+
+	def _mark(self, path):
+		"""Record path; False when it was already reported or claimed"""
+		key = self._key(path)
+		with self.lock:
+			if key in self.seen:
+				return False
+			self.seen[key] = True
+			if len(self.seen) > self.history:
+				self.seen.popitem(last=False)
+			return True
+
+	def claim(self, path):
+		"""Called by the capture path for a file it reports itself; False if ingest already did"""
+		return self._mark(path)
+
+	def forget(self, path):
+		"""Report path again when it is rewritten (e.g. after it was deleted)"""
+		with self.lock:
+			self.seen.pop(self._key(path), None)
+
+	def subscribe(self, directory):
+		"""
+		Share the running watcher: a watcher-like IngestSubscription receiving
+		every completed file in directory, or None while directory is not watched.
+		"""
+		with self.lock:
+			if directory is None or directory != self.watching:
+				return None
+			subscription = IngestSubscription(self, directory)
+			self.subscribers.append(subscription)
+			return subscription
+
+	def unsubscribe(self, subscription):
+		with self.lock:
+			if subscription in self.subscribers:
+				self.subscribers.remove(subscription)
+
+	def _stop_watching(self, watcher):
+		watcher.close()
+		with self.lock:
+			self.watching = None
+			for subscription in self.subscribers:
+				subscription.active = False
+			self.subscribers = []
+
+	def set_directory(self, directory):
+		"""Watch another folder (None stops watching); files already there are not reported"""
+		with self.lock:
+			if directory == self.directory:
+				return
+			self.directory = directory
+		self.changed.set()
+
+	def start(self):
+		if self.thread is None:
+			self.stop_event.clear()
+			self.thread = threading.Thread(target=self._run, name="directory-ingest", daemon=True)
+			self.thread.start()
+		return self
+
+	def stop(self):
+		self.stop_event.set()
+		self.changed.set()
+		if self.thread is not None:
+			self.thread.join(timeout=2)
+			self.thread = None
+
+	def get_stats(self):
+		with self.lock:
+			return {'directory': self.directory, 'reported': self.reported}
+
+	def _run(self):
+		watcher = None
+		while not self.stop_event.is_set():
+			if self.changed.is_set() or watcher is None:
+				self.changed.clear()
+				if watcher is not None:
+					self._stop_watching(watcher)
+					watcher = None
+				with self.lock:
+					directory = self.directory
+				if not directory or not os.path.isdir(directory):
+					# Nothing to watch yet (the save folder is created by the first capture)
+					self.changed.wait(1.0)
+					continue
+				watcher = create_watcher(directory, polling=self.polling, interval=self.poll_interval)
+				with self.lock:
+					self.watching = directory
+				logging.info(f"Watching {directory} for new photos ({watcher.method})")
+
+			for name, arrived in watcher.read(0.5):
+				if not name.lower().endswith(self.extensions):
+					continue
+				with self.lock:
+					subscribers = list(self.subscribers)
+				for subscription in subscribers:
+					subscription.events.put((name, arrived))
+				path = os.path.join(watcher.directory, name)
+				if not self._mark(path):
+					continue
+				with self.lock:
+					self.reported += 1
+				try:
+					self.on_file(path)
+				except Exception as e:
+					logging.error(f"Ingest callback failed for {path}: {e}")
+
+		if watcher is not None:
+			self._stop_watching(watcher)
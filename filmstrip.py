@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Filmstrip for pyCameraControl
+Horizontally scrolling strip of the session's photos under the preview.
+The strip is virtualized: only the cells in view exist on the canvas, so
+scrolling costs the same for ten photos or a 5,000-frame session.
+Thumbnails come from thumbnails.ThumbnailCache through background workers;
+cells show a placeholder until their thumbnail is ready.
+Requires: pip install pillow
+"""
+
+import tkinter as tk
+
+from PIL import ImageTk
+
+from thumbnails import ThumbnailCache, ThumbnailLoader, THUMBNAIL_SIZE
+
+
+CELL_PADDING = 6
+LABEL_HEIGHT = 14
+
+
+class Filmstrip:
+	"""Thumbnail strip for a SessionIndex; call update() periodically from the UI loop"""
+
+	def __init__(self, parent, index, on_select=None, cache=None, thumb_size=THUMBNAIL_SIZE, bg='#ecf0f1'):
+		"""on_select(shot) is called on the UI thread when a thumbnail is clicked"""
+		self.index = index
+		self.on_select = on_select
+		self.cache = cache if cache is not None else ThumbnailCache(size=thumb_size)
+		self.loader = ThumbnailLoader(self.cache)
+		self.thumb_size = self.cache.size
+		self.cell_width = self.thumb_size[0] + CELL_PADDING * 2
+		self.height = self.thumb_size[1] + LABEL_HEIGHT + CELL_PADDING * 2
+
+		self.frame = tk.Frame(parent, bg=bg)
+		self.canvas = tk.Canvas(
+			self.frame,
+			height=self.height,
+			bg=bg,
+			relief='sunken',
+			bd=1,
+			highlightthickness=0,
+			xscrollincrement=self.cell_width
+		)
+		self.scrollbar = tk.Scrollbar(self.frame, orient='horizontal', command=self.on_scroll)
+		self.canvas.configure(xscrollcommand=self.scrollbar.set)
+		self.canvas.pack(fill='x')
+		self.scrollbar.pack(fill='x')
+
+		self.canvas.bind('<Configure>', lambda e: self.schedule_render())
+		self.canvas.bind('<Button-1>', self.on_click)
+		self.canvas.bind('<MouseWheel>', self.on_wheel)
+		self.canvas.bind('<Shift-MouseWheel>', self.on_wheel)
+		self.canvas.bind('<Button-4>', lambda e: self.scroll(-1))
+		self.canvas.bind('<Button-5>', lambda e: self.scroll(1))
+
+		self.cells = {}  # position -> {'key', 'path', 'photo', 'items'}
+		self.failed = set()  # paths whose thumbnail could not be decoded
+		self.version = None
+		self.generation = None  # index folder generation the cells were drawn for
+		self.count = 0
+		self.selected = None  # key of the selected shot
+		self.render_job = None
+
+	def pack(self, **kwargs):
+		self.frame.pack(**kwargs)
+
+	def stop(self):
+		self.loader.stop()
+
+	def update(self):
+		"""Follow index changes and show thumbnails finished by the workers"""
+		if self.index.version != self.version:
+			self.version = self.index.version
+			# Stay at the newest photo while the user has not scrolled back
+			follow = self.count == 0 or self.canvas.xview()[1] >= 0.999
+			previous = self.count
+			self.count = len(self.index)
+			self.canvas.configure(scrollregion=(0, 0, self.count * self.cell_width, self.height))
+			if self.index.generation != self.generation or self.count < previous:
+				# Folder changed or shots were deleted: positions moved, start over
+				self.generation = self.index.generation
+				self.clear()
+				self.failed.clear()
+			else:
+				# Appended shots (or a sibling added to the latest one); render() redraws
+				# only the cells whose shot or preview file changed
+				for position in range(max(0, previous - 1), self.count):
+					try:
+						path = self.index[position].preview_path
+					except IndexError:
+						break
+					self.failed.discard(path)  # retry thumbnails that failed while their file was being written
+			if follow:
+				self.canvas.xview_moveto(1.0)
+			self.schedule_render()
+
+		ready = False
+		for path, error in self.loader.get_results():
+			if error is not None:
+				self.failed.add(path)
+			ready = True
+		if ready:
+			self.schedule_render()
+
+	def clear(self):
+		for cell in self.cells.values():
+			self.canvas.delete(*cell['items'])
+		self.cells = {}
+
+	def forget(self, path):
+		"""Drop the thumbnail of a deleted or rewritten file"""
+		self.cache.discard(path)
+		self.failed.discard(path)
+
+	def on_scroll(self, *args):
+		self.canvas.xview(*args)
+		self.schedule_render()
+
+	def scroll(self, cells):
+		self.canvas.xview_scroll(cells, 'units')
+		self.schedule_render()
+
+	def on_wheel(self, event):
+		self.scroll(-1 if event.delta > 0 else 1)
+
+	def schedule_render(self):
+		if self.render_job is None:
+			self.render_job = self.canvas.after_idle(self.render)
+
+	def visible_range(self):
+		"""First and last position currently in view"""
+		left = self.canvas.canvasx(0)
+		width = max(1, self.canvas.winfo_width())
+		first = max(0, int(left // self.cell_width))
+		last = min(self.count - 1, int((left + width) // self.cell_width))
+		return first, last
+
+	def render(self):
+		"""Draw the cells in view, drop the others and request missing thumbnails"""
+		self.render_job = None
+		first, last = self.visible_range()
+
+		for position in [p for p in self.cells if p < first or p > last]:
+			self.canvas.delete(*self.cells.pop(position)['items'])
+
+		wanted = []
+		for position in range(first, last + 1):
+			try:
+				shot = self.index[position]
+			except IndexError:
+				break
+			path = shot.preview_path
+			cell = self.cells.get(position)
+			if cell is None or cell['key'] != shot.key or cell['path'] != path or (cell['photo'] is None and path):
+				self.draw_cell(position, shot, path)
+			if path and self.cells[position]['photo'] is None and path not in self.failed:
+				wanted.append(path)
+
+		# Prefetch one screen on each side after the visible cells
+		span = last - first + 1
+		for position in list(range(last + 1, min(self.count, last + 1 + span))) + list(range(max(0, first - span), first)):
+			try:
+				path = self.index[position].preview_path
+			except IndexError:
+				continue
+			if path and path not in self.failed and self.cache.peek(path) is None:
+				wanted.append(path)
+		self.loader.request(wanted)
+
+	def draw_cell(self, position, shot, path):
+		old = self.cells.pop(position, None)
+		if old:
+			self.canvas.delete(*old['items'])
+
+		x = position * self.cell_width + CELL_PADDING
+		y = CELL_PADDING
+		width, height = self.thumb_size
+		selected = shot.key == self.selected
+		items = [self.canvas.create_rectangle(
+			x - 2, y - 2, x + width + 2, y + height + 2,
+			outline='#3498db' if selected else '#bdc3c7', width=2 if selected else 1, fill='#ffffff'
+		)]
+
+		photo = None
+		image = self.cache.peek(path) if path else None
+		if image is not None:
+			photo = ImageTk.PhotoImage(image)
+			items.append(self.canvas.create_image(x + width // 2, y + height // 2, image=photo))
+		else:
+			# RAW without JPEG sibling, failed decode, or thumbnail still loading
+			placeholder = "RAW" if not path else ("?" if path in self.failed else "…")
+			items.append(self.canvas.create_text(
+				x + width // 2, y + height // 2, text=placeholder, fill='#7f8c8d', font=('Arial', 9)
+			))
+
+		items.append(self.canvas.create_text(
+			x + width // 2, y + height + LABEL_HEIGHT // 2 + 2,
+			text=shot.name[-16:], fill='#495057', font=('Arial', 7)
+		))
+		self.cells[position] = {'key': shot.key, 'path': path, 'photo': photo, 'items': items}
+
+	def on_click(self, event):
+		position = int(self.canvas.canvasx(event.x) // self.cell_width)
+		try:
+			shot = self.index[position]
+		except IndexError:
+			return
+		previous, self.selected = self.selected, shot.key
+		# Redraw only the cells whose highlight changed
+		for position, cell in list(self.cells.items()):
+			if cell['key'] not in (previous, shot.key):
+				continue
+			try:
+				drawn = self.index[position]
+			except IndexError:
+				continue
+			self.draw_cell(position, drawn, drawn.preview_path)
+		if self.on_select:
+			self.on_select(shot)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Live View Pacing for pyCameraControl
+Frame pacing and statistics for the gPhoto2 capture_preview stream. The camera
+worker asks the stream when the next frame is due, grabs it between other
+camera tasks and reports back, so live view never competes with captures for
+the camera.
+"""
+
+import threading
+import time
+
+
+LIVE_VIEW_FPS = 15
+
+# Preview key used for live view frames
+LIVE_VIEW_KEY = "live-view"
+
+# Keep the captured photo on screen this long before live frames resume
+HOLD_AFTER_CAPTURE = 1.5
+
+
+class LiveViewStream:
+	"""Frame pacing, drop accounting and latency statistics for live view"""
+
+	def __init__(self, target_fps=LIVE_VIEW_FPS):
+		self.target_fps = target_fps
+		self.interval = 1.0 / target_fps
+		self.lock = threading.Lock()
+		self.active = False
+		self.paused_until = 0.0
+		self.reset_stats()
+
+	def reset_stats(self):
+		self.next_due = 0.0
+		self.frames = 0
+		self.displayed = 0
+		self.dropped = 0
+		self.grab_time_total = 0.0
+		self.latency_total = 0.0
+		self.last_latency = 0.0
+		self.started_at = time.perf_counter()
+
+	def start(self):
+		with self.lock:
+			self.reset_stats()
+			self.next_due = time.perf_counter()
+			self.active = True
+
+	def stop(self):
+		with self.lock:
+			self.active = False
+
+	def is_running(self):
+		"""Active and not paused"""
+		return self.active and time.perf_counter() >= self.paused_until
+
+	def pause(self, duration):
+		"""Suspend frame grabs, e.g. while a real capture runs and its preview is shown"""
+		with self.lock:
+			self.paused_until = time.perf_counter() + duration
+
+	def resume(self):
+		with self.lock:
+			self.paused_until = 0.0
+			self.next_due = time.perf_counter()
+
+	def next_frame_delay(self):
+		"""Seconds until the next frame is due (0 when it is due now)"""
+		now = time.perf_counter()
+		due = max(self.next_due, self.paused_until)
+		return max(0.0, due - now)
+
+	def frame_started(self):
+		"""Called right before grabbing a frame; advances the pacing clock"""
+		now = time.perf_counter()
+		with self.lock:
+			late = now - self.next_due
+			if late > self.interval:
+				# Whole frame slots missed because the camera was busy or slow
+				# (slots skipped during a pause are not counted)
+				if self.next_due > self.paused_until:
+					self.dropped += int(late / self.interval)
+				self.next_due = now
+			self.next_due += self.interval
+		return now
+
+	def frame_grabbed(self, started):
+		"""Called after the frame data arrived from the camera"""
+		with self.lock:
+			self.frames += 1
+			self.grab_time_total += time.perf_counter() - started
+
+	def frame_displayed(self, started):
+		"""Called on the UI thread once the frame is on screen"""
+		latency = time.perf_counter() - started
+		with self.lock:
+			self.displayed += 1
+			self.latency_total += latency
+			self.last_latency = latency
+
+	def get_stats(self):
+		elapsed = time.perf_counter() - self.started_at
+		return {
+			'frames': self.frames,
+			'displayed': self.displayed,
+			'dropped': self.dropped,
+			# Grabbed but replaced by a newer frame before display (one may be in flight)
+			'skipped': max(0, self.frames - self.displayed - 1),
+			'fps': self.displayed / elapsed if elapsed > 0 else 0,
+			'grab_avg': self.grab_time_total / self.frames if self.frames else 0,
+			'latency_avg': self.latency_total / self.displayed if self.displayed else 0,
+			'latency_last': self.last_latency,
+		}
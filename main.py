@@ -11,13 +11,27 @@ import threading
 import queue
 import os
 import time
-from datetime import datetime
-from PIL import Image, ImageTk
-import gphoto2 as gp
+import argparse
+from PIL import ImageTk
+try:
+    import gphoto2 as gp
+except ImportError:
+    gp = None  # 未安裝 python-gphoto2 時只能使用模擬相機 (--simulate)
 import logging
 
+from camera_backends import GPhoto2Backend, FEATURE_LIVE_VIEW
+from preview import PreviewWorker, is_previewable
+from file_watch import DirectoryIngest
+from session_index import SessionIndex
+from filmstrip import Filmstrip
+from live_view import LiveViewStream, LIVE_VIEW_KEY, HOLD_AFTER_CAPTURE
+from mjpeg_server import MJPEGServer
+from camera_config import (
+    CapabilityStore, SettingWriteQueue, probe_capabilities, read_camera_identity
+)
+
 class CameraControlPro:
-    def __init__(self):
+    def __init__(self, mjpeg_port=None, mjpeg_host="127.0.0.1", delete_camera_shots=False):
         # 初始化主視窗
         self.root = tk.Tk()
         self.root.title("pyCameraControl")
@@ -25,26 +39,211 @@ class CameraControlPro:
         self.root.configure(bg='#f8f9fa')
         self.root.resizable(True, True)
         
-        # 相機相關變數
+        # 相機相關變數（連接、設定寫入與拍攝管線由後端處理，與無介面執行共用）
+        self.backend = GPhoto2Backend(gp_module=gp)
         self.camera = None
-        self.context = gp.Context()
+        self.context = None
         self.connected = False
         self.camera_model = ""
-        self.setting_in_progress = False  # 標記設定是否正在進行中
+        self.setting_queue = SettingWriteQueue()  # 待寫入的相機設定（同名設定只保留最後一次）
+        self.camera_lock = self.backend.camera_lock  # 拍攝管線刪除階段與相機執行緒共用
+        self.config_cache = None  # 相機設定樹快取（連接後建立）
+        self.delete_camera_shots = delete_camera_shots  # 機身快門拍攝的檔案下載後是否從記憶卡刪除（預設保留）
+        self.capability_store = CapabilityStore()  # 各機身的能力快取（磁碟）
+        self.capability_key = None
         
         # 通訊佇列
         self.photo_queue = queue.Queue()
         self.status_queue = queue.Queue()
         self.capture_queue = queue.Queue()  # 新增拍攝任務佇列
-        
+        self.last_preview_info = None  # 最近一次預覽解碼的方式與耗時
+        self.preview_worker = PreviewWorker(on_result=self.publish_preview)  # 背景預覽解碼（只處理最新一張）
+        self.preview_source = None  # 目前顯示的預覽來源（視窗縮放時重新縮放用）
+        self.preview_box = None
+        self.preview_resize_job = None
+        self.save_path_job = None  # 儲存路徑輸入停止後才套用
+        # 監看儲存資料夾：機身快門等在程式之外寫入的照片也會送進照片佇列
+        self.ingest = DirectoryIngest(on_file=self.photo_queue.put)
+        self.session_index = SessionIndex()  # 儲存資料夾的照片索引（依拍攝順序，RAW/JPEG 同組）
+
+        # 即時預覽（由相機執行緒在任務之間擷取影格）
+        self.live_view = LiveViewStream()
+        self.live_view_box = None  # 畫布大小（由UI執行緒更新）
+        self.live_view_stats_time = 0
+
+        # 選用的 MJPEG HTTP 伺服器（遠端查看即時預覽／最後拍攝的照片）
+        self.mjpeg_server = MJPEGServer(mjpeg_host, mjpeg_port) if mjpeg_port is not None else None
+
         # 設定變數
         self.save_directory = "./photos"
         self.setup_variables()
-        
+
         # 建立介面
         self.create_main_layout()
         self.setup_logging()
+        self.start_ingest()
+        self.start_mjpeg_server()
+        self.start_camera_worker()
         self.check_queues()
+
+    def start_camera_worker(self):
+        """啟動相機工作執行緒（所有 gPhoto2 呼叫都在此執行緒上依序執行）"""
+        self.camera_thread = threading.Thread(target=self.camera_worker, name="camera-worker", daemon=True)
+        self.camera_thread.start()
+
+    def start_ingest(self):
+        """開始監看儲存資料夾並建立照片索引，變更儲存路徑時改用新的資料夾"""
+        self.on_save_path_change()
+        # 輸入中不逐字切換資料夾：停止輸入、離開欄位或按 Enter 時才套用
+        self.save_path_var.trace_add('write', lambda *args: self.schedule_save_path_change())
+        self.path_entry.bind('<FocusOut>', lambda e: self.on_save_path_change())
+        self.path_entry.bind('<Return>', lambda e: self.on_save_path_change())
+        self.ingest.start()
+
+    def schedule_save_path_change(self):
+        """儲存路徑輸入中：延後套用，每次輸入重新計時"""
+        if self.save_path_job:
+            self.root.after_cancel(self.save_path_job)
+        self.save_path_job = self.root.after(500, self.on_save_path_change)
+
+    def on_save_path_change(self):
+        """儲存路徑變更：監看新的資料夾，並在背景以一次 scandir 重建索引"""
+        if self.save_path_job:
+            self.root.after_cancel(self.save_path_job)
+            self.save_path_job = None
+        save_path = self.save_path_var.get()
+        self.ingest.set_directory(save_path)
+        self.session_index.set_directory(save_path)
+
+    def on_frame_saved(self, frame):
+        """管線儲存階段回呼：加入照片索引，並讓由記憶體解碼的預覽記錄檔案的修改時間與大小"""
+        self.session_index.add(frame['target_path'])
+        self.preview_worker.file_saved(frame['target_path'])
+
+    def queue_captured_frame(self, frame):
+        """拍攝路徑送出的影格（附記憶體中的影像資料）；資料夾監看已回報的檔案不重複送出"""
+        if self.ingest.claim(frame['target_path']):
+            self.photo_queue.put((frame['target_path'], frame['camera_file']))
+
+    def start_mjpeg_server(self):
+        """啟動 MJPEG 伺服器（有指定埠號時）"""
+        if not self.mjpeg_server:
+            return
+        try:
+            self.mjpeg_server.start()
+            logging.info(f"MJPEG server: {self.mjpeg_server.url()} (stream.mjpg, snapshot.jpg)")
+        except OSError as e:
+            logging.error(f"MJPEG server failed to start: {str(e)}")
+            self.mjpeg_server = None
+
+    def publish_preview(self, result):
+        """預覽執行緒回呼：將拍攝照片的預覽送到 MJPEG 伺服器（即時影格已由相機執行緒直接送出）"""
+        if self.mjpeg_server and result['error'] is None and result['key'] != LIVE_VIEW_KEY:
+            self.mjpeg_server.publish(result['image'])
+
+    def camera_worker(self):
+        """相機工作執行緒主迴圈：持有 gp.Camera，從 capture_queue 取出任務執行"""
+        while True:
+            # 即時預覽開啟時，依下一張影格的時間等待任務
+            timeout = self.live_view.next_frame_delay() if self.live_view.active else 1.0
+            try:
+                if timeout > 0:
+                    task = self.capture_queue.get(timeout=timeout)
+                else:
+                    task = self.capture_queue.get_nowait()
+            except queue.Empty:
+                if self.live_view.active:
+                    self.grab_live_view_frame()
+                else:
+                    # 閒置時讀取相機事件（例如轉動模式轉盤、按下機身快門）
+                    self.poll_camera_events()
+                continue
+            if task is None:
+                break
+            try:
+                if task.get('action') == 'call':
+                    task['func']()
+                elif task.get('action') == 'download':
+                    self.execute_download_task(task)
+                else:
+                    self.execute_capture_task(task)
+            except Exception as e:
+                self.status_queue.put(f"error:Camera task failed: {str(e)}")
+                logging.error(f"Camera task failed: {str(e)}")
+
+    def poll_camera_events(self):
+        """閒置時處理相機事件（只在相機執行緒呼叫）；機身快門拍攝的檔案交給拍攝路徑下載"""
+        if not self.camera:
+            return
+        try:
+            # 設定變更事件由後端讓設定快取失效，回傳相機新增的檔案
+            added = self.backend.wait_for_events(10)
+        except gp.GPhoto2Error:
+            return
+        if added:
+            # 儲存路徑與檔名前綴由UI執行緒讀取後再排入拍攝佇列
+            self.post_to_ui(lambda: self.queue_camera_files(added))
+
+    def queue_camera_files(self, files):
+        """排入下載任務：相機自行新增的檔案（機身快門）"""
+        self.capture_queue.put({
+            'action': 'download',
+            'files': files,
+            'save_path': self.save_path_var.get(),
+            'filename_prefix': self.filename_prefix_var.get()
+        })
+
+    def execute_download_task(self, task):
+        """下載機身快門拍攝的照片，與拍攝相同經由管線儲存並顯示預覽（只在相機執行緒呼叫）"""
+        try:
+            if not self.camera:
+                return
+            stats = self.backend.fetch_files(
+                task['files'], task['save_path'], task['filename_prefix'],
+                on_shot=self.queue_captured_frame,
+                on_saved=self.on_frame_saved,
+                on_error=lambda frame, e: self.status_queue.put(f"error:Failed to save photo: {frame['filename']}"),
+                delete=self.delete_camera_shots
+            )
+            self.status_queue.put(f"Downloaded {stats['frames']} file(s) taken on the camera")
+        except gp.GPhoto2Error as e:
+            self.status_queue.put(f"error:Download from camera failed: {str(e)}")
+
+    def grab_live_view_frame(self):
+        """擷取一張即時預覽影格並交給預覽執行緒（只在相機執行緒呼叫）"""
+        started = self.live_view.frame_started()
+        if not self.camera or not self.live_view_box:
+            return
+        try:
+            # 後端重複使用同一個 CameraFile 接收預覽資料，回傳複製後的 JPEG
+            frame = self.backend.capture_preview()
+            self.live_view.frame_grabbed(started)
+            if self.mjpeg_server:
+                # 相機送出的 JPEG 直接轉送，不重新編碼
+                self.mjpeg_server.publish(frame)
+            self.preview_worker.submit(
+                frame, self.live_view_box, key=LIVE_VIEW_KEY, cache=False, meta={'started': started}
+            )
+        except gp.GPhoto2Error as e:
+            self.live_view.stop()
+            self.status_queue.put("live_view_stopped")
+            self.status_queue.put(f"error:Live view failed: {str(e)}")
+
+    def stop_live_view_task(self):
+        """關閉即時預覽並收起反光鏡（只在相機執行緒呼叫）"""
+        self.live_view.stop()
+        try:
+            self.backend.stop_live_view()
+        except Exception:
+            pass  # 部分相機沒有 viewfinder 設定
+
+    def run_on_camera_thread(self, func):
+        """將函式排入相機工作執行緒執行"""
+        self.capture_queue.put({'action': 'call', 'func': func})
+
+    def post_to_ui(self, func):
+        """從工作執行緒將 UI 更新交回主執行緒（經由狀態佇列）"""
+        self.status_queue.put(func)
         
     def setup_variables(self):
         """初始化所有變數"""
@@ -353,6 +552,31 @@ class CameraControlPro:
             state='disabled'
         )
         self.capture_button.pack(fill='x', pady=(0, 15))
+
+        # 即時預覽按鈕
+        self.live_view_button = tk.Button(
+            control_block,
+            text="Start Live View",
+            command=self.toggle_live_view,
+            font=('Arial', 10),
+            bg='#e9ecef',
+            fg='#495057',
+            relief='flat',
+            padx=20,
+            pady=6,
+            cursor='hand2',
+            state='disabled'
+        )
+        self.live_view_button.pack(fill='x')
+
+        self.live_view_label = tk.Label(
+            control_block,
+            text="Live view off",
+            font=('Arial', 9),
+            bg='#ffffff',
+            fg='#7f8c8d'
+        )
+        self.live_view_label.pack(pady=(5, 0))
         
         
         # === 2. 拍攝模式區塊 ===
@@ -444,7 +668,11 @@ class CameraControlPro:
             bd=1,
             highlightthickness=0
         )
-        self.preview_canvas.pack(fill='both', expand=True, pady=(0, 15))
+        self.preview_canvas.pack(fill='both', expand=True, pady=(0, 5))
+
+        # 底片列：瀏覽本次拍攝的照片（縮圖由背景執行緒產生並快取）
+        self.filmstrip = Filmstrip(preview_block, self.session_index, on_select=self.show_shot)
+        self.filmstrip.pack(fill='x', pady=(0, 15))
         
         # === 2. 檔案管理區塊 ===
         file_block = self.create_section_block(preview_frame, "File Management")
@@ -578,189 +806,80 @@ class CameraControlPro:
         
         return frame
     
-    def find_camera_setting(self, config, setting_names, prefix="", seen_paths=None):
-        """遞歸尋找相機設定"""
-        if seen_paths is None:
-            seen_paths = set()
-        
-        for i in range(config.count_children()):
-            try:
-                child = config.get_child(i)
-                child_name = child.get_name()
-                full_path = f"{prefix}/{child_name}" if prefix else child_name
-                
-                # 避免重複處理
-                if full_path in seen_paths:
-                    continue
-                seen_paths.add(full_path)
-                
-                # 檢查是否是我們要找的設定
-                if child_name in setting_names:
-                    try:
-                        # 驗證這個設定是否有選項
-                        if child.count_choices() > 0:
-                            return (full_path, child)
-                    except:
-                        pass
-                
-                # 如果有子設定，遞歸搜尋
-                if child.count_children() > 0:
-                    result = self.find_camera_setting(child, setting_names, full_path, seen_paths)
-                    if result:
-                        return result
-                        
-            except:
-                continue
-        
-        return None
+    def find_camera_setting(self, setting_names):
+        """尋找相機設定（由設定樹索引查詢），回傳 (完整路徑, widget) 或 None"""
+        if not self.config_cache:
+            return None
+        try:
+            return self.config_cache.get_index().find(setting_names)
+        except Exception:
+            return None
         
-    def check_camera_capabilities(self):
-        """檢查相機支援的設定能力"""
+    def check_camera_capabilities(self, cached=None):
+        """檢查相機支援的設定能力（一次走訪設定樹，結果一次交給UI更新）
+
+        cached 為連接時已套用的磁碟快取快照；結果相同時不再更新UI。
+        """
         if not self.camera:
             return
             
         try:
-            config = self.camera.get_config(self.context)
-            
-            # 檢查白平衡設定
-            try:
-                wb_config = config.get_child_by_name('whitebalance')
-                wb_choices = []
-                for i in range(wb_config.count_choices()):
-                    wb_choices.append(wb_config.get_choice(i))
-                
-                # 更新白平衡選項
-                if wb_choices:
-                    self.root.after_idle(lambda: self.update_wb_choices(wb_choices))
-                    self.status_queue.put(f"Found {len(wb_choices)} white balance options")
-                    
-            except gp.GPhoto2Error:
-                pass  # 相機不支援此設定
-            
-            # 檢查ISO設定
-            try:
-                iso_config = config.get_child_by_name('iso')
-                iso_choices = []
-                current_iso = iso_config.get_value()
-                for i in range(iso_config.count_choices()):
-                    iso_choices.append(iso_config.get_choice(i))
-                
-                # 更新ISO選項
-                if iso_choices:
-                    self.root.after_idle(lambda choices=iso_choices, current=current_iso: self.update_iso_choices(choices, current))
-                    
-            except gp.GPhoto2Error:
-                pass
-                
-            # 檢查光圈設定
-            try:
-                aperture_config = config.get_child_by_name('f-number')
-                aperture_choices = []
-                current_aperture = aperture_config.get_value()
-                for i in range(aperture_config.count_choices()):
-                    aperture_choices.append(aperture_config.get_choice(i))
-                
-                # 更新光圈選項
-                if aperture_choices:
-                    self.root.after_idle(lambda choices=aperture_choices, current=current_aperture: self.update_aperture_choices(choices, current))
-                    
-            except gp.GPhoto2Error:
-                pass
-                
-            # 檢查快門速度設定
-            try:
-                shutter_config = config.get_child_by_name('shutterspeed')
-                shutter_choices = []
-                current_shutter = shutter_config.get_value()  # 獲取當前值
-                for i in range(shutter_config.count_choices()):
-                    shutter_choices.append(shutter_config.get_choice(i))
-                
-                # 更新快門速度選項
-                if shutter_choices:
-                    self.root.after_idle(lambda choices=shutter_choices, current=current_shutter: self.update_shutter_choices(choices, current))
-                    
-            except gp.GPhoto2Error:
-                pass
-                
-            # 檢查影像品質設定
-            try:
-                quality_config = config.get_child_by_name('imagequality')
-                quality_choices = []
-                for i in range(quality_config.count_choices()):
-                    quality_choices.append(quality_config.get_choice(i))
-                
-                # 更新影像品質選項
-                if quality_choices:
-                    self.root.after_idle(lambda: self.update_quality_choices(quality_choices))
-                    
-            except gp.GPhoto2Error:
-                pass
-                
-            # 檢查曝光補償設定
-            try:
-                exp_comp_config = config.get_child_by_name('exposurecompensation')
-                exp_comp_choices = []
-                for i in range(exp_comp_config.count_choices()):
-                    exp_comp_choices.append(exp_comp_config.get_choice(i))
-                
-                # 更新曝光補償選項
-                if exp_comp_choices:
-                    self.root.after_idle(lambda: self.update_exp_comp_choices(exp_comp_choices))
-                    
-            except gp.GPhoto2Error:
-                pass
-                
-            # 檢查測光模式設定
-            try:
-                metering_config = config.get_child_by_name('meteringmode')
-                metering_choices = []
-                for i in range(metering_config.count_choices()):
-                    metering_choices.append(metering_config.get_choice(i))
-                
-                # 更新測光模式選項
-                if metering_choices:
-                    self.root.after_idle(lambda: self.update_metering_choices(metering_choices))
-                    
-            except gp.GPhoto2Error:
-                pass
-                
-            # 檢查對焦模式設定
-            try:
-                focus_config = config.get_child_by_name('focusmode')
-                focus_choices = []
-                for i in range(focus_config.count_choices()):
-                    focus_choices.append(focus_config.get_choice(i))
-                
-                # 更新對焦模式選項
-                if focus_choices:
-                    self.root.after_idle(lambda: self.update_focus_choices(focus_choices))
-                    
-            except gp.GPhoto2Error:
-                pass
-                
-            # 檢查拍攝目標設定
-            try:
-                target_config = config.get_child_by_name('capturetarget')
-                target_choices = []
-                current_target = target_config.get_value()
-                for i in range(target_config.count_choices()):
-                    target_choices.append(target_config.get_choice(i))
-                
-                # 更新拍攝目標選項
-                if target_choices:
-                    self.root.after_idle(lambda choices=target_choices, current=current_target: self.update_capture_target_choices(choices, current))
-                    self.status_queue.put(f"Found capture targets: {', '.join(target_choices)}")
-                    
-            except gp.GPhoto2Error:
-                self.status_queue.put("Camera doesn't support capture target selection")
+            index = self.config_cache.get_index()
+            capabilities = probe_capabilities(index, model=self.camera_model)
+            capabilities.shutter_display_map = {
+                self.convert_shutter_speed_to_display(value): value
+                for value in capabilities.get_choices('shutterspeed')
+            }
+            logging.info(
+                f"Capability probe: {len(capabilities.settings)} settings in {capabilities.probe_time * 1000:.1f} ms"
+            )
+
+            if capabilities.same_as(cached):
+                logging.info("Cached capabilities are up to date")
+            else:
+                self.post_to_ui(lambda: self.apply_capabilities(capabilities))
+                if cached:
+                    self.status_queue.put("Camera settings refreshed from camera")
+
+            if self.capability_key:
+                self.capability_store.save(self.capability_key, capabilities)
                 
         except Exception as e:
             self.status_queue.put(f"Capability check failed: {str(e)}")
+
+    def apply_capabilities(self, capabilities):
+        """將能力快照套用到所有下拉選單"""
+        updaters = {
+            'whitebalance': self.update_wb_choices,
+            'iso': self.update_iso_choices,
+            'f-number': self.update_aperture_choices,
+            'shutterspeed': lambda choices, current: self.update_shutter_choices(
+                choices, current, capabilities.shutter_display_map
+            ),
+            'imagequality': self.update_quality_choices,
+            'exposurecompensation': self.update_exp_comp_choices,
+            'meteringmode': self.update_metering_choices,
+            'focusmode': self.update_focus_choices,
+            'capturetarget': self.update_capture_target_choices,
+        }
+        for name, updater in updaters.items():
+            if capabilities.has(name):
+                updater(capabilities.get_choices(name), capabilities.get_current(name))
+
+        if capabilities.has('whitebalance'):
+            self.update_status(f"Found {len(capabilities.get_choices('whitebalance'))} white balance options")
+        if capabilities.has('capturetarget'):
+            self.update_status(f"Found capture targets: {', '.join(capabilities.get_choices('capturetarget'))}")
+        else:
+            self.update_status("Camera doesn't support capture target selection")
+        logging.info(f"Capabilities applied to UI (probe took {capabilities.probe_time * 1000:.1f} ms)")
     
-    def update_wb_choices(self, choices):
+    def update_wb_choices(self, choices, current_value=None):
         """更新白平衡選項"""
         self.wb_combo['values'] = choices
-        if choices and self.white_balance_var.get() not in choices:
+        if current_value and current_value in choices:
+            self.white_balance_var.set(current_value)
+        elif choices and self.white_balance_var.get() not in choices:
             self.white_balance_var.set(choices[0])
     
     def update_iso_choices(self, choices, current_value=None):
@@ -779,15 +898,16 @@ class CameraControlPro:
         elif choices:
             self.aperture_var.set(choices[0])
     
-    def update_shutter_choices(self, choices, current_value=None):
-        """更新快門速度選項"""
+    def update_shutter_choices(self, choices, current_value=None, display_map=None):
+        """更新快門速度選項（display_map 為快取中已轉換好的對應表）"""
         # 清空之前的對應表
         self.shutter_speed_map = {}
+        known_display = {value: display for display, value in (display_map or {}).items()}
         
         # 轉換選項為攝影格式並建立對應表
         display_choices = []
         for original_value in choices:
-            display_value = self.convert_shutter_speed_to_display(original_value)
+            display_value = known_display.get(original_value) or self.convert_shutter_speed_to_display(original_value)
             display_choices.append(display_value)
             self.shutter_speed_map[display_value] = original_value
         
@@ -803,28 +923,36 @@ class CameraControlPro:
             first_display = self.convert_shutter_speed_to_display(choices[0])
             self.shutter_var.set(first_display)
     
-    def update_quality_choices(self, choices):
+    def update_quality_choices(self, choices, current_value=None):
         """更新影像品質選項"""
         self.quality_combo['values'] = choices
-        if choices and self.image_quality_var.get() not in choices:
+        if current_value and current_value in choices:
+            self.image_quality_var.set(current_value)
+        elif choices and self.image_quality_var.get() not in choices:
             self.image_quality_var.set(choices[0])
     
-    def update_exp_comp_choices(self, choices):
+    def update_exp_comp_choices(self, choices, current_value=None):
         """更新曝光補償選項"""
         self.exp_comp_combo['values'] = choices
-        if choices and self.exposure_compensation_var.get() not in choices:
+        if current_value and current_value in choices:
+            self.exposure_compensation_var.set(current_value)
+        elif choices and self.exposure_compensation_var.get() not in choices:
             self.exposure_compensation_var.set(choices[0])
     
-    def update_metering_choices(self, choices):
+    def update_metering_choices(self, choices, current_value=None):
         """更新測光模式選項"""
         self.metering_combo['values'] = choices
-        if choices and self.metering_mode_var.get() not in choices:
+        if current_value and current_value in choices:
+            self.metering_mode_var.set(current_value)
+        elif choices and self.metering_mode_var.get() not in choices:
             self.metering_mode_var.set(choices[0])
     
-    def update_focus_choices(self, choices):
+    def update_focus_choices(self, choices, current_value=None):
         """更新對焦模式選項"""
         self.focus_combo['values'] = choices
-        if choices and self.focus_mode_var.get() not in choices:
+        if current_value and current_value in choices:
+            self.focus_mode_var.set(current_value)
+        elif choices and self.focus_mode_var.get() not in choices:
             self.focus_mode_var.set(choices[0])
     
     def update_capture_target_choices(self, choices, current_value):
@@ -911,11 +1039,9 @@ class CameraControlPro:
             return
             
         try:
-            config = self.camera.get_config(self.context)
-            
             # 嘗試設定捕獲目標為記憶體/電腦
             try:
-                capturetarget = config.get_child_by_name('capturetarget')
+                capturetarget = self.config_cache.get_widget('capturetarget')
                 current_value = capturetarget.get_value()
                 
                 # 尋找適合的tethered模式選項
@@ -928,8 +1054,7 @@ class CameraControlPro:
                 
                 if tethered_options:
                     # 使用第一個找到的tethered選項
-                    capturetarget.set_value(tethered_options[0])
-                    self.camera.set_config(config, self.context)
+                    self.config_cache.set('capturetarget', tethered_options[0])
                     self.status_queue.put(f"Tethered mode enabled: {tethered_options[0]}")
                 else:
                     # 顯示所有可用選項
@@ -938,32 +1063,36 @@ class CameraControlPro:
                         all_choices.append(capturetarget.get_choice(i))
                     self.status_queue.put(f"Available capture targets: {', '.join(all_choices)}")
                     
-            except gp.GPhoto2Error:
+            except (gp.GPhoto2Error, KeyError):
                 # 相機不支援capturetarget設定
                 self.status_queue.put("Camera doesn't support capture target setting")
                 
         except Exception as e:
             self.status_queue.put(f"Tethered setup failed: {str(e)}")
     
-    def show_camera_settings(self):
+    def show_camera_settings(self, refresh=False):
         """顯示相機支援的所有設定"""
         if not self.connected:
             messagebox.showinfo("Info", "Please connect camera first")
             return
             
-        def show_settings_thread():
+        def show_settings_task():
             try:
-                config = self.camera.get_config(self.context)
+                # 預設由快取提供；使用者按下 Refresh 時才重新讀取整個設定樹
+                if refresh:
+                    self.config_cache.refresh()
+                config = self.config_cache.get_config()
                 settings_info = self.get_all_camera_settings(config)
-                
-                
+                cache_stats = self.config_cache.get_stats()
+
+
                 # 建立新視窗顯示設定
-                self.root.after_idle(lambda: self.display_settings_window(settings_info))
-                
+                self.post_to_ui(lambda: self.display_settings_window(settings_info, cache_stats))
+
             except Exception as e:
                 self.status_queue.put(f"error:Failed to get camera settings: {str(e)}")
-        
-        threading.Thread(target=show_settings_thread, daemon=True).start()
+
+        self.run_on_camera_thread(show_settings_task)
     
     def get_all_camera_settings(self, config, prefix="", level=0, seen_paths=None):
         """遞歸獲取所有相機設定，避免重複"""
@@ -1027,7 +1156,7 @@ class CameraControlPro:
                 
         return settings
     
-    def display_settings_window(self, settings):
+    def display_settings_window(self, settings, cache_stats=None):
         """顯示設定視窗"""
         settings_window = tk.Toplevel(self.root)
         settings_window.title(f"Camera Settings - {self.camera_model}")
@@ -1056,6 +1185,35 @@ class CameraControlPro:
             fg='#2c3e50'
         )
         title_label.pack(pady=10)
+
+        # 設定快取統計與重新讀取
+        cache_frame = tk.Frame(scrollable_frame, bg='#f8f9fa')
+        cache_frame.pack(fill='x', padx=10, pady=(0, 10))
+
+        if cache_stats:
+            tk.Label(
+                cache_frame,
+                text=(
+                    f"Config cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses | "
+                    f"Writes: {cache_stats['single_writes']} single / {cache_stats['tree_writes']} full tree"
+                ),
+                font=('Arial', 9),
+                bg='#f8f9fa',
+                fg='#7f8c8d'
+            ).pack(side='left')
+
+        tk.Button(
+            cache_frame,
+            text="Refresh",
+            command=lambda: (settings_window.destroy(), self.show_camera_settings(refresh=True)),
+            font=('Arial', 9),
+            bg='#e9ecef',
+            fg='#495057',
+            relief='flat',
+            padx=15,
+            pady=2,
+            cursor='hand2'
+        ).pack(side='right')
         
         # 設定列表 - 顯示所有層級的設定
         if not settings:
@@ -1125,61 +1283,115 @@ class CameraControlPro:
             
     def connect_camera(self):
         """連接相機"""
-        def connect_thread():
+        def connect_task():
             try:
                 self.status_queue.put("Searching for camera...")
+                connect_start = time.perf_counter()
                 
-                # 檢測相機
-                camera_list = gp.check_result(gp.gp_camera_autodetect())
-                if not camera_list:
-                    self.status_queue.put("error:No camera found. Please check connection.")
+                # 檢測並初始化相機（後端同時建立設定樹快取，之後的讀取都由記憶體提供）
+                success, message = self.backend.connect_camera()
+                if not success:
+                    self.status_queue.put(f"error:{message}")
                     return
-                    
-                self.camera = gp.Camera()
-                self.camera.init(self.context)
-                
-                # 獲取相機資訊
-                abilities = self.camera.get_abilities()
-                self.camera_model = abilities.model
-                
-                # 檢查相機支援的設定
-                self.check_camera_capabilities()
+
+                self.camera = self.backend.camera
+                self.context = self.backend.context
+                self.config_cache = self.backend.config_cache
+                self.camera_model = self.backend.camera_model
+
+                # 以型號、序號與韌體版本查詢磁碟上的能力快取
+                serial, firmware = read_camera_identity(self.camera, self.context)
+                self.capability_key = CapabilityStore.make_key(self.camera_model, serial, firmware)
+                cached = self.capability_store.load(self.capability_key)
+
+                if cached:
+                    # 立即以快取填入下拉選單，之後在相機執行緒上背景重新驗證
+                    self.post_to_ui(lambda: self.apply_capabilities(cached))
+                    self.run_on_camera_thread(lambda: self.check_camera_capabilities(cached))
+                else:
+                    # 檢查相機支援的設定
+                    self.check_camera_capabilities()
                 
+                logging.info(
+                    f"Connected to {self.camera_model} in {(time.perf_counter() - connect_start) * 1000:.0f} ms"
+                    f"{' (capabilities from cache)' if cached else ''}"
+                )
                 self.status_queue.put(f"connected:{self.camera_model}")
                 
             except gp.GPhoto2Error as e:
                 self.status_queue.put(f"error:Connection failed: {str(e)}")
                 
-        threading.Thread(target=connect_thread, daemon=True).start()
+        self.run_on_camera_thread(connect_task)
         
     def disconnect_camera(self):
         """斷開相機連接"""
         if self.camera:
-            try:
-                self.camera.exit(self.context)
+            # 先阻擋新的拍攝，實際斷線在相機執行緒完成後回報
+            self.connected = False
+            self.connect_button.configure(state='disabled')
+            self.capture_button.configure(state='disabled')
+            if self.live_view.active:
+                self.run_on_camera_thread(self.stop_live_view_task)
+                self.on_live_view_stopped()
+            self.live_view_button.configure(state='disabled')
+
+            def disconnect_task():
+                if not self.backend.disconnect_camera():
+                    self.status_queue.put("Disconnect error: camera did not close cleanly")
                 self.camera = None
-                self.connected = False
-                
-                # 更新UI
-                self.connection_status.configure(text="● Disconnected", fg='#e74c3c')
-                self.connect_button.configure(text="Connect Camera", bg='#e9ecef', fg='#495057')
-                self.settings_button.configure(state='disabled')
-                self.capture_button.configure(state='disabled')
-                self.camera_info_label.configure(text="No camera connected")
-                self.update_status("Camera disconnected")
-                
-            except Exception as e:
-                self.update_status(f"Disconnect error: {str(e)}")
+                self.config_cache = None
+                self.status_queue.put("disconnected")
+
+            self.run_on_camera_thread(disconnect_task)
+
+    def on_camera_disconnected(self):
+        """相機執行緒完成斷線後更新UI"""
+        self.connected = False
+        self.connection_status.configure(text="● Disconnected", fg='#e74c3c')
+        self.connect_button.configure(text="Connect Camera", bg='#e9ecef', fg='#495057', state='normal')
+        self.settings_button.configure(state='disabled')
+        self.capture_button.configure(state='disabled')
+        self.camera_info_label.configure(text="No camera connected")
+        self.update_status("Camera disconnected")
                 
+    def toggle_live_view(self):
+        """開啟/關閉即時預覽"""
+        if not self.connected:
+            messagebox.showerror("Error", "Please connect camera first")
+            return
+
+        if self.live_view.active:
+            self.run_on_camera_thread(self.stop_live_view_task)
+            self.on_live_view_stopped()
+        else:
+            self.live_view_box = (self.preview_canvas.winfo_width(), self.preview_canvas.winfo_height())
+            self.preview_source = None
+            self.live_view.start()
+            self.live_view_button.configure(text="Stop Live View")
+            self.live_view_label.configure(text=f"Live view starting ({self.live_view.target_fps} fps target)")
+
+    def on_live_view_stopped(self):
+        """即時預覽停止後更新UI"""
+        self.live_view.stop()
+        self.live_view_button.configure(text="Start Live View")
+        stats = self.live_view.get_stats()
+        self.live_view_label.configure(text="Live view off")
+        if stats['frames']:
+            logging.info(
+                f"Live view stopped: {stats['displayed']} frames shown, {stats['fps']:.1f} fps, "
+                f"dropped {stats['dropped'] + stats['skipped']}, avg latency {stats['latency_avg'] * 1000:.0f} ms, "
+                f"avg grab {stats['grab_avg'] * 1000:.0f} ms"
+            )
+
     def capture_photo(self):
         """拍攝照片"""
         if not self.connected:
             messagebox.showerror("Error", "Please connect camera first")
             return
         
-        if self.setting_in_progress:
-            messagebox.showinfo("Info", "Camera settings are being updated. Please wait a moment and try again.")
-            return
+        # 設定仍在寫入時不拒絕拍攝，拍攝任務會在相機執行緒上等待設定完成
+        if self.setting_queue.is_pending():
+            self.update_status("Capture will start after pending settings are applied")
         
         # 將拍攝任務加入佇列
         capture_task = {
@@ -1191,15 +1403,6 @@ class CameraControlPro:
         }
         self.capture_queue.put(capture_task)
         
-    def process_capture_queue(self):
-        """處理拍攝佇列中的任務"""
-        try:
-            if not self.capture_queue.empty():
-                task = self.capture_queue.get_nowait()
-                self.execute_capture_task(task)
-        except queue.Empty:
-            pass
-            
     def execute_capture_task(self, task):
         """執行拍攝任務"""
         try:
@@ -1208,13 +1411,15 @@ class CameraControlPro:
                 self.status_queue.put("error:Camera not connected")
                 return
             
-            # 檢查相機是否仍然可用
-            try:
-                self.camera.get_config(self.context)
-            except:
-                self.status_queue.put("error:Camera connection lost")
-                return
-            
+            # 拍攝期間暫停即時預覽（結束後保留拍攝結果一段時間）
+            if self.live_view.active:
+                self.live_view.pause(3600)
+
+            # 先套用尚未寫入的設定：寫入只在本執行緒進行，直接清空佇列，
+            # 不等待排在本任務之後的 flush（否則會等到逾時）
+            while self.setting_queue.is_pending():
+                self.flush_setting_queue()
+
             # 從任務中獲取參數
             mode = task['mode']
             try:
@@ -1225,63 +1430,36 @@ class CameraControlPro:
                 interval_time = 0
             save_path = task['save_path']
             prefix = task['filename_prefix']
-            
-            if not os.path.exists(save_path):
-                os.makedirs(save_path)
-                
+
             total_shots = burst_count if mode == "burst" else 1
-            
-            for i in range(total_shots):
-                progress = (i + 1) / total_shots * 100
-                self.status_queue.put(f"progress:{progress}")
-                
-                if total_shots > 1:
-                    self.status_queue.put(f"Capturing {i+1}/{total_shots}...")
+
+            def on_progress(i, count):
+                self.status_queue.put(f"progress:{(i + 1) / count * 100}")
+                if count > 1:
+                    self.status_queue.put(f"Capturing {i+1}/{count}...")
                 else:
                     self.status_queue.put("Capturing...")
-                
-                # 生成檔名
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                if total_shots > 1:
-                    filename = f"{prefix}_{timestamp}_{i+1:03d}.jpg"
-                else:
-                    filename = f"{prefix}_{timestamp}.jpg"
-                
-                target_path = os.path.join(save_path, filename)
-                
-                # 拍攝照片 - 嘗試強制拍攝
-                file_path = self.camera.capture(gp.GP_CAPTURE_IMAGE, self.context)
-                
-                camera_file = gp.CameraFile()  # 預先建立 CameraFile 物件
-                self.camera.file_get(
-                    file_path.folder, file_path.name,
-                    gp.GP_FILE_TYPE_NORMAL, camera_file, self.context  # 將 camera_file 作為 in/out 參數傳入
-                )
-                camera_file.save(target_path)  # 使用傳入的物件儲存
 
-                # 刪除相機中的檔案以釋放記憶體
-                try:
-                    self.camera.file_delete(file_path.folder, file_path.name, self.context)
-                except:
-                    pass  # 有些相機不支援刪除，忽略錯誤
-                
-                # 確認檔案已儲存
-                if os.path.exists(target_path):
-                    self.photo_queue.put(target_path)
-                else:
-                    self.status_queue.put(f"error:Failed to save photo: {filename}")
-                
-                # 間隔等待
-                if i < total_shots - 1:
-                    if mode == "interval" and interval_time > 0:
-                        time.sleep(interval_time)
-                    elif total_shots > 1:
-                        time.sleep(0.5)  # 連拍間隔
-                    
-            self.status_queue.put(f"Captured {total_shots} photo(s)")
+            # 後端以管線拍攝：相機執行緒只負責觸發與下載，儲存與刪除在其他階段進行
+            stats = self.backend.capture_sequence(
+                save_path, prefix, total_shots,
+                interval=interval_time if mode == "interval" else 0,
+                # 預覽直接使用記憶體中的 CameraFile 資料，與寫入磁碟同時進行
+                on_shot=self.queue_captured_frame,
+                on_saved=self.on_frame_saved,
+                on_progress=on_progress,
+                on_error=lambda frame, e: self.status_queue.put(f"error:Failed to save photo: {frame['filename']}")
+            )
+
+            logging.info(
+                f"Capture pipeline: {stats['frames']} frame(s) in {stats['elapsed']:.2f}s "
+                f"({stats['frames_per_minute']:.1f} frames/min)"
+            )
+            self.status_queue.put(f"Captured {stats['frames']} photo(s)")
             self.status_queue.put("progress:0")  # 重置進度條
-            
+
         except gp.GPhoto2Error as e:
+            # 後端已讓設定樹快取失效，下次讀取時重新取得
             try:
                 error_msg = gp.check_result(e.code) if hasattr(e, 'code') else str(e)
             except:
@@ -1291,25 +1469,24 @@ class CameraControlPro:
         except Exception as e:
             self.status_queue.put(f"error:Capture failed: {str(e)}")
             self.status_queue.put("progress:0")
+        finally:
+            if self.live_view.active:
+                self.live_view.pause(HOLD_AFTER_CAPTURE)
         
     def on_setting_change(self, setting_name, value):
         """處理設定變更"""
         if self.connected:
-            self.setting_in_progress = True  # 標記設定開始
             # 快門速度需要特殊處理：將顯示值轉換為原始值
             if setting_name == 'shutterspeed' and value in self.shutter_speed_map:
                 original_value = self.shutter_speed_map[value]
                 self.update_status(f"Setting {setting_name} to {value} ({original_value})...")
-                threading.Thread(
-                    target=lambda name=setting_name, val=original_value: self.set_camera_setting(name, val),
-                    daemon=True
-                ).start()
             else:
+                original_value = value
                 self.update_status(f"Setting {setting_name} to {value}...")
-                threading.Thread(
-                    target=lambda name=setting_name, val=value: self.set_camera_setting(name, val),
-                    daemon=True
-                ).start()
+
+            # 加入設定佇列；尚未寫入前的多次變更會合併為一次寫入
+            if self.setting_queue.put(setting_name, original_value):
+                self.run_on_camera_thread(self.flush_setting_queue)
         else:
             self.update_status(f"{setting_name} will be set when camera connects")
             
@@ -1323,99 +1500,155 @@ class CameraControlPro:
         self.capture_status_label.configure(text=mode_text.get(mode, "Unknown mode"))
     
         
+    def flush_setting_queue(self):
+        """在相機執行緒上一次套用所有待寫入的設定"""
+        batch = self.setting_queue.take()
+        if not batch:
+            return
+        try:
+            self.apply_camera_settings(batch)
+        finally:
+            self.setting_queue.done()
+
     def set_camera_setting(self, setting_name, value):
         """設定相機參數"""
+        self.apply_camera_settings({setting_name: value})
+
+    def apply_camera_settings(self, settings):
+        """設定相機參數（多個設定合併為一次寫入）"""
         if not self.camera:
-            self.setting_in_progress = False  # 清除設定進行中標記
             return
-            
+
+        names = ", ".join(settings)
         try:
-            config = self.camera.get_config(self.context)
-            setting = config.get_child_by_name(setting_name)
-            setting.set_value(str(value))
-            self.camera.set_config(config, self.context)
-            self.status_queue.put(f"✓ {setting_name}: {value}")
-            logging.info(f"Camera setting applied: {setting_name} = {value}")
-            
+            path, elapsed = self.backend.apply_settings(settings)
+            for setting_name, value in settings.items():
+                logging.info(f"Camera setting applied: {setting_name} = {value} via {path} config in {elapsed * 1000:.1f} ms")
+            if len(settings) == 1:
+                setting_name, value = next(iter(settings.items()))
+                self.status_queue.put(f"✓ {setting_name}: {value} ({path}, {elapsed * 1000:.0f} ms)")
+            else:
+                self.status_queue.put(f"✓ {names} ({path}, {elapsed * 1000:.0f} ms)")
+
         except gp.GPhoto2Error as e:
-            self.status_queue.put(f"error:Setting {setting_name} failed: {str(e)}")
+            self.status_queue.put(f"error:Setting {names} failed: {str(e)}")
         except Exception as e:
-            self.status_queue.put(f"error:Failed to set {setting_name}: {str(e)}")
-            logging.error(f"Setting {setting_name} failed: {str(e)}")
-        finally:
-            # 無論成功或失敗，都清除設定進行中標記
-            self.setting_in_progress = False
+            self.status_queue.put(f"error:Failed to set {names}: {str(e)}")
+            logging.error(f"Setting {names} failed: {str(e)}")
     
-    def navigate_to_setting(self, config, full_path):
-        """根據完整路徑導航到設定"""
+    def navigate_to_setting(self, full_path):
+        """根據完整路徑取得設定（由設定樹索引查詢）"""
         try:
-            parts = full_path.split('/')
-            current = config
-            
-            for i, part in enumerate(parts):
-                if part:  # 忽略空字串
-                    try:
-                        current = current.get_child_by_name(part)
-                    except gp.GPhoto2Error as e:
-                        self.status_queue.put(f"Failed to navigate to '{part}' in path '{full_path}' at step {i}: {str(e)}")
-                        return None
-                        
-            return current
+            widget = self.config_cache.get_index().get(full_path)
+            if widget is None:
+                self.status_queue.put(f"Setting not found: '{full_path}'")
+            return widget
         except Exception as e:
             self.status_queue.put(f"Navigation error for {full_path}: {str(e)}")
             return None
             
     
-    def load_preview_image(self, image_path):
-        """載入預覽圖片 - 使用相對置中"""
+    def load_preview_image(self, image_path, image_data=None):
+        """載入預覽圖片 - 交給背景執行緒解碼，完成後由 check_queues 顯示
+
+        image_data 可為記憶體中的影像資料（例如 gp.CameraFile），避免重新讀取磁碟。
+        """
         try:
-            with Image.open(image_path) as img:
-                # 取得當前畫布大小
-                self.preview_canvas.update()
-                canvas_width = self.preview_canvas.winfo_width()
-                canvas_height = self.preview_canvas.winfo_height()
-                
-                if canvas_width <= 1 or canvas_height <= 1:
-                    self.root.after(100, lambda: self.load_preview_image(image_path))
-                    return
-                
-                # 計算最適合的縮放比例
-                img_width, img_height = img.size
-                padding = 20
-                scale = min(
-                    (canvas_width - padding) / img_width,
-                    (canvas_height - padding) / img_height,
-                    1.0  # 不放大，只縮小
-                )
-                
-                new_width = int(img_width * scale)
-                new_height = int(img_height * scale)
-                
-                # 縮放圖片
-                img_resized = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                photo = ImageTk.PhotoImage(img_resized)
-                
-                # 清除畫布
-                self.preview_canvas.delete("all")
-                
-                # 使用相對座標置中 (0.5 = 50% = 中心)
-                self.preview_canvas.create_image(
-                    canvas_width * 0.5,  # X座標：畫布寬度的50%
-                    canvas_height * 0.5,  # Y座標：畫布高度的50%
-                    image=photo, 
-                    anchor='center',
-                    tags='preview_image'
-                )
-                
-                # 保持圖片引用
-                self.preview_canvas.image = photo
-                
-                # 綁定畫布大小變更事件來重新置中
-                self.preview_canvas.bind('<Configure>', lambda e: self.recenter_image())
-                
+            # 取得當前畫布大小
+            canvas_width = self.preview_canvas.winfo_width()
+            canvas_height = self.preview_canvas.winfo_height()
+            
+            if canvas_width <= 1 or canvas_height <= 1:
+                self.root.after(100, lambda: self.load_preview_image(image_path, image_data))
+                return
+            
+            # 尚未開始解碼的舊請求會被新的取代
+            source = image_data if image_data is not None else image_path
+            self.preview_worker.submit(source, (canvas_width, canvas_height), key=image_path)
+            
         except Exception as e:
             self.update_status(f"Preview load failed: {str(e)}")
-    
+
+    def display_preview(self, result):
+        """在畫布上顯示背景解碼完成的預覽 - 使用相對置中"""
+        if result['error'] is not None:
+            self.update_status(f"Preview load failed: {str(result['error'])}")
+            return
+        
+        # 即時預覽影格：暫停中（顯示剛拍攝的照片）或已關閉時不顯示
+        is_live_frame = result['key'] == LIVE_VIEW_KEY
+        if is_live_frame and not self.live_view.is_running():
+            return
+        
+        try:
+            info = result['info']
+            if is_live_frame:
+                self.show_preview_image(result['image'], reuse=True)
+                self.live_view.frame_displayed(result['meta']['started'])
+                return
+
+            logging.info(
+                f"Preview {os.path.basename(str(result['key']))}: {info['path']} decode "
+                f"{info['source_size'][0]}x{info['source_size'][1]} -> {info['size'][0]}x{info['size'][1]} "
+                f"in {info['decode_time'] * 1000:.1f} ms"
+            )
+            self.last_preview_info = info
+            self.preview_source = result['key']
+            self.preview_box = result['box_size']
+            self.show_preview_image(result['image'])
+            
+        except Exception as e:
+            self.update_status(f"Preview load failed: {str(e)}")
+
+    def show_preview_image(self, image, reuse=False):
+        """將影像畫到預覽畫布；reuse=True 時尺寸相同就直接覆寫現有的 PhotoImage"""
+        photo = getattr(self.preview_canvas, 'image', None)
+        if (reuse and photo is not None and (photo.width(), photo.height()) == image.size
+                and self.preview_canvas.find_withtag('preview_image')):
+            photo.paste(image)
+            return
+
+        photo = ImageTk.PhotoImage(image)
+        
+        canvas_width = self.preview_canvas.winfo_width()
+        canvas_height = self.preview_canvas.winfo_height()
+        
+        # 清除畫布
+        self.preview_canvas.delete("all")
+        
+        # 使用相對座標置中 (0.5 = 50% = 中心)
+        self.preview_canvas.create_image(
+            canvas_width * 0.5,  # X座標：畫布寬度的50%
+            canvas_height * 0.5,  # Y座標：畫布高度的50%
+            image=photo, 
+            anchor='center',
+            tags='preview_image'
+        )
+        
+        # 保持圖片引用
+        self.preview_canvas.image = photo
+        
+        # 綁定畫布大小變更事件來重新置中並重新縮放
+        self.preview_canvas.bind('<Configure>', lambda e: self.on_preview_resize())
+
+    def on_preview_resize(self):
+        """畫布大小變更：立即重新置中，停止調整後再由快取重新縮放"""
+        self.recenter_image()
+        if self.preview_resize_job:
+            self.root.after_cancel(self.preview_resize_job)
+        self.preview_resize_job = self.root.after(150, self.rescale_preview)
+
+    def rescale_preview(self):
+        """依新的畫布大小重新縮放目前的預覽（由預覽快取提供，不重新讀檔）"""
+        self.preview_resize_job = None
+        canvas_size = (self.preview_canvas.winfo_width(), self.preview_canvas.winfo_height())
+        if self.live_view.active:
+            self.live_view_box = canvas_size
+        if not self.preview_source:
+            return
+        if canvas_size != self.preview_box and canvas_size[0] > 1 and canvas_size[1] > 1:
+            self.preview_worker.submit(self.preview_source, canvas_size)
+
     def recenter_image(self):
         """重新置中預覽圖片"""
         try:
@@ -1453,48 +1686,56 @@ class CameraControlPro:
         else:
             messagebox.showwarning("Warning", "Photo folder does not exist")
     
+    def show_shot(self, shot):
+        """在預覽區顯示底片列中選取的照片"""
+        if shot.preview_path:
+            self.load_preview_image(shot.preview_path)
+        else:
+            self.update_status(f"No preview for {shot.name}")
+
     def delete_last_photo(self):
-        """刪除最後一張拍攝的照片"""
+        """刪除最後一張拍攝的照片（連同 RAW/JPEG 同名檔案）"""
         save_path = self.save_path_var.get()
         if not os.path.exists(save_path):
             messagebox.showwarning("Warning", "Photo folder does not exist")
             return
             
         try:
-            # 獲取資料夾中所有 jpg 檔案，按修改時間排序
-            jpg_files = []
-            for filename in os.listdir(save_path):
-                if filename.lower().endswith(('.jpg', '.jpeg')):
-                    filepath = os.path.join(save_path, filename)
-                    if os.path.isfile(filepath):
-                        jpg_files.append(filepath)
-            
-            if not jpg_files:
+            # 由照片索引取得最新的一張，不需列出整個資料夾
+            latest_shot = self.session_index.last()
+            if not latest_shot:
                 messagebox.showinfo("Info", "No photos found in the save folder")
                 return
             
-            # 按修改時間排序，最新的在最後
-            jpg_files.sort(key=lambda x: os.path.getmtime(x))
-            latest_photo = jpg_files[-1]
-            
             # 確認刪除
-            filename = os.path.basename(latest_photo)
+            filenames = "\n".join(os.path.basename(path) for path in latest_shot.files)
             result = messagebox.askyesno(
                 "Confirm Delete", 
-                f"Are you sure you want to delete the last photo?\n\n{filename}"
+                f"Are you sure you want to delete the last photo?\n\n{filenames}"
             )
             
             if result:
-                os.remove(latest_photo)
-                self.update_status(f"Deleted: {filename}")
+                deleted, failed = self.session_index.delete(latest_shot)
+                if failed:
+                    names = "\n".join(os.path.basename(path) for path in failed)
+                    messagebox.showerror("Error", f"Failed to delete:\n\n{names}")
+                if not deleted:
+                    return
+                self.update_status(f"Deleted: {latest_shot.name}")
                 
                 # 清除預覽圖片如果刪除的是當前顯示的圖片
                 self.preview_canvas.delete("all")
+                for path in deleted:
+                    self.ingest.forget(path)
+                    self.filmstrip.forget(path)
+                    self.preview_worker.cache.discard(path)
+                    if self.preview_source == path:
+                        self.preview_source = None
                 
-                # 如果還有其他照片，顯示倒數第二張
-                if len(jpg_files) > 1:
-                    second_latest = jpg_files[-2]
-                    self.load_preview_image(second_latest)
+                # 如果還有其他照片，顯示前一張
+                previous_shot = self.session_index.last()
+                if previous_shot and previous_shot.preview_path:
+                    self.load_preview_image(previous_shot.preview_path)
                     
         except Exception as e:
             messagebox.showerror("Error", f"Failed to delete photo: {str(e)}")
@@ -1505,21 +1746,30 @@ class CameraControlPro:
         
     def check_queues(self):
         """檢查佇列訊息"""
-        # 檢查拍攝佇列
-        self.process_capture_queue()
-        
-        # 檢查狀態佇列
+        # 檢查狀態佇列（拍攝任務由相機工作執行緒處理）
         try:
             while True:
                 message = self.status_queue.get_nowait()
-                
-                if message.startswith("connected:"):
+
+                # 工作執行緒交回的 UI 更新
+                if callable(message):
+                    message()
+
+                elif message == "disconnected":
+                    self.on_camera_disconnected()
+
+                elif message == "live_view_stopped":
+                    self.on_live_view_stopped()
+
+                elif message.startswith("connected:"):
                     model = message.split(":", 1)[1]
                     self.connected = True
                     self.connection_status.configure(text="● Connected", fg='#27ae60')
                     self.connect_button.configure(text="Disconnect Camera", bg='#e9ecef', fg='#495057')
                     self.settings_button.configure(state='normal')
                     self.capture_button.configure(state='normal')
+                    if self.backend.supports(FEATURE_LIVE_VIEW):
+                        self.live_view_button.configure(state='normal')
                     self.camera_info_label.configure(text=f"Connected: {model}")
                     self.update_status(f"Connected to {model}")
                     
@@ -1538,23 +1788,77 @@ class CameraControlPro:
         except queue.Empty:
             pass
             
-        # 檢查照片佇列
+        # 檢查照片佇列：連拍時只預覽最新的一張（RAW 檔由同名 JPEG 預覽）
+        latest_photo = None
         try:
             while True:
-                photo_path = self.photo_queue.get_nowait()
-                self.load_preview_image(photo_path)
+                photo = self.photo_queue.get_nowait()
+                path = photo[0] if isinstance(photo, tuple) else photo
+                if not isinstance(photo, tuple):
+                    # 記憶體中的影格在寫入磁碟後才加入索引（on_saved）
+                    self.session_index.add(path)
+                if is_previewable(path):
+                    latest_photo = photo
                 
         except queue.Empty:
             pass
+        
+        if latest_photo:
+            # 拍攝路徑會附上記憶體中的影像資料 (路徑, CameraFile)
+            if isinstance(latest_photo, tuple):
+                self.load_preview_image(*latest_photo)
+            else:
+                self.load_preview_image(latest_photo)
+        
+        # 顯示背景解碼完成的預覽
+        preview_result = self.preview_worker.get_result()
+        if preview_result:
+            self.display_preview(preview_result)
+
+        # 底片列跟隨索引變更並顯示完成的縮圖
+        self.filmstrip.update()
+
+        # 每秒更新一次即時預覽統計
+        if self.live_view.active and time.time() - self.live_view_stats_time >= 1.0:
+            self.live_view_stats_time = time.time()
+            stats = self.live_view.get_stats()
+            self.live_view_label.configure(
+                text=f"Live view: {stats['fps']:.1f} fps | dropped {stats['dropped'] + stats['skipped']} | "
+                     f"latency {stats['latency_avg'] * 1000:.0f} ms"
+            )
             
         self.root.after(50, self.check_queues)
         
     def run(self):
         """啟動應用程式"""
         self.root.mainloop()
+        self.ingest.stop()
+        self.filmstrip.stop()
+        if self.mjpeg_server:
+            self.mjpeg_server.stop()
 
 def main():
-    app = CameraControlPro()
+    parser = argparse.ArgumentParser(description="pyCameraControl")
+    parser.add_argument("--mjpeg-port", type=int, default=None,
+                        help="serve live view as MJPEG over HTTP on this port")
+    parser.add_argument("--mjpeg-host", default="127.0.0.1",
+                        help="address for the MJPEG server (default: 127.0.0.1)")
+    parser.add_argument("--simulate", action="store_true",
+                        help="use the simulated camera instead of gPhoto2 (no hardware needed)")
+    parser.add_argument("--delete-camera-shots", action="store_true",
+                        help="delete photos taken with the camera's shutter button from the card once downloaded")
+    args = parser.parse_args()
+
+    global gp
+    if args.simulate:
+        import simulated_camera
+        gp = simulated_camera
+    elif gp is None:
+        parser.error("python-gphoto2 is not installed (pip install gphoto2), or run with --simulate")
+
+    app = CameraControlPro(
+        mjpeg_port=args.mjpeg_port, mjpeg_host=args.mjpeg_host, delete_camera_shots=args.delete_camera_shots
+    )
     app.run()
 
 if __name__ == "__main__":
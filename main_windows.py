@@ -11,15 +11,20 @@ from tkinter import ttk, filedialog, messagebox
 import threading
 import queue
 import os
-from PIL import Image, ImageTk
+import argparse
+from PIL import ImageTk
 import logging
 
 # Import our camera backend
 from camera_backends import DigiCamControlBackend
+from preview import PreviewWorker, is_previewable
+from file_watch import DirectoryIngest
+from session_index import SessionIndex
+from filmstrip import Filmstrip
 
 
 class CameraControlWindows:
-	def __init__(self):
+	def __init__(self, dcc_path=None):
 		# 初始化主視窗
 		self.root = tk.Tk()
 		self.root.title("pyCameraControl - Windows")
@@ -29,7 +34,8 @@ class CameraControlWindows:
 		
 		# 相機後端
 		try:
-			self.camera_backend = DigiCamControlBackend()
+			# dcc_path 可指定 CameraControlRemoteCmd.exe 位置（例如在 Linux 上使用 fake_dcc_remote.py）
+			self.camera_backend = DigiCamControlBackend(dcc_path=dcc_path)
 		except Exception as e:
 			messagebox.showerror("Error", f"Failed to initialize camera backend: {e}")
 			self.root.destroy()
@@ -43,6 +49,16 @@ class CameraControlWindows:
 		self.photo_queue = queue.Queue()
 		self.status_queue = queue.Queue()
 		self.capture_queue = queue.Queue()  # 新增拍攝任務佇列
+		self.last_preview_info = None  # 最近一次預覽解碼的方式與耗時
+		self.preview_worker = PreviewWorker()  # 背景預覽解碼（只處理最新一張）
+		self.preview_source = None  # 目前顯示的預覽來源（視窗縮放時重新縮放用）
+		self.preview_box = None
+		self.preview_resize_job = None
+		self.save_path_job = None  # 儲存路徑輸入停止後才套用
+		# 監看儲存資料夾：機身快門或 digiCamControl 直接寫入的照片也會送進照片佇列
+		self.ingest = DirectoryIngest(on_file=self.photo_queue.put)
+		self.camera_backend.ingest = self.ingest  # 拍攝時共用同一個資料夾監看，不另外掃描資料夾
+		self.session_index = SessionIndex()  # 儲存資料夾的照片索引（依拍攝順序，RAW/JPEG 同組）
 		
 		# 設定變數
 		self.save_directory = "./photos"
@@ -51,6 +67,7 @@ class CameraControlWindows:
 		# 建立介面
 		self.create_main_layout()
 		self.setup_logging()
+		self.start_ingest()
 		self.check_queues()
 		
 	def setup_variables(self):
@@ -64,6 +81,36 @@ class CameraControlWindows:
 		self.save_path_var = tk.StringVar(value=self.save_directory)
 		self.filename_prefix_var = tk.StringVar(value="IMG")
 		
+	def start_ingest(self):
+		"""開始監看儲存資料夾並建立照片索引，變更儲存路徑時改用新的資料夾"""
+		self.on_save_path_change()
+		# 輸入中不逐字切換資料夾：停止輸入、離開欄位或按 Enter 時才套用
+		self.save_path_var.trace_add('write', lambda *args: self.schedule_save_path_change())
+		self.path_entry.bind('<FocusOut>', lambda e: self.on_save_path_change())
+		self.path_entry.bind('<Return>', lambda e: self.on_save_path_change())
+		self.ingest.start()
+
+	def schedule_save_path_change(self):
+		"""儲存路徑輸入中：延後套用，每次輸入重新計時"""
+		if self.save_path_job:
+			self.root.after_cancel(self.save_path_job)
+		self.save_path_job = self.root.after(500, self.on_save_path_change)
+
+	def on_save_path_change(self):
+		"""儲存路徑變更：監看新的資料夾，並在背景以一次 scandir 重建索引"""
+		if self.save_path_job:
+			self.root.after_cancel(self.save_path_job)
+			self.save_path_job = None
+		save_path = self.save_path_var.get()
+		self.ingest.set_directory(save_path)
+		self.session_index.set_directory(save_path)
+
+	def queue_captured_files(self, files):
+		"""拍攝路徑回報的檔案；資料夾監看已回報的檔案不重複送出"""
+		for filepath in files:
+			if self.ingest.claim(filepath):
+				self.photo_queue.put(filepath)
+
 	def setup_logging(self):
 		"""設定日誌記錄"""
 		logging.basicConfig(
@@ -299,7 +346,11 @@ class CameraControlWindows:
 			bd=1,
 			highlightthickness=0
 		)
-		self.preview_canvas.pack(fill='both', expand=True)
+		self.preview_canvas.pack(fill='both', expand=True, pady=(0, 5))
+
+		# 底片列：瀏覽本次拍攝的照片（縮圖由背景執行緒產生並快取）
+		self.filmstrip = Filmstrip(preview_block, self.session_index, on_select=self.show_shot)
+		self.filmstrip.pack(fill='x')
 		
 		# === 2. 檔案管理區塊 ===
 		file_block = self.create_section_block(preview_frame, "File Management")
@@ -537,9 +588,9 @@ class CameraControlWindows:
 				
 				if success:
 					self.status_queue.put(f"Burst complete: {len(files)} photos")
-					# 顯示最後一張照片
+					# 送出連拍的照片（預覽只顯示最新一張）
 					if files:
-						self.photo_queue.put(files[-1])
+						self.queue_captured_files(files)
 				else:
 					self.status_queue.put(f"error:{message}")
 			
@@ -555,7 +606,7 @@ class CameraControlWindows:
 				if success:
 					self.status_queue.put("Photo captured successfully")
 					if filepath:
-						self.photo_queue.put(filepath)
+						self.queue_captured_files([filepath])
 				else:
 					self.status_queue.put(f"error:{message}")
 			
@@ -578,55 +629,80 @@ class CameraControlWindows:
 	
 	
 	def load_preview_image(self, image_path):
-		"""載入預覽圖片 - 使用相對置中"""
+		"""載入預覽圖片 - 交給背景執行緒解碼，完成後由 check_queues 顯示"""
 		try:
-			with Image.open(image_path) as img:
-				# 取得當前畫布大小
-				self.preview_canvas.update()
-				canvas_width = self.preview_canvas.winfo_width()
-				canvas_height = self.preview_canvas.winfo_height()
-				
-				if canvas_width <= 1 or canvas_height <= 1:
-					self.root.after(100, lambda: self.load_preview_image(image_path))
-					return
-				
-				# 計算最適合的縮放比例
-				img_width, img_height = img.size
-				padding = 20
-				scale = min(
-					(canvas_width - padding) / img_width,
-					(canvas_height - padding) / img_height,
-					1.0  # 不放大，只縮小
-				)
-				
-				new_width = int(img_width * scale)
-				new_height = int(img_height * scale)
-				
-				# 縮放圖片
-				img_resized = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-				photo = ImageTk.PhotoImage(img_resized)
-				
-				# 清除畫布
-				self.preview_canvas.delete("all")
-				
-				# 使用相對座標置中 (0.5 = 50% = 中心)
-				self.preview_canvas.create_image(
-					canvas_width * 0.5,  # X座標：畫布寬度的50%
-					canvas_height * 0.5,  # Y座標：畫布高度的50%
-					image=photo, 
-					anchor='center',
-					tags='preview_image'
-				)
-				
-				# 保持圖片引用
-				self.preview_canvas.image = photo
-				
-				# 綁定畫布大小變更事件來重新置中
-				self.preview_canvas.bind('<Configure>', lambda e: self.recenter_image())
-				
+			# 取得當前畫布大小
+			canvas_width = self.preview_canvas.winfo_width()
+			canvas_height = self.preview_canvas.winfo_height()
+			
+			if canvas_width <= 1 or canvas_height <= 1:
+				self.root.after(100, lambda: self.load_preview_image(image_path))
+				return
+			
+			# 尚未開始解碼的舊請求會被新的取代
+			self.preview_worker.submit(image_path, (canvas_width, canvas_height))
+			
+		except Exception as e:
+			self.update_status(f"Preview load failed: {str(e)}")
+
+	def display_preview(self, result):
+		"""在畫布上顯示背景解碼完成的預覽 - 使用相對置中"""
+		if result['error'] is not None:
+			self.update_status(f"Preview load failed: {str(result['error'])}")
+			return
+		
+		try:
+			info = result['info']
+			logging.info(
+				f"Preview {os.path.basename(str(result['key']))}: {info['path']} decode "
+				f"{info['source_size'][0]}x{info['source_size'][1]} -> {info['size'][0]}x{info['size'][1]} "
+				f"in {info['decode_time'] * 1000:.1f} ms"
+			)
+			self.last_preview_info = info
+			self.preview_source = result['key']
+			self.preview_box = result['box_size']
+			photo = ImageTk.PhotoImage(result['image'])
+			
+			canvas_width = self.preview_canvas.winfo_width()
+			canvas_height = self.preview_canvas.winfo_height()
+			
+			# 清除畫布
+			self.preview_canvas.delete("all")
+			
+			# 使用相對座標置中 (0.5 = 50% = 中心)
+			self.preview_canvas.create_image(
+				canvas_width * 0.5,  # X座標：畫布寬度的50%
+				canvas_height * 0.5,  # Y座標：畫布高度的50%
+				image=photo, 
+				anchor='center',
+				tags='preview_image'
+			)
+			
+			# 保持圖片引用
+			self.preview_canvas.image = photo
+			
+			# 綁定畫布大小變更事件來重新置中並重新縮放
+			self.preview_canvas.bind('<Configure>', lambda e: self.on_preview_resize())
+			
 		except Exception as e:
 			self.update_status(f"Preview load failed: {str(e)}")
 	
+	def on_preview_resize(self):
+		"""畫布大小變更：立即重新置中，停止調整後再由快取重新縮放"""
+		self.recenter_image()
+		if self.preview_resize_job:
+			self.root.after_cancel(self.preview_resize_job)
+		self.preview_resize_job = self.root.after(150, self.rescale_preview)
+
+	def rescale_preview(self):
+		"""依新的畫布大小重新縮放目前的預覽（由預覽快取提供，不重新讀檔）"""
+		self.preview_resize_job = None
+		if not self.preview_source:
+			return
+		canvas_size = (self.preview_canvas.winfo_width(), self.preview_canvas.winfo_height())
+		if canvas_size != self.preview_box and canvas_size[0] > 1 and canvas_size[1] > 1:
+			self.preview_worker.submit(self.preview_source, canvas_size)
+
 	def recenter_image(self):
 		"""重新置中預覽圖片"""
 		try:
@@ -656,49 +732,56 @@ class CameraControlWindows:
 			self.save_path_var.set(directory)
 			self.save_directory = directory
 
+	def show_shot(self, shot):
+		"""在預覽區顯示底片列中選取的照片"""
+		if shot.preview_path:
+			self.load_preview_image(shot.preview_path)
+		else:
+			self.update_status(f"No preview for {shot.name}")
+
 	def delete_last_photo(self):
-		"""刪除最後一張拍攝的照片"""
+		"""刪除最後一張拍攝的照片（連同 RAW/JPEG 同名檔案）"""
 		save_path = self.save_path_var.get()
 		if not os.path.exists(save_path):
 			messagebox.showwarning("Warning", "Photo folder does not exist")
 			return
 			
 		try:
-			# 獲取資料夾中所有圖片檔案，按修改時間排序
-			image_extensions = ('.jpg', '.jpeg', '.cr2', '.cr3', '.nef', '.arw', '.dng', '.png', '.tiff')
-			image_files = []
-			for filename in os.listdir(save_path):
-				if filename.lower().endswith(image_extensions):
-					filepath = os.path.join(save_path, filename)
-					if os.path.isfile(filepath):
-						image_files.append(filepath)
-			
-			if not image_files:
+			# 由照片索引取得最新的一張，不需列出整個資料夾
+			latest_shot = self.session_index.last()
+			if not latest_shot:
 				messagebox.showinfo("Info", "No photos found in the save folder")
 				return
 			
-			# 按修改時間排序，最新的在最後
-			image_files.sort(key=lambda x: os.path.getmtime(x))
-			latest_photo = image_files[-1]
-			
 			# 確認刪除
-			filename = os.path.basename(latest_photo)
+			filenames = "\n".join(os.path.basename(path) for path in latest_shot.files)
 			result = messagebox.askyesno(
 				"Confirm Delete", 
-				f"Are you sure you want to delete the last photo?\n\n{filename}"
+				f"Are you sure you want to delete the last photo?\n\n{filenames}"
 			)
 			
 			if result:
-				os.remove(latest_photo)
-				self.update_status(f"Deleted: {filename}")
+				deleted, failed = self.session_index.delete(latest_shot)
+				if failed:
+					names = "\n".join(os.path.basename(path) for path in failed)
+					messagebox.showerror("Error", f"Failed to delete:\n\n{names}")
+				if not deleted:
+					return
+				self.update_status(f"Deleted: {latest_shot.name}")
 				
 				# 清除預覽圖片如果刪除的是當前顯示的圖片
 				self.preview_canvas.delete("all")
+				for path in deleted:
+					self.ingest.forget(path)
+					self.filmstrip.forget(path)
+					self.preview_worker.cache.discard(path)
+					if self.preview_source == path:
+						self.preview_source = None
 				
-				# 如果還有其他照片，顯示倒數第二張
-				if len(image_files) > 1:
-					second_latest = image_files[-2]
-					self.load_preview_image(second_latest)
+				# 如果還有其他照片，顯示前一張
+				previous_shot = self.session_index.last()
+				if previous_shot and previous_shot.preview_path:
+					self.load_preview_image(previous_shot.preview_path)
 					
 		except Exception as e:
 			messagebox.showerror("Error", f"Failed to delete photo: {str(e)}")
@@ -757,25 +840,46 @@ class CameraControlWindows:
 		except queue.Empty:
 			pass
 			
-		# 檢查照片佇列
+		# 檢查照片佇列：連拍時只預覽最新的一張（RAW 檔由同名 JPEG 預覽）
+		latest_photo = None
 		try:
 			while True:
-				photo_path = self.photo_queue.get_nowait()
-				self.load_preview_image(photo_path)
+				photo = self.photo_queue.get_nowait()
+				self.session_index.add(photo)
+				if is_previewable(photo):
+					latest_photo = photo
 				
 		except queue.Empty:
 			pass
+		
+		if latest_photo:
+			self.load_preview_image(latest_photo)
+		
+		# 顯示背景解碼完成的預覽
+		preview_result = self.preview_worker.get_result()
+		if preview_result:
+			self.display_preview(preview_result)
+
+		# 底片列跟隨索引變更並顯示完成的縮圖
+		self.filmstrip.update()
 			
 		self.root.after(50, self.check_queues)
 		
 	def run(self):
 		"""啟動應用程式"""
 		self.root.mainloop()
+		self.ingest.stop()
+		self.filmstrip.stop()
 
 
 def main():
+	parser = argparse.ArgumentParser(description="pyCameraControl - Windows")
+	parser.add_argument("--dcc-path", default=None,
+		help="location of CameraControlRemoteCmd.exe (or fake_dcc_remote.py)")
+	args = parser.parse_args()
+
 	try:
-		app = CameraControlWindows()
+		app = CameraControlWindows(dcc_path=args.dcc_path)
 		app.run()
 	except Exception as e:
 		print(f"Failed to start application: {e}")
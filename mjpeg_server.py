@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+MJPEG Live View Server for pyCameraControl
+Serves the latest live view / capture preview frames over HTTP:
+  /stream.mjpg   multipart MJPEG stream
+  /snapshot.jpg  latest frame as a single JPEG
+Frames are published as JPEG bytes; JPEG data from the camera is passed
+through unchanged. Every client has its own small queue that drops its oldest
+frame when full, so a slow client never blocks the publisher.
+"""
+
+import io
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+
+BOUNDARY = "pyCameraControlFrame"
+
+
+def is_jpeg(data):
+	"""True when data starts with a JPEG SOI marker"""
+	return bytes(data[:2]) == b"\xff\xd8"
+
+
+def encode_jpeg(image, quality=85):
+	"""Encode a PIL image as JPEG bytes"""
+	output = io.BytesIO()
+	image.convert('RGB').save(output, 'JPEG', quality=quality)
+	return output.getvalue()
+
+
+class MJPEGBroadcaster:
+	"""Fans published frames out to per-client bounded queues"""
+
+	def __init__(self, client_queue_size=2):
+		self.client_queue_size = client_queue_size
+		self.clients = set()
+		self.lock = threading.Lock()
+		self.latest = None
+
+		# Statistics
+		self.published = 0
+		self.dropped = 0
+
+	def publish(self, frame):
+		"""Publish a frame (JPEG bytes, or a PIL image which is encoded once)"""
+		if not isinstance(frame, (bytes, bytearray, memoryview)):
+			frame = encode_jpeg(frame)
+		elif not is_jpeg(frame):
+			return
+		frame = bytes(frame)
+
+		with self.lock:
+			self.latest = frame
+			self.published += 1
+			clients = list(self.clients)
+
+		for client in clients:
+			try:
+				client.put_nowait(frame)
+			except queue.Full:
+				# Drop the client's oldest frame instead of waiting for it
+				try:
+					client.get_nowait()
+					self.dropped += 1
+				except queue.Empty:
+					pass
+				try:
+					client.put_nowait(frame)
+				except queue.Full:
+					self.dropped += 1
+
+	def register(self):
+		client = queue.Queue(maxsize=self.client_queue_size)
+		with self.lock:
+			self.clients.add(client)
+			if self.latest is not None:
+				client.put_nowait(self.latest)
+		return client
+
+	def unregister(self, client):
+		with self.lock:
+			self.clients.discard(client)
+
+	def get_stats(self):
+		return {'clients': len(self.clients), 'published': self.published, 'dropped': self.dropped}
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+	daemon_threads = True
+	allow_reuse_address = True
+
+
+class _MJPEGRequestHandler(BaseHTTPRequestHandler):
+	"""HTTP handler; self.server.broadcaster is the frame source"""
+
+	def do_GET(self):
+		path = self.path.split('?', 1)[0]
+		if path in ('/', '/index.html'):
+			self._send_index()
+		elif path == '/snapshot.jpg':
+			self._send_snapshot()
+		elif path == '/stream.mjpg':
+			self._send_stream()
+		else:
+			self.send_error(404)
+
+	def _send_index(self):
+		body = (
+			"<html><head><title>pyCameraControl</title></head>"
+			"<body style='margin:0;background:#000'>"
+			"<img src='/stream.mjpg' style='max-width:100%;max-height:100vh'>"
+			"</body></html>"
+		).encode('utf-8')
+		self.send_response(200)
+		self.send_header('Content-Type', 'text/html; charset=utf-8')
+		self.send_header('Content-Length', str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def _send_snapshot(self):
+		frame = self.server.broadcaster.latest
+		if frame is None:
+			self.send_error(503, "No frame available yet")
+			return
+		self.send_response(200)
+		self.send_header('Content-Type', 'image/jpeg')
+		self.send_header('Content-Length', str(len(frame)))
+		self.send_header('Cache-Control', 'no-cache')
+		self.end_headers()
+		self.wfile.write(frame)
+
+	def _send_stream(self):
+		broadcaster = self.server.broadcaster
+		client = broadcaster.register()
+		try:
+			self.send_response(200)
+			self.send_header('Content-Type', f'multipart/x-mixed-replace; boundary={BOUNDARY}')
+			self.send_header('Cache-Control', 'no-cache')
+			self.end_headers()
+			while not self.server.stopping:
+				try:
+					frame = client.get(timeout=1.0)
+				except queue.Empty:
+					continue
+				self.wfile.write(
+					f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(frame)}\r\n\r\n".encode('ascii')
+				)
+				self.wfile.write(frame)
+				self.wfile.write(b"\r\n")
+		except (BrokenPipeError, ConnectionResetError):
+			pass  # Client went away
+		finally:
+			broadcaster.unregister(client)
+
+	def log_message(self, format, *args):
+		pass  # Keep the console quiet; one line per frame request is too noisy
+
+
+class MJPEGServer:
+	"""Local HTTP endpoint serving a MJPEGBroadcaster"""
+
+	def __init__(self, host="127.0.0.1", port=8081, broadcaster=None):
+		self.host = host
+		self.port = port
+		self.broadcaster = broadcaster or MJPEGBroadcaster()
+		self.httpd = None
+		self.thread = None
+
+	def start(self):
+		self.httpd = _ThreadingHTTPServer((self.host, self.port), _MJPEGRequestHandler)
+		self.httpd.broadcaster = self.broadcaster
+		self.httpd.stopping = False
+		self.port = self.httpd.server_address[1]
+		self.thread = threading.Thread(target=self.httpd.serve_forever, name="mjpeg-server", daemon=True)
+		self.thread.start()
+		return self.port
+
+	def stop(self):
+		if self.httpd:
+			self.httpd.stopping = True
+			self.httpd.shutdown()
+			self.httpd.server_close()
+			self.httpd = None
+
+	def publish(self, frame):
+		self.broadcaster.publish(frame)
+
+	def url(self):
+		return f"http://{self.host}:{self.port}/"
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Preview Decoding for pyCameraControl
+Decodes captured images at the size of the preview canvas instead of at full
+resolution. JPEGs are served from the embedded EXIF thumbnail when it is large
+enough, otherwise decoded with libjpeg's reduced-scale (draft) mode; other
+formats fall back to a full decode. Recently shown images are cached at the
+size they were first shown; a larger master is decoded only when the canvas
+grows past it, so other resizes only rescale in memory.
+Sources can be file paths, bytes-like buffers or gPhoto2 CameraFile objects;
+in-memory sources are read through a zero-copy view of their buffer.
+Requires: pip install pillow
+"""
+
+import io
+import os
+import queue
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+from PIL import Image
+
+
+PREVIEW_PADDING = 20
+
+# Thumbnails whose aspect ratio differs more than this are letterboxed
+ASPECT_TOLERANCE = 0.02
+
+# Minimum box a master is decoded for once the canvas outgrows the cached preview
+MASTER_BOX = (1600, 1600)
+
+# Files the preview can decode (RAW files are shown through their JPEG sibling)
+PREVIEWABLE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.bmp')
+
+
+def is_previewable(path):
+	return path.lower().endswith(PREVIEWABLE_EXTENSIONS)
+
+
+def fit_size(image_size, box_size, padding=PREVIEW_PADDING):
+	"""Size that fits image_size into box_size minus padding, never enlarging"""
+	img_width, img_height = image_size
+	box_width, box_height = box_size
+	scale = min(
+		(box_width - padding) / img_width,
+		(box_height - padding) / img_height,
+		1.0
+	)
+	return max(1, int(img_width * scale)), max(1, int(img_height * scale))
+
+
+def extract_exif_thumbnail(exif_data):
+	"""Return the JPEG thumbnail stored in IFD1 of raw EXIF data, or None"""
+	if not exif_data:
+		return None
+	if exif_data.startswith(b"Exif\x00\x00"):
+		exif_data = exif_data[6:]
+	if len(exif_data) < 8:
+		return None
+
+	if exif_data[:2] == b"II":
+		endian = "<"
+	elif exif_data[:2] == b"MM":
+		endian = ">"
+	else:
+		return None
+
+	try:
+		ifd0_offset = struct.unpack_from(endian + "I", exif_data, 4)[0]
+		entry_count = struct.unpack_from(endian + "H", exif_data, ifd0_offset)[0]
+		ifd1_offset = struct.unpack_from(endian + "I", exif_data, ifd0_offset + 2 + entry_count * 12)[0]
+		if not ifd1_offset:
+			return None
+
+		entry_count = struct.unpack_from(endian + "H", exif_data, ifd1_offset)[0]
+		thumb_offset = thumb_length = None
+		for i in range(entry_count):
+			tag, field_type, count, value = struct.unpack_from(endian + "HHII", exif_data, ifd1_offset + 2 + i * 12)
+			if field_type == 3:  # SHORT values are left-aligned in the value field
+				value = value >> 16 if endian == ">" else value & 0xFFFF
+			if tag == 0x0201:
+				thumb_offset = value
+			elif tag == 0x0202:
+				thumb_length = value
+	except struct.error:
+		return None
+
+	if not thumb_offset or not thumb_length or thumb_offset + thumb_length > len(exif_data):
+		return None
+	return exif_data[thumb_offset:thumb_offset + thumb_length]
+
+
+class BufferReader(io.RawIOBase):
+	"""Read-only file object over a memory buffer, without copying the whole buffer"""
+
+	def __init__(self, buffer):
+		view = memoryview(buffer)
+		self.buffer = view if view.format == 'B' and view.ndim == 1 else view.cast('B')
+		self.position = 0
+
+	def readable(self):
+		return True
+
+	def seekable(self):
+		return True
+
+	def readinto(self, b):
+		count = max(0, min(len(b), len(self.buffer) - self.position))
+		b[:count] = self.buffer[self.position:self.position + count]
+		self.position += count
+		return count
+
+	def seek(self, offset, whence=io.SEEK_SET):
+		if whence == io.SEEK_CUR:
+			offset += self.position
+		elif whence == io.SEEK_END:
+			offset += len(self.buffer)
+		self.position = max(0, offset)
+		return self.position
+
+	def tell(self):
+		return self.position
+
+
+def get_buffer(source):
+	"""Return a memoryview for in-memory sources (bytes-like or CameraFile), or None for paths"""
+	if isinstance(source, (bytes, bytearray, memoryview)):
+		return memoryview(source)
+	if hasattr(source, 'get_data_and_size'):
+		return memoryview(source.get_data_and_size())
+	return None
+
+
+def _open(source):
+	"""Open a path or an in-memory buffer"""
+	buffer = get_buffer(source)
+	if buffer is not None:
+		return Image.open(BufferReader(buffer))
+	return Image.open(source)
+
+
+def decode_preview(source, box_size, padding=PREVIEW_PADDING):
+	"""
+	Decode an image for a preview box.
+	Returns (image, info) where info['path'] is 'exif-thumbnail', 'draft' or
+	'full' and info['decode_time'] is in seconds.
+	"""
+	start = time.perf_counter()
+
+	with _open(source) as img:
+		source_size = img.size
+		target_size = fit_size(source_size, box_size, padding)
+		path = 'full'
+		result = None
+
+		if img.format == 'JPEG':
+			# 1. Embedded EXIF thumbnail when it covers the target size
+			thumb_data = extract_exif_thumbnail(img.info.get('exif'))
+			if thumb_data:
+				try:
+					with Image.open(io.BytesIO(thumb_data)) as thumb:
+						source_aspect = source_size[0] / source_size[1]
+						thumb_aspect = thumb.size[0] / thumb.size[1]
+						if (thumb.size[0] >= target_size[0] and thumb.size[1] >= target_size[1]
+								and abs(thumb_aspect - source_aspect) / source_aspect <= ASPECT_TOLERANCE):
+							thumb.load()
+							result = thumb.convert('RGB')
+							path = 'exif-thumbnail'
+				except Exception:
+					result = None
+
+			# 2. Reduced-scale decode (1/2, 1/4, 1/8) directly in libjpeg
+			if result is None:
+				img.draft('RGB', target_size)
+				img.load()
+				result = img
+				path = 'draft' if img.size != source_size else 'full'
+		else:
+			img.load()
+			result = img
+
+		if result.size != target_size:
+			result = result.resize(target_size, Image.Resampling.LANCZOS)
+		elif result is img:
+			result = img.copy()
+
+	info = {
+		'path': path,
+		'decode_time': time.perf_counter() - start,
+		'source_size': source_size,
+		'size': target_size,
+	}
+	return result, info
+
+
+class PreviewCache:
+	"""
+	LRU cache of decoded preview masters with a memory cap.
+	Entries are keyed by key + stamp (modification time and size of the file),
+	so a rewritten file is decoded again instead of served stale. Masters
+	decoded from memory while their file is still being saved have no stamp
+	and match any request until restamp() records the saved file's.
+	"""
+
+	def __init__(self, max_bytes=256 * 1024 * 1024):
+		self.max_bytes = max_bytes
+		self.entries = OrderedDict()  # key -> {'image': ..., 'source_size': ..., 'stamp': ..., 'bytes': ...}
+		self.total_bytes = 0
+		self.lock = threading.Lock()
+
+		# Statistics
+		self.hits = 0
+		self.misses = 0
+
+	def get(self, key, stamp=None):
+		"""Return the cached entry for key and stamp (marking it recently used) or None"""
+		with self.lock:
+			entry = self.entries.get(key)
+			if entry is None or entry['stamp'] not in (None, stamp):
+				self.misses += 1
+				return None
+			self.entries.move_to_end(key)
+			self.hits += 1
+			return entry
+
+	def put(self, key, image, source_size, stamp=None):
+		"""Store a master image and evict the least recently used ones over the cap"""
+		size = image.size[0] * image.size[1] * len(image.getbands())
+		with self.lock:
+			old = self.entries.pop(key, None)
+			if old:
+				self.total_bytes -= old['bytes']
+			self.entries[key] = {'image': image, 'source_size': source_size, 'stamp': stamp, 'bytes': size}
+			self.total_bytes += size
+			while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+				_, evicted = self.entries.popitem(last=False)
+				self.total_bytes -= evicted['bytes']
+
+	def restamp(self, key, stamp):
+		"""Record the file stamp of a master decoded from memory once its file is saved"""
+		with self.lock:
+			entry = self.entries.get(key)
+			if entry is not None and entry['stamp'] is None:
+				entry['stamp'] = stamp
+
+	def discard(self, key):
+		with self.lock:
+			entry = self.entries.pop(key, None)
+			if entry:
+				self.total_bytes -= entry['bytes']
+
+	def get_stats(self):
+		return {'entries': len(self.entries), 'bytes': self.total_bytes, 'hits': self.hits, 'misses': self.misses}
+
+
+class PreviewWorker:
+	"""
+	Background preview decoder.
+	Only the newest pending request is decoded; requests replaced before the
+	worker got to them are dropped. Results are PIL images already sized for
+	the canvas, ready for ImageTk.PhotoImage on the UI thread.
+	"""
+
+	def __init__(self, cache=None, on_result=None):
+		"""on_result(result) is called on the worker thread for every finished preview"""
+		self.cache = cache if cache is not None else PreviewCache()
+		self.on_result = on_result
+		self.condition = threading.Condition()
+		self.pending = None
+		self.running = True
+		self.results = queue.Queue()
+		self.saved = OrderedDict()  # key -> stamp of files saved before their preview was cached
+
+		# Statistics
+		self.submitted = 0
+		self.dropped = 0
+		self.rendered = 0
+
+		self.thread = threading.Thread(target=self._run, name="preview-worker", daemon=True)
+		self.thread.start()
+
+	def submit(self, source, box_size, key=None, cache=True, meta=None):
+		"""
+		Request a preview; replaces any request that has not started yet.
+		cache=False decodes straight to the box without keeping a master
+		(live view frames); meta is handed back unchanged with the result.
+		"""
+		with self.condition:
+			if self.pending is not None:
+				self.dropped += 1
+			self.pending = {
+				'source': source,
+				'box_size': box_size,
+				'key': key if key is not None else source,
+				'cache': cache,
+				'meta': meta,
+				'submitted_at': time.perf_counter(),
+			}
+			self.submitted += 1
+			self.condition.notify()
+
+	def get_result(self):
+		"""Return the newest finished preview (older finished ones are dropped) or None"""
+		result = None
+		while True:
+			try:
+				newer = self.results.get_nowait()
+			except queue.Empty:
+				return result
+			if result is not None:
+				with self.condition:
+					self.dropped += 1
+			result = newer
+
+	def stop(self):
+		with self.condition:
+			self.running = False
+			self.condition.notify()
+
+	def get_stats(self):
+		with self.condition:
+			return {'submitted': self.submitted, 'dropped': self.dropped, 'rendered': self.rendered}
+
+	def _run(self):
+		while True:
+			with self.condition:
+				while self.pending is None and self.running:
+					self.condition.wait()
+				if not self.running:
+					return
+				request = self.pending
+				self.pending = None
+
+			result = {
+				'key': request['key'],
+				'box_size': request['box_size'],
+				'meta': request['meta'],
+				'image': None,
+				'info': None,
+				'error': None,
+			}
+			try:
+				result['image'], result['info'] = self._render(request)
+				result['info']['latency'] = time.perf_counter() - request['submitted_at']
+				with self.condition:
+					self.rendered += 1
+			except Exception as e:
+				result['error'] = e
+			if self.on_result:
+				try:
+					self.on_result(result)
+				except Exception:
+					pass  # Observers must not break preview decoding
+			self.results.put(result)
+
+	def _file_stamp(self, path):
+		try:
+			stat = os.stat(path)
+		except OSError:
+			return None
+		return stat.st_mtime_ns, stat.st_size
+
+	def _stamp(self, request):
+		"""
+		(mtime_ns, size) of the file behind a request. In-memory sources use the
+		stamp file_saved() recorded for their key, or None while the file may
+		still be being written.
+		"""
+		source, key = request['source'], request['key']
+		if isinstance(source, str):
+			return self._file_stamp(source)
+		with self.condition:
+			return self.saved.pop(key, None)
+
+	def file_saved(self, key):
+		"""
+		Called once the file behind key is completely written (e.g. from the
+		capture pipeline's on_saved), so masters decoded from its in-memory
+		data keep serving resizes and still notice later rewrites.
+		"""
+		stamp = self._file_stamp(key)
+		if stamp is None:
+			return
+		with self.condition:
+			self.saved[key] = stamp
+			self.saved.move_to_end(key)
+			while len(self.saved) > 16:
+				self.saved.popitem(last=False)
+		self.cache.restamp(key, stamp)
+
+	def _render(self, request):
+		"""
+		Scale from the cached master when it is large enough. The first request
+		for an image decodes at the box size (EXIF thumbnail / draft path); a
+		larger master is decoded only when a later box outgrows it.
+		"""
+		start = time.perf_counter()
+		box_size = request['box_size']
+
+		if not request['cache']:
+			return decode_preview(request['source'], box_size)
+
+		stamp = self._stamp(request)
+		entry = self.cache.get(request['key'], stamp)
+		if entry is None:
+			image, info = decode_preview(request['source'], box_size)
+			self.cache.put(request['key'], image, info['source_size'], stamp)
+			return image, info
+
+		target_size = fit_size(entry['source_size'], box_size)
+		master = entry['image']
+		if target_size[0] <= master.size[0] and target_size[1] <= master.size[1]:
+			image = master if master.size == target_size else master.resize(target_size, Image.Resampling.LANCZOS)
+			return image, {
+				'path': 'cache',
+				'decode_time': time.perf_counter() - start,
+				'source_size': entry['source_size'],
+				'size': target_size,
+			}
+
+		master_box = (max(box_size[0], MASTER_BOX[0]), max(box_size[1], MASTER_BOX[1]))
+		master, info = decode_preview(request['source'], master_box, padding=0)
+		self.cache.put(request['key'], master, info['source_size'], stamp)
+
+		image = master if master.size == target_size else master.resize(target_size, Image.Resampling.LANCZOS)
+		info['size'] = target_size
+		info['decode_time'] = time.perf_counter() - start
+		return image, info
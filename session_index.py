@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Session File Index for pyCameraControl
+Keeps the photos of the save folder in memory, in capture order, so the
+interfaces never list the folder to find the latest photo. Files with the
+same name stem (IMG_0001.CR2 + IMG_0001.JPG) are one shot. The index is
+warmed with a single os.scandir pass in the background and then fed by the
+capture path and the folder watcher; last(), previous() and deleting the
+latest shot are O(1).
+"""
+
+import logging
+import os
+import threading
+import time
+
+from file_watch import IMAGE_EXTENSIONS
+from preview import is_previewable
+
+
+class Shot:
+	"""One capture: all sibling files sharing a name stem"""
+
+	def __init__(self, key, mtime):
+		self.key = key
+		self.files = []
+		self.mtime = mtime
+
+	@property
+	def name(self):
+		return os.path.basename(self.key)
+
+	@property
+	def preview_path(self):
+		"""File to show in the preview (the JPEG of a RAW+JPEG pair), or None"""
+		for path in self.files:
+			if is_previewable(path):
+				return path
+		return None
+
+	def __repr__(self):
+		return f"Shot({self.name!r}, {[os.path.basename(path) for path in self.files]})"
+
+
+class SessionIndex:
+	"""Shots of one folder in capture order; safe to use from several threads"""
+
+	def __init__(self, extensions=IMAGE_EXTENSIONS):
+		self.extensions = tuple(ext.lower() for ext in extensions)
+		self.directory = None
+		self.shots = []      # capture order, latest last
+		self.by_key = {}     # stem key -> Shot
+		self.positions = {}  # stem key -> index in self.shots
+		self.generation = 0  # bumped when the folder changes; stale warm-ups are dropped
+		self.version = 0     # bumped on every change (views compare it to redraw)
+		self.lock = threading.Lock()
+		self.load_time = None
+
+	def _key(self, path):
+		return os.path.normcase(os.path.abspath(os.path.splitext(path)[0]))
+
+	def _in_directory(self, path):
+		return os.path.normcase(os.path.abspath(os.path.dirname(path))) == self.directory
+
+	def set_directory(self, directory, warm=True):
+		"""Switch to another folder; warm=True indexes its existing photos on a background thread"""
+		key = os.path.normcase(os.path.abspath(directory)) if directory else None
+		with self.lock:
+			if key == self.directory:
+				return
+			self.directory = key
+			self.shots = []
+			self.by_key = {}
+			self.positions = {}
+			self.generation += 1
+			self.version += 1
+			generation = self.generation
+		if warm and directory and os.path.isdir(directory):
+			threading.Thread(
+				target=self.load, args=(directory, generation), name="session-index", daemon=True
+			).start()
+
+	def load(self, directory, generation=None):
+		"""Index the photos already in directory with one scandir pass, ordered by modification time"""
+		start = time.perf_counter()
+		found = {}
+		try:
+			with os.scandir(directory) as entries:
+				for entry in entries:
+					if not entry.name.lower().endswith(self.extensions):
+						continue
+					try:
+						if not entry.is_file():
+							continue
+						mtime = entry.stat().st_mtime
+					except OSError:
+						continue
+					key = self._key(entry.path)
+					shot = found.get(key)
+					if shot is None:
+						shot = found[key] = Shot(key, mtime)
+					shot.files.append(entry.path)
+					shot.mtime = max(shot.mtime, mtime)
+		except OSError as e:
+			logging.warning(f"Cannot index {directory}: {e}")
+			return 0
+
+		# Same timestamps (coarse file systems, bursts) fall back to name order
+		scanned = sorted(found.values(), key=lambda shot: (shot.mtime, shot.key))
+		with self.lock:
+			if generation is not None and generation != self.generation:
+				return 0
+			# Shots added while scanning were captured after it started; keep them last
+			for shot in self.shots:
+				existing = found.get(shot.key)
+				if existing is None:
+					scanned.append(shot)
+				else:
+					existing.files.extend(path for path in shot.files if path not in existing.files)
+			self.shots = scanned
+			self.by_key = {shot.key: shot for shot in scanned}
+			self.positions = {shot.key: i for i, shot in enumerate(scanned)}
+			self.version += 1
+			self.load_time = time.perf_counter() - start
+		logging.info(f"Indexed {len(scanned)} photo(s) in {directory} in {self.load_time:.2f}s")
+		return len(scanned)
+
+	def add(self, path):
+		"""Record a new file (capture path or folder watcher); returns its Shot, or None if not indexed"""
+		if not path.lower().endswith(self.extensions):
+			return None
+		key = self._key(path)
+		with self.lock:
+			if self.directory is None or not self._in_directory(path):
+				return None
+			shot = self.by_key.get(key)
+			if shot is None:
+				shot = self.by_key[key] = Shot(key, time.time())
+				self.positions[key] = len(self.shots)
+				self.shots.append(shot)
+			if path not in shot.files:
+				shot.files.append(path)
+				self.version += 1
+			return shot
+
+	def last(self):
+		with self.lock:
+			return self.shots[-1] if self.shots else None
+
+	def previous(self, shot=None):
+		"""Shot captured before shot (default: before the latest one)"""
+		with self.lock:
+			if shot is None:
+				return self.shots[-2] if len(self.shots) > 1 else None
+			position = self.positions.get(shot.key)
+			return self.shots[position - 1] if position else None
+
+	def __len__(self):
+		with self.lock:
+			return len(self.shots)
+
+	def __getitem__(self, position):
+		with self.lock:
+			return self.shots[position]
+
+	def _drop(self, shot):
+		position = self.positions.pop(shot.key, None)
+		if position is None:
+			return
+		del self.by_key[shot.key]
+		if position == len(self.shots) - 1:
+			self.shots.pop()
+		else:
+			# Not the latest shot: renumber the ones after it
+			del self.shots[position]
+			for i in range(position, len(self.shots)):
+				self.positions[self.shots[i].key] = i
+
+	def delete(self, shot):
+		"""
+		Delete all files of shot from disk and the index.
+		Returns (deleted paths, failed paths); files that could not be removed
+		stay in the index. The disk is not touched while holding the lock.
+		"""
+		with self.lock:
+			paths = list(shot.files)
+
+		deleted = []
+		failed = []
+		for path in paths:
+			try:
+				os.remove(path)
+			except FileNotFoundError:
+				pass
+			except OSError as e:
+				logging.warning(f"Cannot delete {path}: {e}")
+				failed.append(path)
+				continue
+			deleted.append(path)
+
+		with self.lock:
+			for path in deleted:
+				if path in shot.files:
+					shot.files.remove(path)
+			# The folder may have changed meanwhile; only drop the shot still indexed
+			if not shot.files and self.by_key.get(shot.key) is shot:
+				self._drop(shot)
+			self.version += 1
+		return deleted, failed
+
+	def get_stats(self):
+		with self.lock:
+			return {'shots': len(self.shots), 'load_time': self.load_time}
@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+"""
+Simulated gPhoto2 Camera for pyCameraControl
+Stand-in for the parts of the python-gphoto2 module the application uses
+(Camera, CameraFile, Context, widgets, GPhoto2Error, autodetect), so capture
+paths can be benchmarked and exercised without hardware. The module can be
+passed anywhere the gphoto2 module is expected:
+
+  import simulated_camera
+  simulated_camera.configure(latency={'capture': 0.2}, file_size=8 * 1024 * 1024)
+  backend = GPhoto2Backend(gp_module=simulated_camera)
+
+Every camera operation sleeps for a configurable latency (optionally with a
+seeded jitter) while holding the camera's USB lock, so concurrent pipeline
+stages contend the way they do on a real PTP connection. Captured frames are
+real JPEGs (generated once at init with Pillow when it is installed) padded
+to the configured file size. Camera.turn_mode_dial() and
+Camera.press_shutter() queue the events the camera body would send.
+"""
+
+import copy
+import io
+import random
+import threading
+import time
+
+
+# Error codes (same values as libgphoto2)
+GP_OK = 0
+GP_ERROR = -1
+GP_ERROR_BAD_PARAMETERS = -2
+GP_ERROR_NOT_SUPPORTED = -6
+GP_ERROR_MODEL_NOT_FOUND = -105
+GP_ERROR_FILE_NOT_FOUND = -108
+GP_ERROR_CAMERA_BUSY = -110
+
+# Widget types
+GP_WIDGET_WINDOW = 0
+GP_WIDGET_SECTION = 1
+GP_WIDGET_TEXT = 2
+GP_WIDGET_RANGE = 3
+GP_WIDGET_TOGGLE = 4
+GP_WIDGET_RADIO = 5
+GP_WIDGET_MENU = 6
+GP_WIDGET_BUTTON = 7
+GP_WIDGET_DATE = 8
+
+GP_CAPTURE_IMAGE = 0
+GP_FILE_TYPE_PREVIEW = 0
+GP_FILE_TYPE_NORMAL = 1
+
+GP_EVENT_UNKNOWN = 0
+GP_EVENT_TIMEOUT = 1
+GP_EVENT_FILE_ADDED = 2
+GP_EVENT_FOLDER_ADDED = 3
+GP_EVENT_CAPTURE_COMPLETE = 4
+
+_ERROR_MESSAGES = {
+	GP_ERROR: "Unspecified error",
+	GP_ERROR_BAD_PARAMETERS: "Bad parameters",
+	GP_ERROR_NOT_SUPPORTED: "Unsupported operation",
+	GP_ERROR_MODEL_NOT_FOUND: "Could not find the requested device on the USB port",
+	GP_ERROR_FILE_NOT_FOUND: "File not found",
+	GP_ERROR_CAMERA_BUSY: "I/O in progress",
+}
+
+DEFAULT_PROFILE = {
+	'connected': True,
+	'model': "Simulated Camera",
+	'serial': "SIM000001",
+	'firmware': "1.0.0",
+	'image_size': (6000, 4000),
+	'file_size': 12 * 1024 * 1024,  # captured JPEGs are padded to this size (0 = as encoded)
+	'preview_size': (960, 640),
+	'single_config': True,  # driver supports get/set_single_config
+	'seed': 0,
+	'jitter': 0.0,  # each latency varies by up to +/- this fraction
+	# Seconds per operation
+	'latency': {
+		'init': 0.5,
+		'exit': 0.05,
+		'get_config': 0.35,
+		'set_config': 0.12,
+		'set_config_per_widget': 0.03,
+		'get_single_config': 0.02,
+		'set_single_config': 0.04,
+		'capture': 0.30,
+		'file_get': 0.02,
+		'file_get_per_mb': 0.025,
+		'file_delete': 0.04,
+		'capture_preview': 0.04,
+	},
+}
+
+_profile = copy.deepcopy(DEFAULT_PROFILE)
+_image_cache = {}
+_image_lock = threading.Lock()
+
+
+def configure(**overrides):
+	"""Change the simulation profile for cameras created afterwards ('latency' is merged)"""
+	latency = overrides.pop('latency', None)
+	_profile.update(overrides)
+	if latency:
+		_profile['latency'].update(latency)
+	return get_profile()
+
+
+def reset():
+	"""Restore the default profile"""
+	_profile.clear()
+	_profile.update(copy.deepcopy(DEFAULT_PROFILE))
+
+
+def get_profile():
+	return copy.deepcopy(_profile)
+
+
+class GPhoto2Error(Exception):
+	"""Same shape as gphoto2.GPhoto2Error: carries the libgphoto2 error code"""
+
+	def __init__(self, code, message=None):
+		self.code = code
+		self.string = message or _ERROR_MESSAGES.get(code, "Unknown error")
+		super().__init__(f"[{code}] {self.string}")
+
+
+def check_result(result):
+	"""Strip the status code from a (code, value...) tuple, raising on errors"""
+	if isinstance(result, tuple) and result and isinstance(result[0], int):
+		code, values = result[0], result[1:]
+		if code < GP_OK:
+			raise GPhoto2Error(code)
+		if not values:
+			return None
+		return values[0] if len(values) == 1 else values
+	if isinstance(result, int):
+		if result < GP_OK:
+			raise GPhoto2Error(result)
+		return None
+	return result
+
+
+def gp_camera_autodetect():
+	"""Returns (status, [(model, port)])"""
+	if not _profile['connected']:
+		return GP_OK, []
+	return GP_OK, [(_profile['model'], "usb:001,004")]
+
+
+class Context:
+	"""gphoto2.Context stand-in"""
+
+
+class CameraFilePath:
+	def __init__(self, folder, name):
+		self.folder = folder
+		self.name = name
+
+
+class CameraAbilities:
+	def __init__(self, model):
+		self.model = model
+
+
+class CameraFile:
+	"""gphoto2.CameraFile stand-in holding the file data in memory"""
+
+	def __init__(self):
+		self.data = b""
+		self.name = ""
+		self.mime_type = "image/jpeg"
+
+	def get_data_and_size(self):
+		return self.data
+
+	def set_data_and_size(self, data):
+		self.data = data
+
+	def get_name(self):
+		return self.name
+
+	def get_mime_type(self):
+		return self.mime_type
+
+	def save(self, path):
+		with open(path, 'wb') as f:
+			f.write(self.data)
+
+
+class CameraWidget:
+	"""gphoto2.CameraWidget stand-in"""
+
+	def __init__(self, name, widget_type, label=None, value=None, choices=None, readonly=False, children=None):
+		self.name = name
+		self.type = widget_type
+		self.label = label or name
+		self.value = value
+		self.choices = list(choices or [])
+		self.readonly = readonly
+		self.children = list(children or [])
+		self.changed = False
+
+	def get_name(self):
+		return self.name
+
+	def get_label(self):
+		return self.label
+
+	def get_type(self):
+		return self.type
+
+	def get_readonly(self):
+		return self.readonly
+
+	def get_value(self):
+		return self.value
+
+	def set_value(self, value):
+		if self.type in (GP_WIDGET_RADIO, GP_WIDGET_MENU) and self.choices and str(value) not in self.choices:
+			raise GPhoto2Error(GP_ERROR_BAD_PARAMETERS)
+		if self.type == GP_WIDGET_TOGGLE:
+			value = int(value)
+		self.value = value
+		self.changed = True
+
+	def get_changed(self):
+		return self.changed
+
+	def set_changed(self, changed):
+		self.changed = bool(changed)
+
+	def count_children(self):
+		return len(self.children)
+
+	def get_child(self, index):
+		return self.children[index]
+
+	def get_children(self):
+		return iter(self.children)
+
+	def get_child_by_name(self, name):
+		found = self._find(name)
+		if found is None:
+			raise GPhoto2Error(GP_ERROR_BAD_PARAMETERS)
+		return found
+
+	def count_choices(self):
+		return len(self.choices)
+
+	def get_choice(self, index):
+		return self.choices[index]
+
+	def get_choices(self):
+		return iter(self.choices)
+
+	def _find(self, name):
+		for child in self.children:
+			if child.name == name:
+				return child
+			found = child._find(name)
+			if found is not None:
+				return found
+		return None
+
+	def _leaves(self):
+		if not self.children:
+			yield self
+		for child in self.children:
+			yield from child._leaves()
+
+
+def _radio(name, label, value, choices):
+	return CameraWidget(name, GP_WIDGET_RADIO, label, value, choices)
+
+
+def build_config_tree(profile):
+	"""Widget tree modelled on a Canon EOS body"""
+	shutter_speeds = ["bulb", "30", "15", "8", "4", "2", "1", "0.5", "1/4", "1/8", "1/15", "1/30",
+		"1/60", "1/125", "1/250", "1/500", "1/1000", "1/2000", "1/4000", "1/8000"]
+	apertures = ["2.8", "3.2", "3.5", "4", "4.5", "5", "5.6", "6.3", "7.1", "8", "9", "10", "11", "13", "16", "22"]
+
+	return CameraWidget("main", GP_WIDGET_WINDOW, "Camera and Driver Configuration", children=[
+		CameraWidget("actions", GP_WIDGET_SECTION, "Camera Actions", children=[
+			CameraWidget("viewfinder", GP_WIDGET_TOGGLE, "Viewfinder", 0),
+			CameraWidget("autofocusdrive", GP_WIDGET_TOGGLE, "Drive Canon DSLR Autofocus", 0),
+		]),
+		CameraWidget("settings", GP_WIDGET_SECTION, "Camera Settings", children=[
+			_radio("capturetarget", "Capture Target", "Internal RAM", ["Internal RAM", "Memory card"]),
+			CameraWidget("datetime", GP_WIDGET_DATE, "Camera Date and Time", int(time.time())),
+		]),
+		CameraWidget("status", GP_WIDGET_SECTION, "Camera Status Information", children=[
+			CameraWidget("serialnumber", GP_WIDGET_TEXT, "Serial Number", profile['serial'], readonly=True),
+			CameraWidget("deviceversion", GP_WIDGET_TEXT, "Device Version", profile['firmware'], readonly=True),
+			CameraWidget("cameramodel", GP_WIDGET_TEXT, "Camera Model", profile['model'], readonly=True),
+			CameraWidget("batterylevel", GP_WIDGET_TEXT, "Battery Level", "100%", readonly=True),
+		]),
+		CameraWidget("imgsettings", GP_WIDGET_SECTION, "Image Settings", children=[
+			_radio("iso", "ISO Speed", "100", ["Auto", "100", "200", "400", "800", "1600", "3200", "6400", "12800"]),
+			_radio("whitebalance", "WhiteBalance", "Auto", ["Auto", "Daylight", "Shadow", "Cloudy", "Tungsten", "Fluorescent", "Flash", "Manual"]),
+			_radio("imagequality", "Image Quality", "Large Fine JPEG", ["Large Fine JPEG", "Large Normal JPEG", "Medium Fine JPEG", "Small Fine JPEG", "RAW", "RAW + Large Fine JPEG"]),
+		]),
+		CameraWidget("capturesettings", GP_WIDGET_SECTION, "Capture Settings", children=[
+			_radio("autoexposuremode", "Canon Auto Exposure Mode", "Manual", ["P", "TV", "AV", "Manual", "Bulb"]),
+			_radio("f-number", "Aperture", "5.6", apertures),
+			_radio("shutterspeed", "Shutter Speed", "1/125", shutter_speeds),
+			_radio("exposurecompensation", "Exposure Compensation", "0", ["-3", "-2", "-1", "-0.5", "0", "0.5", "1", "2", "3"]),
+			_radio("meteringmode", "Metering Mode", "Evaluative", ["Evaluative", "Partial", "Spot", "Center-weighted average"]),
+			_radio("focusmode", "Focus Mode", "One Shot", ["One Shot", "AI Servo", "AI Focus", "Manual"]),
+		]),
+	])
+
+
+def make_jpeg(size, pad_to=0):
+	"""Deterministic gradient JPEG of the given size, padded after EOI to pad_to bytes"""
+	key = (tuple(size), pad_to)
+	with _image_lock:
+		if key in _image_cache:
+			return _image_cache[key]
+		try:
+			from PIL import Image
+			gradient = Image.linear_gradient('L').resize(size)
+			image = Image.merge('RGB', (gradient, gradient.transpose(Image.Transpose.ROTATE_90).resize(size), gradient))
+			output = io.BytesIO()
+			image.save(output, 'JPEG', quality=90)
+			data = output.getvalue()
+		except ImportError:
+			# Without Pillow frames are only structurally JPEG (SOI ... EOI), not decodable
+			data = b"\xff\xd8\xff\xe0" + bytes(1024) + b"\xff\xd9"
+		if pad_to > len(data):
+			# Decoders stop at EOI, so trailing padding only changes the transfer size
+			data += bytes(pad_to - len(data))
+		_image_cache[key] = data
+		return data
+
+
+class Camera:
+	"""gphoto2.Camera stand-in; all calls serialise on one lock like a USB connection"""
+
+	def __init__(self, profile=None):
+		self.profile = copy.deepcopy(profile or _profile)
+		self.random = random.Random(self.profile['seed'])
+		self.usb_lock = threading.Lock()
+		self.initialized = False
+		self.tree = build_config_tree(self.profile)
+		self.files = {}  # (folder, name) -> bytes
+		self.counter = 0
+		self.events = []  # (event type, data) returned by wait_for_event
+
+		# Statistics: operation -> [count, total seconds]
+		self.stats = {}
+
+	# Simulation helpers
+
+	def _io(self, operation, extra=0.0):
+		"""Sleep for the operation's latency while holding the USB lock"""
+		latency = self.profile['latency'].get(operation, 0.0) + extra
+		jitter = self.profile['jitter']
+		if jitter:
+			latency *= 1 + self.random.uniform(-jitter, jitter)
+		if latency > 0:
+			time.sleep(latency)
+		count, total = self.stats.get(operation, (0, 0.0))
+		self.stats[operation] = (count + 1, total + latency)
+
+	def _require_init(self):
+		if not self.initialized:
+			raise GPhoto2Error(GP_ERROR, "Camera not initialised")
+
+	def get_stats(self):
+		"""{'operation': {'count': n, 'total': seconds}}"""
+		return {op: {'count': count, 'total': total} for op, (count, total) in self.stats.items()}
+
+	def turn_mode_dial(self, value):
+		"""Simulate the user turning the mode dial on the body"""
+		with self.usb_lock:
+			self.tree._find("autoexposuremode").value = value
+			self.events.append((GP_EVENT_UNKNOWN, "PTP Property d105 changed"))
+
+	def press_shutter(self):
+		"""Simulate a shot taken with the shutter button on the body; returns its CameraFilePath"""
+		with self.usb_lock:
+			self.counter += 1
+			path = CameraFilePath("/store_00020001/DCIM/100CANON", f"IMG_{self.counter:04d}.JPG")
+			self.files[(path.folder, path.name)] = make_jpeg(self.profile['image_size'], self.profile['file_size'])
+			self.events.append((GP_EVENT_FILE_ADDED, path))
+			self.events.append((GP_EVENT_CAPTURE_COMPLETE, None))
+			return path
+
+	# gphoto2.Camera API
+
+	def init(self, context=None):
+		with self.usb_lock:
+			self._io('init')
+			if not self.profile['connected']:
+				raise GPhoto2Error(GP_ERROR_MODEL_NOT_FOUND)
+			# Generate the frames now so the first capture is not slowed down by it
+			make_jpeg(self.profile['image_size'], self.profile['file_size'])
+			make_jpeg(self.profile['preview_size'])
+			self.initialized = True
+
+	def exit(self, context=None):
+		with self.usb_lock:
+			self._io('exit')
+			self.initialized = False
+
+	def get_abilities(self):
+		return CameraAbilities(self.profile['model'])
+
+	def get_config(self, context=None):
+		with self.usb_lock:
+			self._require_init()
+			self._io('get_config')
+			return copy.deepcopy(self.tree)
+
+	def set_config(self, window, context=None):
+		with self.usb_lock:
+			self._require_init()
+			# Like libgphoto2, only widgets flagged as changed are sent
+			changed = [widget for widget in window._leaves() if widget.changed]
+			self._io('set_config', extra=self.profile['latency']['set_config_per_widget'] * len(changed))
+			for widget in changed:
+				target = self.tree._find(widget.name)
+				if target is None or target.readonly:
+					raise GPhoto2Error(GP_ERROR_BAD_PARAMETERS)
+				target.value = widget.value
+				widget.changed = False
+
+	def get_single_config(self, name, context=None):
+		with self.usb_lock:
+			self._require_init()
+			if not self.profile['single_config']:
+				raise GPhoto2Error(GP_ERROR_NOT_SUPPORTED)
+			self._io('get_single_config')
+			widget = self.tree._find(name)
+			if widget is None:
+				raise GPhoto2Error(GP_ERROR_BAD_PARAMETERS)
+			return copy.deepcopy(widget)
+
+	def set_single_config(self, name, widget, context=None):
+		with self.usb_lock:
+			self._require_init()
+			if not self.profile['single_config']:
+				raise GPhoto2Error(GP_ERROR_NOT_SUPPORTED)
+			self._io('set_single_config')
+			target = self.tree._find(name)
+			if target is None or target.readonly:
+				raise GPhoto2Error(GP_ERROR_BAD_PARAMETERS)
+			target.value = widget.value
+			widget.changed = False
+
+	def capture(self, capture_type, context=None):
+		with self.usb_lock:
+			self._require_init()
+			self._io('capture')
+			self.counter += 1
+			path = CameraFilePath("/store_00020001/DCIM/100CANON", f"IMG_{self.counter:04d}.JPG")
+			self.files[(path.folder, path.name)] = make_jpeg(self.profile['image_size'], self.profile['file_size'])
+			return path
+
+	def file_get(self, folder, name, file_type, *args):
+		"""file_get(folder, name, type, camera_file, context) or file_get(folder, name, type, context)"""
+		camera_file = args[0] if len(args) == 2 else CameraFile()
+		with self.usb_lock:
+			self._require_init()
+			data = self.files.get((folder, name))
+			if data is None:
+				raise GPhoto2Error(GP_ERROR_FILE_NOT_FOUND)
+			megabytes = len(data) / (1024 * 1024)
+			self._io('file_get', extra=self.profile['latency']['file_get_per_mb'] * megabytes)
+			# A fresh buffer per download, like libgphoto2
+			camera_file.set_data_and_size(bytes(bytearray(data)))
+			camera_file.name = name
+			return camera_file
+
+	def file_delete(self, folder, name, context=None):
+		with self.usb_lock:
+			self._require_init()
+			self._io('file_delete')
+			if self.files.pop((folder, name), None) is None:
+				raise GPhoto2Error(GP_ERROR_FILE_NOT_FOUND)
+
+	def capture_preview(self, *args):
+		"""capture_preview(camera_file, context) or capture_preview(context)"""
+		camera_file = args[0] if len(args) == 2 else CameraFile()
+		with self.usb_lock:
+			self._require_init()
+			self._io('capture_preview')
+			self.tree._find("viewfinder").value = 1
+			camera_file.set_data_and_size(make_jpeg(self.profile['preview_size']))
+			return camera_file
+
+	def wait_for_event(self, timeout, context=None):
+		"""Returns (event type, data); timeout in milliseconds"""
+		with self.usb_lock:
+			if self.events:
+				return self.events.pop(0)
+		time.sleep(timeout / 1000.0)
+		return GP_EVENT_TIMEOUT, None
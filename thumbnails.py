@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Thumbnail Cache for pyCameraControl
+Small thumbnails for the filmstrip. Decoded thumbnails are kept in an
+in-memory LRU keyed by path, and written to an on-disk JPEG cache keyed by
+path + modification time + file size, so reopening a session does not decode
+its photos again. The disk cache is pruned to a size and age limit on a
+background thread at startup. Thumbnails are produced by background workers (JPEGs use
+the EXIF thumbnail or a reduced-scale decode, see preview.decode_preview);
+the UI thread only ever reads the memory cache.
+Requires: pip install pillow
+"""
+
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from PIL import Image
+
+from preview import decode_preview
+
+
+THUMBNAIL_SIZE = (96, 64)
+
+# Disk cache limits; least recently used thumbnails are removed first
+DISK_CACHE_MAX_BYTES = 256 * 1024 * 1024
+DISK_CACHE_MAX_AGE = 30 * 24 * 3600  # seconds since last use
+
+
+def default_cache_dir():
+	base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser("~"), ".cache")
+	return os.path.join(base, "pyCameraControl", "thumbnails")
+
+
+class ThumbnailCache:
+	"""In-memory LRU of thumbnails backed by an on-disk cache"""
+
+	def __init__(self, cache_dir=None, max_items=1000, size=THUMBNAIL_SIZE,
+			max_disk_bytes=DISK_CACHE_MAX_BYTES, max_age=DISK_CACHE_MAX_AGE, prune=True):
+		"""prune=True trims the disk cache to max_disk_bytes / max_age on a background thread"""
+		self.cache_dir = cache_dir or default_cache_dir()
+		self.max_items = max_items
+		self.max_disk_bytes = max_disk_bytes
+		self.max_age = max_age
+		self.size = tuple(size)
+		self.entries = OrderedDict()  # path -> (mtime_ns, file size, image)
+		self.lock = threading.Lock()
+
+		# Statistics
+		self.memory_hits = 0
+		self.disk_hits = 0
+		self.decoded = 0
+		self.disk_errors = 0
+		self.pruned = 0
+
+		if prune:
+			threading.Thread(target=self.prune, name="thumbnail-prune", daemon=True).start()
+
+	def _disk_path(self, path, mtime_ns, file_size):
+		key = f"{os.path.abspath(path)}|{mtime_ns}|{file_size}|{self.size[0]}x{self.size[1]}"
+		digest = hashlib.sha1(key.encode('utf-8', errors='surrogateescape')).hexdigest()
+		return os.path.join(self.cache_dir, digest[:2], digest + ".jpg")
+
+	def peek(self, path):
+		"""Thumbnail for path from memory, or None (never touches the disk; safe on the UI thread)"""
+		with self.lock:
+			entry = self.entries.get(path)
+			if entry is None:
+				return None
+			self.entries.move_to_end(path)
+			self.memory_hits += 1
+			return entry[2]
+
+	def _put(self, path, mtime_ns, file_size, image):
+		with self.lock:
+			self.entries[path] = (mtime_ns, file_size, image)
+			self.entries.move_to_end(path)
+			while len(self.entries) > self.max_items:
+				self.entries.popitem(last=False)
+
+	def discard(self, path):
+		with self.lock:
+			self.entries.pop(path, None)
+
+	def load(self, path):
+		"""Thumbnail for path from memory, the disk cache or a new decode; raises OSError when unreadable"""
+		stat = os.stat(path)
+		with self.lock:
+			entry = self.entries.get(path)
+		if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+			return entry[2]
+
+		disk_path = self._disk_path(path, stat.st_mtime_ns, stat.st_size)
+		image = None
+		try:
+			with Image.open(disk_path) as cached:
+				cached.load()
+				image = cached.convert('RGB')
+			with self.lock:
+				self.disk_hits += 1
+		except (OSError, ValueError):
+			image = None
+
+		if image is None:
+			image, _ = decode_preview(path, self.size, padding=0)
+			with self.lock:
+				self.decoded += 1
+			self._write(disk_path, image)
+		else:
+			try:
+				os.utime(disk_path)  # last use, for prune()
+			except OSError:
+				pass
+
+		self._put(path, stat.st_mtime_ns, stat.st_size, image)
+		return image
+
+	def _write(self, disk_path, image):
+		try:
+			os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+			tmp_path = f"{disk_path}.{threading.get_ident()}.tmp"
+			image.convert('RGB').save(tmp_path, 'JPEG', quality=85)
+			os.replace(tmp_path, disk_path)
+		except OSError as e:
+			with self.lock:
+				self.disk_errors += 1
+			logging.debug(f"Cannot write thumbnail cache {disk_path}: {e}")
+
+	def prune(self):
+		"""Remove disk thumbnails unused for max_age seconds, then the oldest ones over max_disk_bytes"""
+		files = []
+		try:
+			with os.scandir(self.cache_dir) as buckets:
+				for bucket in buckets:
+					if not bucket.is_dir():
+						continue
+					with os.scandir(bucket.path) as entries:
+						for entry in entries:
+							try:
+								stat = entry.stat()
+							except OSError:
+								continue
+							files.append((stat.st_mtime, stat.st_size, entry.path))
+		except OSError:
+			return 0  # No cache yet
+
+		files.sort()
+		oldest = time.time() - self.max_age
+		total = sum(size for _, size, _ in files)
+		removed = 0
+		for mtime, size, path in files:
+			if mtime >= oldest and total <= self.max_disk_bytes:
+				break
+			try:
+				os.remove(path)
+			except OSError:
+				continue
+			total -= size
+			removed += 1
+
+		with self.lock:
+			self.pruned += removed
+		if removed:
+			logging.info(f"Pruned {removed} thumbnail(s) from {self.cache_dir}")
+		return removed
+
+	def get_stats(self):
+		with self.lock:
+			return {
+				'entries': len(self.entries),
+				'memory_hits': self.memory_hits,
+				'disk_hits': self.disk_hits,
+				'decoded': self.decoded,
+				'disk_errors': self.disk_errors,
+				'pruned': self.pruned,
+			}
+
+
+class ThumbnailLoader:
+	"""
+	Background thumbnail workers.
+	request() replaces the pending work with the paths currently wanted
+	(visible ones first), so fast scrolling never queues thousands of decodes.
+	Finished paths are collected with get_results() on the UI thread.
+	"""
+
+	def __init__(self, cache, workers=2):
+		self.cache = cache
+		self.condition = threading.Condition()
+		self.pending = OrderedDict()
+		self.in_progress = set()
+		self.running = True
+		self.results = queue.Queue()
+		self.threads = [
+			threading.Thread(target=self._run, name=f"thumbnail-worker-{i}", daemon=True)
+			for i in range(workers)
+		]
+		for thread in self.threads:
+			thread.start()
+
+	def request(self, paths):
+		with self.condition:
+			self.pending = OrderedDict((path, True) for path in paths if path not in self.in_progress)
+			if self.pending:
+				self.condition.notify_all()
+
+	def get_results(self):
+		"""[(path, error or None)] finished since the last call"""
+		results = []
+		while True:
+			try:
+				results.append(self.results.get_nowait())
+			except queue.Empty:
+				return results
+
+	def stop(self):
+		with self.condition:
+			self.running = False
+			self.condition.notify_all()
+
+	def _run(self):
+		while True:
+			with self.condition:
+				while not self.pending and self.running:
+					self.condition.wait()
+				if not self.running:
+					return
+				path, _ = self.pending.popitem(last=False)
+				self.in_progress.add(path)
+
+			try:
+				self.cache.load(path)
+				self.results.put((path, None))
+			except Exception as e:
+				self.results.put((path, e))
+			finally:
+				with self.condition:
+					self.in_progress.discard(path)